@@ -8,65 +8,574 @@
 #   python train.py
 #   python app.py
 
-from flask import Flask, request, jsonify
+import startup  # first, so the startup report covers every import below
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 import os
+import time
 import base64
-from model_loader import load_models, classify_category, extract_entities, detect_priority, summarize_text
+import threading
+from model_loader import load_classifier, load_nlp, load_sentiment, model_fingerprint, NER_STATS, SPACY_PIPELINE, NER_SKIP_POLICY, SMOKE_SET_PATH, CASCADE_STATS, CASCADE_MIN_CONFIDENCE
+from pipeline import parse_item, analyze_text, analyze_batch, analyze_texts
+from batcher import MicroBatcher
+from cache import AnalysisCache, cache_key
+from timing import STAGE_TIMER
+from bulk import analyze_records, chunked, numbered_lines
+import budget
+from metrics import REGISTRY, CONTENT_TYPE, REQUEST_SECONDS, PARSE_SECONDS
+from profiler import RequestProfiler
+from registry import ModelRegistry
+from large_input import InputTooLarge, bounded_lines, read_bytes, read_json, split_input
+import wire
 
 app = Flask(__name__)
 
-# Lazy load models on first request
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 1000))
+# Concurrent /analyze calls are coalesced into batches of up to
+# COALESCE_MAX_BATCH tickets, waiting at most COALESCE_WAIT_MS for company.
+# Set COALESCE_WAIT_MS=0 to run every request on its own.
+COALESCE_MAX_BATCH = int(os.environ.get('COALESCE_MAX_BATCH', 32))
+COALESCE_WAIT_MS = float(os.environ.get('COALESCE_WAIT_MS', 5))
+# Repeated ticket texts are answered from an in-process LRU cache.
+# CACHE_MAX_ENTRIES=0 disables it; CACHE_TTL_SECONDS=0 keeps entries until evicted.
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+CACHE_TTL_SECONDS = float(os.environ.get('CACHE_TTL_SECONDS', 3600))
+# CACHE_DB_PATH adds a second cache tier: a SQLite file (WAL mode) shared by
+# every worker on the node that survives restarts. It keeps at most
+# CACHE_DB_MAX_ENTRIES results (least recently used dropped first) for
+# CACHE_DB_TTL_SECONDS. Unset disables it.
+CACHE_DB_PATH = os.environ.get('CACHE_DB_PATH')
+CACHE_DB_MAX_ENTRIES = int(os.environ.get('CACHE_DB_MAX_ENTRIES', 1000000))
+CACHE_DB_TTL_SECONDS = float(os.environ.get('CACHE_DB_TTL_SECONDS', 7 * 86400))
+# LATENCY_BUDGET_MS > 0 lets /analyze swap slow stages (NER, sentiment, the
+# classifier) for rule-based engines when their live p95 would exceed the
+# budget; a request can also send latencyBudgetMs or X-Latency-Budget-Ms.
+# With more than DEGRADE_QUEUE_DEPTH requests in flight everything runs on
+# the rule engine. 0 disables either.
+LATENCY_BUDGET_MS = float(os.environ.get('LATENCY_BUDGET_MS', 0))
+DEGRADE_QUEUE_DEPTH = int(os.environ.get('DEGRADE_QUEUE_DEPTH', 0))
+# /analyze/stream classifies NDJSON input STREAM_CHUNK_SIZE lines at a time
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 64))
+# Opt-in /analyze profiling: stack-sample PROFILE_SAMPLE_RATE of requests,
+# and keep the samples of any request slower than PROFILE_SLOW_MS. The last
+# PROFILE_KEEP traces are served under /admin/profiles. 0 disables either.
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 0))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 50))
+# /admin/* endpoints require this in the X-Admin-Token header when set
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+# Retrained models are picked up without a restart: the model files are
+# polled every MODEL_RELOAD_POLL_SECONDS (0 = only on POST /admin/models/reload),
+# and a new version is served only if its accuracy on the held-out smoke set
+# is at most MODEL_MAX_ACCURACY_DROP below the current version's (at least
+# MODEL_MIN_ACCURACY when no classifier is serving yet)
+MODEL_RELOAD_POLL_SECONDS = float(os.environ.get('MODEL_RELOAD_POLL_SECONDS', 30))
+MODEL_MIN_ACCURACY = float(os.environ.get('MODEL_MIN_ACCURACY', 0))
+MODEL_MAX_ACCURACY_DROP = float(os.environ.get('MODEL_MAX_ACCURACY_DROP', 0.1))
+# /analyze lists recently analyzed tickets whose TF-IDF cosine similarity is
+# at least DUPLICATE_THRESHOLD (up to DUPLICATE_TOP_K) as duplicates. At
+# DUPLICATE_REUSE_THRESHOLD and above (0 = never) the nearest match's cached
+# analysis is returned instead of analyzing again. The index keeps the last
+# DEDUP_MAX_ENTRIES tickets for DEDUP_TTL_SECONDS; DEDUP_MAX_ENTRIES=0 disables it.
+DEDUP_MAX_ENTRIES = int(os.environ.get('DEDUP_MAX_ENTRIES', 100000))
+DEDUP_TTL_SECONDS = float(os.environ.get('DEDUP_TTL_SECONDS', 6 * 3600))
+DUPLICATE_THRESHOLD = float(os.environ.get('DUPLICATE_THRESHOLD', 0.8))
+DUPLICATE_TOP_K = int(os.environ.get('DUPLICATE_TOP_K', 5))
+DUPLICATE_REUSE_THRESHOLD = float(os.environ.get('DUPLICATE_REUSE_THRESHOLD', 0))
+
+# WARMUP=eager (default) loads every model before the first request is
+# served. WARMUP=background answers /health and the rule-based path right
+# away and loads the models in a background thread; stages whose model is not
+# loaded yet fall back to the rules, and /ready stays red until all are.
+WARMUP = os.environ.get('WARMUP', 'eager')
+
+# Models are filled in stage by stage by _init_models (see warm_up); later
+# versions replace the whole dict in MODEL_REGISTRY, so read the serving set
+# through serving_models() rather than MODELS
 MODELS = {
     "nlp": None,
     "clf": None,
-    "vectorizer": None
+    "vectorizer": None,
+    "calibration": None,
+    "version": None
 }
+MODEL_REGISTRY = ModelRegistry(MODELS, load_classifier, model_fingerprint, SMOKE_SET_PATH,
+                               MODEL_MIN_ACCURACY, MODEL_MAX_ACCURACY_DROP)
+_models_loaded = False
+_models_lock = threading.Lock()
+_ready = threading.Event()
+
+WARMUP_TICKETS = [
+    ("WiFi is down in the conference room on floor 3, urgent", "Network"),
+    ("Cannot login to Outlook on my laptop, password rejected", "Security"),
+]
 
 def _init_models():
-    if MODELS["nlp"] is None:
-        models = load_models()
-        MODELS.update(models)
+    """Load the models one stage at a time, cheapest first
+
+    Each stage is published to MODELS as soon as it is loaded, so a
+    background warm-up upgrades requests from the rules to the models
+    piece by piece.
+    """
+    global _models_loaded
+    if _models_loaded:
+        return
+    with _models_lock:
+        if _models_loaded:
+            return
+        with startup.timed_stage('classifier'):
+            MODELS.update(load_classifier())
+        with startup.timed_stage('sentiment'):
+            load_sentiment()
+        with startup.timed_stage('nlp'):
+            MODELS['nlp'] = load_nlp()
+        _models_loaded = True
+
+def serving_models():
+    """The model set to use for the whole of one request"""
+    # In background mode requests never wait for a model load
+    if WARMUP != 'background':
+        _init_models()
+    if MODEL_RELOAD_POLL_SECONDS > 0 and _models_loaded:
+        MODEL_REGISTRY.watch(MODEL_RELOAD_POLL_SECONDS)
+    return MODEL_REGISTRY.current
+
+def is_ready():
+    return _ready.is_set()
+
+def serving_cache():
+    # Results computed while models are still loading are not cached, so
+    # rule-based answers do not outlive the warm-up
+    return CACHE if _ready.is_set() else None
+
+def warm_up():
+    """Load models and push sample tickets through every stage, then report ready
+
+    Run once before serving: in the gunicorn master with PRELOAD_MODELS=1 so
+    forked workers inherit warm, shared models, before app.run otherwise, or
+    in a background thread with WARMUP=background.
+    """
+    _init_models()
+    with startup.timed_stage('warmup'):
+        for text, request_type in WARMUP_TICKETS:
+            analyze_text(text, request_type, MODEL_REGISTRY.current)
+        analyze_texts([text for text, _ in WARMUP_TICKETS], [rt for _, rt in WARMUP_TICKETS], MODEL_REGISTRY.current)
+    _ready.set()
+    startup.mark_ready()
+    report = startup.report()
+    print("Startup: ready after {readyAfterMs}ms; imports {imports}; stages {stages}".format(**report))
+
+def start_background_warm_up():
+    thread = threading.Thread(target=warm_up, name='warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def _analyze_coalesced(items):
+    texts = [text for text, _ in items]
+    request_types = [request_type for _, request_type in items]
+    return analyze_texts(texts, request_types, MODEL_REGISTRY.current)
+
+# A lone request is not held back: the batch runs as soon as every request in
+# flight has joined it
+BATCHER = MicroBatcher(_analyze_coalesced, COALESCE_MAX_BATCH, COALESCE_WAIT_MS,
+                       in_flight=lambda: budget.IN_FLIGHT.value) if COALESCE_WAIT_MS > 0 else None
+PROFILER = RequestProfiler(PROFILE_SAMPLE_RATE, PROFILE_SLOW_MS, PROFILE_INTERVAL_MS, PROFILE_KEEP)
+STORE = None
+if CACHE_DB_PATH:
+    import sqlite3
+    from result_store import ResultStore
+    try:
+        STORE = ResultStore(CACHE_DB_PATH, CACHE_DB_MAX_ENTRIES, CACHE_DB_TTL_SECONDS)
+    except sqlite3.Error as e:
+        print(f"Warning: cache database {CACHE_DB_PATH} unavailable ({e}); using the in-process cache only")
+CACHE = AnalysisCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, fingerprint=model_fingerprint, store=STORE) \
+    if CACHE_MAX_ENTRIES > 0 or STORE is not None else None
+
+@app.before_request
+def _start_timer():
+    g.started = time.perf_counter()
+
+@app.after_request
+def _observe_request(response):
+    # Streaming responses are measured up to the first byte
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    REQUEST_SECONDS.observe(time.perf_counter() - g.started, (endpoint,))
+    return response
+
+def _json_body(endpoint):
+    # Read in chunks and refused past MAX_REQUEST_BYTES (see large_input.py);
+    # MessagePack bodies are decoded as such (see wire.py)
+    started = time.perf_counter()
+    try:
+        if wire.is_msgpack(request.content_type):
+            return wire.unpack(read_bytes(request.stream, request.content_length))
+        return read_json(request.stream, request.content_length)
+    finally:
+        PARSE_SECONDS.observe(time.perf_counter() - started, (endpoint,))
+
+def _reply(body, status=200):
+    """body as JSON, or as MessagePack if the client negotiated it"""
+    if wire.response_format(request.headers.get('Accept'), request.content_type) == wire.JSON:
+        return jsonify(body), status
+    return Response(wire.pack(body), status=status, content_type=wire.MSGPACK)
+
+@app.errorhandler(InputTooLarge)
+def _too_large(e):
+    return _reply({"error": str(e)}, 413)
+
+@app.errorhandler(wire.UnsupportedFormat)
+def _unsupported_format(e):
+    return jsonify({"error": str(e)}), 415
 
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({"status": "ok"})
 
+@app.route('/ready', methods=['GET'])
+def ready():
+    # Readiness stays red until warm_up has run in this process (or its parent)
+    if not _ready.is_set():
+        return jsonify({"status": "warming_up"}), 503
+    return jsonify({"status": "ready", "modelVersion": MODEL_REGISTRY.current['version']})
+
 @app.route('/analyze', methods=['POST'])
 def analyze():
-    # Initialize models if not loaded
-    _init_models()
+    trace = PROFILER.start()
+    if trace is None:
+        return _analyze()
+    details = {}
+    try:
+        # Profiled requests take the same path as any other, so profiling
+        # never changes what the client gets back
+        return _analyze(details)
+    finally:
+        PROFILER.finish(trace, **details)
+
+def _analyze(details=None):
+    """The /analyze handler; with details, fills in what a profile trace records"""
+    models = serving_models()
+    cache = serving_cache()
     
-    data = request.get_json(force=True, silent=True) or {}
-    description = (data.get('description') or '').strip()
-    request_type = (data.get('requestType') or '').strip()
-    audio_b64 = data.get('audioBase64')
+    data = _json_body('/analyze') or {}
+    try:
+        text, request_type = parse_item(data)
+        budget_ms = _latency_budget(data)
+    except InputTooLarge:
+        raise
+    except ValueError as e:
+        return _reply({"error": str(e)}, 400)
+    if details is not None:
+        details.update(chars=len(text), requestType=request_type)
+
+    with budget.IN_FLIGHT as in_flight:
+        # ?timings=1 runs this request on its own (no cache, no coalescing)
+        # and reports how long each stage took
+        if request.args.get('timings') == '1':
+            engines, _ = budget.choose_engines(models, budget_ms, in_flight.value, DEGRADE_QUEUE_DEPTH)
+            timings = {}
+            result = analyze_text(text, request_type, models, timings, engines)
+            _trace_details(details, 'alone', result, timings)
+            return _reply(dict(result, timings=timings))
+
+        index = duplicate_index(models)
+        duplicates = _DuplicateLookup(index, models, text, data.get('id')) if index is not None else None
+        respond = duplicates.respond if duplicates is not None else (lambda result, key=None: result)
+
+        key = cache_key(text, request_type, models['version'])
+        result = cache.get(key) if cache is not None else None
+        if result is not None:
+            _trace_details(details, 'cache', result)
+            return _reply(respond(result, key))
+
+        result = duplicates.reusable(cache) if duplicates is not None else None
+        if result is not None:
+            _trace_details(details, 'duplicate', result)
+            return _reply(respond(result, duplicates.reused_key))
 
-    if not description and not audio_b64:
-        return jsonify({"error": "description or audioBase64 is required"}), 400
+        # The coalescing wait is part of the full path's latency
+        if budget_ms and BATCHER is not None:
+            budget_ms = max(budget_ms - COALESCE_WAIT_MS, 1e-3)
+        engines, degraded = budget.choose_engines(models, budget_ms, in_flight.value, DEGRADE_QUEUE_DEPTH)
+        if degraded:
+            # Degraded results are served but not cached, so they do not
+            # outlive the load that caused them
+            timings = {} if details is not None else None
+            result = analyze_text(text, request_type, models, timings, engines=engines)
+            _trace_details(details, 'degraded', result, timings)
+            return _reply(respond(result))
 
-    # TODO: Audio transcription can be added later if needed
-    text = description
+        if BATCHER is not None:
+            result = BATCHER.submit((text, request_type))
+            _trace_details(details, 'coalesced', result)
+        else:
+            timings = {} if details is not None else None
+            result = analyze_text(text, request_type, models, timings)
+            _trace_details(details, 'direct', result, timings)
+        if cache is not None:
+            cache.put(key, result)
 
-    # Category classification
-    category, cat_conf = classify_category(text, MODELS['vectorizer'], MODELS['clf'], request_type)
+    return _reply(respond(result, key if cache is not None else None))
 
-    # Entities
-    entities = extract_entities(text, MODELS['nlp'])
+_duplicates = None  # (model version, DuplicateIndex)
+_duplicates_lock = threading.Lock()
 
-    # Priority detection
-    priority, pri_conf = detect_priority(text)
+def duplicate_index(models):
+    """The near-duplicate index for the serving vectorizer, or None without one
 
-    # Summary
-    summary = summarize_text(text)
+    Term ids are only meaningful for the vectorizer that produced them, so a
+    new model version starts a new index.
+    """
+    global _duplicates
+    if DEDUP_MAX_ENTRIES <= 0 or models['vectorizer'] is None:
+        return None
+    current = _duplicates
+    if current is None or current[0] != models['version']:
+        with _duplicates_lock:
+            if _duplicates is None or _duplicates[0] != models['version']:
+                from dedup import DuplicateIndex
+                _duplicates = (models['version'], DuplicateIndex(DEDUP_MAX_ENTRIES, DEDUP_TTL_SECONDS))
+            current = _duplicates
+    return current[1]
 
+class _DuplicateLookup:
+    """One request's near-duplicate query, and indexing it once analyzed"""
+
+    def __init__(self, index, models, text, ticket_id):
+        from dedup import row_terms
+        self.index = index
+        self.ticket_id = ticket_id
+        # A large ticket is compared on the same sampled view it is classified on
+        self.terms = row_terms(models['vectorizer'].transform([split_input(text)[1]]))
+        self.matches = index.query(self.terms, DUPLICATE_THRESHOLD, DUPLICATE_TOP_K) if len(self.terms[0]) else []
+
+    def reusable(self, cache):
+        """The cached analysis of a near-identical ticket, or None"""
+        if not (DUPLICATE_REUSE_THRESHOLD > 0 and cache is not None and self.matches):
+            return None
+        similarity, ticket_id, key = self.matches[0]
+        if similarity < DUPLICATE_REUSE_THRESHOLD or key is None:
+            return None
+        result = cache.get(key)
+        if result is None:
+            return None
+        self.reused_key = key
+        return dict(result, duplicateOf=ticket_id)
+
+    def respond(self, result, key=None):
+        """Index this ticket (under the cache key of its analysis) and add its duplicates to the result"""
+        if len(self.terms[0]):
+            self.index.add(self.ticket_id, self.terms, key)
+        return dict(result, duplicates=[{"id": ticket_id, "similarity": similarity}
+                                        for similarity, ticket_id, _ in self.matches])
+
+def _trace_details(details, path, result, timings=None):
+    if details is not None:
+        details.update(path=path, category=result['category'], priority=result['priority'],
+                       engines=result['engines'], timings=timings)
+
+def _latency_budget(data):
+    """Per-request budget in ms (body latencyBudgetMs or X-Latency-Budget-Ms), else LATENCY_BUDGET_MS"""
+    value = data.get('latencyBudgetMs', request.headers.get('X-Latency-Budget-Ms'))
+    if value is None:
+        return LATENCY_BUDGET_MS
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError("latencyBudgetMs must be a number of milliseconds")
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_many():
+    models = serving_models()
+
+    data = _json_body('/analyze/batch')
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return _reply({"error": "expected a JSON array of tickets or {\"items\": [...]}"}, 400)
+    if len(items) > MAX_BATCH_SIZE:
+        return _reply({"error": f"batch too large, max {MAX_BATCH_SIZE} items"}, 413)
+
+    return _reply({"results": analyze_batch(items, models, serving_cache())})
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_stream():
+    # NDJSON in, NDJSON out: the body is read a chunk of lines at a time and
+    # each chunk's results are written back before the next one is read, so
+    # memory does not grow with the size of the upload
+    models = serving_models()
+    cache = serving_cache()
+    lines = numbered_lines(bounded_lines(request.stream))
+
+    def generate():
+        for records in chunked(lines, STREAM_CHUNK_SIZE):
+            yield analyze_records(records, models, cache)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    nlp = MODEL_REGISTRY.current['nlp']
     return jsonify({
-        "category": category,
-        "priority": priority,
-        "summary": summary,
-        "entities": entities,
-        "confidence": {"category": round(cat_conf, 3), "priority": round(pri_conf, 3)}
+        "coalescing": BATCHER.stats() if BATCHER is not None else None,
+        "cache": CACHE.stats() if CACHE is not None else None,
+        "stages": STAGE_TIMER.stats(),
+        "duplicates": _duplicates[1].stats() if _duplicates is not None else None,
+        "budget": dict(budget.stats(), latencyBudgetMs=LATENCY_BUDGET_MS, queueDepthLimit=DEGRADE_QUEUE_DEPTH),
+        "cascade": _cascade_stats(),
+        "ner": {
+            "pipeline": SPACY_PIPELINE,
+            "components": nlp.pipe_names if nlp is not None else None,
+            "skipPolicy": NER_SKIP_POLICY,
+            "run": NER_STATS['run'],
+            "skipped": NER_STATS['skipped']
+        }
     })
 
+def _cascade_stats():
+    calibration = MODEL_REGISTRY.current.get('calibration')
+    decided = CASCADE_STATS['early_exit'] + CASCADE_STATS['model']
+    return {
+        "minConfidence": CASCADE_MIN_CONFIDENCE,
+        "calibrated": calibration is not None,
+        "earlyExits": CASCADE_STATS['early_exit'],
+        "modelRuns": CASCADE_STATS['model'],
+        "earlyExitFraction": round(CASCADE_STATS['early_exit'] / decided, 3) if decided else 0.0,
+        # What train.py measured for each threshold on held-out tickets
+        "trainReport": calibration.report if calibration is not None else None
+    }
+
+def _collect_runtime_metrics():
+    """Scrape-time view of the cache, coalescer, NER and load counters"""
+    families = [
+        ('ai_ready', 'gauge', 'Whether warm-up has finished', [({}, int(_ready.is_set()))]),
+        ('ai_requests_in_flight', 'gauge', 'Analyze requests being processed', [({}, budget.IN_FLIGHT.value)]),
+        ('ai_ner_docs_total', 'counter', 'Tickets for which spaCy NER was run or skipped',
+         [({'outcome': 'run'}, NER_STATS['run']), ({'outcome': 'skipped'}, NER_STATS['skipped'])]),
+        ('ai_degraded_fields_total', 'counter', 'Result fields degraded to a cheaper engine by the latency budget',
+         [({'field': field}, count) for field, count in sorted(budget.DEGRADED.items())]),
+        ('ai_cascade_decisions_total', 'counter', 'Tickets the cascade answered from keywords (early_exit) or sent to the model',
+         [({'outcome': 'early_exit'}, CASCADE_STATS['early_exit']), ({'outcome': 'model'}, CASCADE_STATS['model'])]),
+    ]
+    if CACHE is not None:
+        cache = CACHE.stats()
+        families += [
+            ('ai_cache_lookups_total', 'counter', 'Result cache lookups',
+             [({'result': 'hit'}, cache['hits']), ({'result': 'miss'}, cache['misses'])]),
+            ('ai_cache_removals_total', 'counter', 'Result cache entries removed',
+             [({'reason': 'eviction'}, cache['evictions']), ({'reason': 'expiration'}, cache['expirations'])]),
+            ('ai_cache_entries', 'gauge', 'Result cache entries', [({}, cache['entries'])]),
+        ]
+        if STORE is not None:
+            store = cache['store']
+            families += [
+                ('ai_cache_store_hits_total', 'counter', 'Result cache hits answered by the on-disk store',
+                 [({}, cache['storeHits'])]),
+                ('ai_cache_store_entries', 'gauge', 'Results in the on-disk store (all workers)',
+                 [({}, store['entries'] or 0)]),
+                ('ai_cache_store_errors_total', 'counter', 'On-disk store operations that failed or timed out',
+                 [({}, store['errors'])]),
+            ]
+    if _duplicates is not None:
+        duplicates = _duplicates[1].stats()
+        families += [
+            ('ai_duplicate_index_entries', 'gauge', 'Tickets in the near-duplicate index', [({}, duplicates['entries'])]),
+            ('ai_duplicate_lookups_total', 'counter', 'Near-duplicate lookups, by whether a duplicate was found',
+             [({'found': 'true'}, duplicates['withDuplicates']),
+              ({'found': 'false'}, duplicates['lookups'] - duplicates['withDuplicates'])]),
+        ]
+    if BATCHER is not None:
+        batcher = BATCHER.stats()
+        families += [
+            ('ai_coalesced_batches_total', 'counter', 'Micro-batches run', [({}, batcher['batches'])]),
+            ('ai_coalesced_items_total', 'counter', 'Tickets run through micro-batches', [({}, batcher['items'])]),
+        ]
+    return families
+
+REGISTRY.add_collector(_collect_runtime_metrics)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+def _profiles_admin():
+    """None if the caller may read profiles, else the error response"""
+    if not PROFILER.enabled:
+        return jsonify({"error": "profiling is off (set PROFILE_SAMPLE_RATE or PROFILE_SLOW_MS)"}), 404
+    return _admin_denied()
+
+def _admin_denied():
+    """None if the caller may use /admin endpoints, else the error response"""
+    if ADMIN_TOKEN and request.headers.get('X-Admin-Token') != ADMIN_TOKEN:
+        return jsonify({"error": "forbidden"}), 403
+    return None
+
+@app.route('/admin/profiles', methods=['GET'])
+def profiles():
+    denied = _profiles_admin()
+    if denied:
+        return denied
+    return jsonify({"profiler": PROFILER.stats(), "profiles": PROFILER.profiles()})
+
+@app.route('/admin/profiles/collapsed', methods=['GET'])
+@app.route('/admin/profiles/<int:trace_id>/collapsed', methods=['GET'])
+def collapsed_profiles(trace_id=None):
+    # Collapsed stacks, one "frame;frame;frame count" line each: pipe into
+    # flamegraph.pl or load into speedscope
+    denied = _profiles_admin()
+    if denied:
+        return denied
+    body = PROFILER.collapsed(trace_id, by=request.args.get('by'))
+    if body is None:
+        return jsonify({"error": f"no kept profile {trace_id}"}), 404
+    return Response(body, content_type='text/plain; charset=utf-8')
+
+@app.route('/admin/models', methods=['GET'])
+def models_status():
+    denied = _admin_denied()
+    if denied:
+        return denied
+    return jsonify(dict(MODEL_REGISTRY.stats(), pollSeconds=MODEL_RELOAD_POLL_SECONDS))
+
+@app.route('/admin/models/reload', methods=['POST'])
+def reload_models():
+    # Load the model files on disk now instead of waiting for the next poll;
+    # ?force=1 re-validates and swaps even if the version is unchanged
+    denied = _admin_denied()
+    if denied:
+        return denied
+    if not _models_loaded:
+        return jsonify({"error": "models are still loading"}), 503
+    event = MODEL_REGISTRY.reload(force=request.args.get('force') == '1')
+    return jsonify(event), 200 if event['outcome'] in ('swapped', 'unchanged') else 409
+
+@app.route('/admin/models/rollback', methods=['POST'])
+def rollback_models():
+    denied = _admin_denied()
+    if denied:
+        return denied
+    event = MODEL_REGISTRY.rollback()
+    return jsonify(event), 200 if event['outcome'] == 'swapped' else 409
+
+@app.route('/startup', methods=['GET'])
+def startup_report():
+    # Where the cold start went: import time per heavy dependency and load
+    # time per model stage, plus which stages are serving from models yet
+    return jsonify(dict(
+        startup.report(),
+        warmup=WARMUP,
+        ready=_ready.is_set(),
+        loaded={
+            "classifier": MODEL_REGISTRY.current['clf'] is not None,
+            "nlp": MODEL_REGISTRY.current['nlp'] is not None
+        }
+    ))
+
+if os.environ.get('PRELOAD_MODELS') == '1':
+    warm_up()
+elif WARMUP == 'background':
+    start_background_warm_up()
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 3002))
+    if WARMUP != 'background' and not _ready.is_set():
+        warm_up()
     app.run(host='0.0.0.0', port=port)
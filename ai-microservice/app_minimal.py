@@ -6,9 +6,12 @@ Uses only built-in libraries for maximum compatibility
 
 from flask import Flask, request, jsonify
 import os
-import re
 import json
 from collections import Counter
+from keywords import KeywordMatcher
+from entities import EntityExtractor, with_site_rules
+from summarizer import summarize
+from large_input import FULL, InputTooLarge, check_item, merge_entities, read_json, split_input
 
 app = Flask(__name__)
 
@@ -45,16 +48,35 @@ class SimpleTicketClassifier:
             'down': 3, 'outage': 3, 'broken': 2, 'not working': 2, 
             'failed': 2, 'problem': 1, 'issue': 1, 'help': 1
         }
+        
+        # Simple sentiment analysis - negative words
+        self.negative_words = ['not', 'can\'t', 'cannot', 'won\'t', 'don\'t', 'failed', 'broken', 'error']
+        
+        # One compiled matcher scores categories, priority and negative
+        # words in a single scan of the text
+        tables = dict(self.category_keywords)
+        tables['_priority'] = self.priority_keywords
+        tables['_negative'] = self.negative_words
+        self.matcher = KeywordMatcher(tables)
+        self.summary_keyword_weights = dict({category: 0.5 for category in self.category_keywords}, _priority=1.0)
+        
+        # Entity patterns, compiled into one single-scan extractor
+        self.entity_extractor = EntityExtractor(with_site_rules([
+            # Service patterns
+            {"slot": "service", "pattern": r'\b(office|outlook|teams|sharepoint|onedrive|dropbox|gmail|slack)\b', "group": 1},
+            {"slot": "service", "pattern": r'\b(windows|linux|macos|ubuntu|ios|android)\b', "group": 1},
+            # Device patterns
+            {"slot": "device", "pattern": r'\b(laptop|desktop|computer|pc|server|router|switch|printer|phone)\b', "group": 1},
+            # Location patterns
+            {"slot": "location", "pattern": r'\b(office|building|floor|room|conference|lobby)\s*\w*\b'}
+        ]))
 
     def classify_category(self, text, request_type=None):
         """Classify text into categories"""
-        text_lower = text.lower()
-        scores = {}
+        all_scores = self.matcher.scores(text)
         
         # Count keyword matches for each category
-        for category, keywords in self.category_keywords.items():
-            score = sum(1 for keyword in keywords if keyword in text_lower)
-            scores[category] = score
+        scores = {category: all_scores[category] for category in self.category_keywords}
         
         # Boost score if request_type matches
         if request_type and request_type in scores:
@@ -72,17 +94,13 @@ class SimpleTicketClassifier:
 
     def detect_priority(self, text):
         """Detect priority based on keywords"""
-        text_lower = text.lower()
-        urgency_score = 0
+        scores = self.matcher.scores(text)
         
         # Calculate urgency score
-        for keyword, weight in self.priority_keywords.items():
-            if keyword in text_lower:
-                urgency_score += weight
+        urgency_score = scores['_priority']
         
         # Simple sentiment analysis - count negative words
-        negative_words = ['not', 'can\'t', 'cannot', 'won\'t', 'don\'t', 'failed', 'broken', 'error']
-        negative_count = sum(1 for word in negative_words if word in text_lower)
+        negative_count = scores['_negative']
         if negative_count > 2:
             urgency_score += 1
         
@@ -98,61 +116,11 @@ class SimpleTicketClassifier:
 
     def extract_entities(self, text):
         """Extract entities using regex patterns"""
-        entities = {"service": None, "device": None, "location": None}
-        
-        # Service patterns
-        service_patterns = [
-            r'\b(office|outlook|teams|sharepoint|onedrive|dropbox|gmail|slack)\b',
-            r'\b(windows|linux|macos|ubuntu|ios|android)\b'
-        ]
-        
-        for pattern in service_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                entities["service"] = match.group(1)
-                break
-        
-        # Device patterns
-        device_patterns = [
-            r'\b(laptop|desktop|computer|pc|server|router|switch|printer|phone)\b'
-        ]
-        
-        for pattern in device_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                entities["device"] = match.group(1)
-                break
-        
-        # Location patterns
-        location_patterns = [
-            r'\b(office|building|floor|room|conference|lobby)\s*\w*\b'
-        ]
-        
-        for pattern in location_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                entities["location"] = match.group().strip()
-                break
-        
-        return entities
+        return self.entity_extractor.extract(text)
 
     def summarize_text(self, text):
-        """Create simple extractive summary"""
-        if not text:
-            return ""
-        
-        sentences = re.split(r'[.!?]+', text.strip())
-        sentences = [s.strip() for s in sentences if len(s.strip()) > 10]
-        
-        if not sentences:
-            return text[:100] + "..." if len(text) > 100 else text
-        
-        # Take first sentence, max 150 chars
-        summary = sentences[0]
-        if len(summary) > 150:
-            summary = summary[:147] + "..."
-        
-        return summary
+        """Create extractive summary (no IDF weights: every word counts the same)"""
+        return summarize(text, matcher=self.matcher, label_weights=self.summary_keyword_weights)
 
 # Initialize classifier
 classifier = SimpleTicketClassifier()
@@ -163,28 +131,42 @@ def health():
 
 @app.route('/analyze', methods=['POST'])
 def analyze():
-    data = request.get_json(force=True, silent=True) or {}
-    description = (data.get('description') or '').strip()
+    try:
+        data = read_json(request.stream, request.content_length) or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "each item must be an object"}), 400
+        for field in ('description', 'requestType', 'audioBase64'):
+            if data.get(field) is not None and not isinstance(data[field], str):
+                return jsonify({"error": f"{field} must be a string"}), 400
+        description = data.get('description') or ''
+        audio_b64 = data.get('audioBase64')
+        check_item(description, audio_b64)
+    except InputTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    description = description.strip()
     request_type = (data.get('requestType') or '').strip()
-    audio_b64 = data.get('audioBase64')
 
     if not description and not audio_b64:
         return jsonify({"error": "description or audioBase64 is required"}), 400
 
-    # Use description text
+    # Use description text; a very large one is analyzed through bounded windows
     text = description
+    input_path, view, windows = split_input(text)
 
     # Category classification
-    category, cat_conf = classifier.classify_category(text, request_type)
+    category, cat_conf = classifier.classify_category(view, request_type)
 
     # Priority detection
-    priority, pri_conf = classifier.detect_priority(text)
+    priority, pri_conf = classifier.detect_priority(view)
 
     # Entity extraction
-    entities = classifier.extract_entities(text)
+    if input_path == FULL:
+        entities = classifier.extract_entities(text)
+    else:
+        entities = merge_entities([classifier.extract_entities(window) for window in windows])
 
     # Summary
-    summary = classifier.summarize_text(text)
+    summary = classifier.summarize_text(view)
 
     return jsonify({
         "category": category,
@@ -194,7 +176,9 @@ def analyze():
         "confidence": {
             "category": round(cat_conf, 3),
             "priority": round(pri_conf, 3)
-        }
+        },
+        "engines": {"category": "rules", "entities": "rules", "priority": "rules", "summary": "rules"},
+        "inputPath": input_path
     })
 
 if __name__ == '__main__':
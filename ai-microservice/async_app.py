@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+asyncio serving path for the AI microservice
+Same models, cache and responses as app.py, served by aiohttp. The CPU-bound
+stages run one at a time on a bounded thread pool, admission is capped so
+overload is refused quickly (429/503) instead of queueing, and a request
+whose client has disconnected stops before its next stage
+
+Usage:
+  python async_app.py
+"""
+
+import asyncio
+import functools
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+import app as service
+from cache import cache_key
+from large_input import MAX_REQUEST_BYTES, InputTooLarge, split_input
+from model_loader import classify_category, keyword_exit, detect_priority, summarize_text, EARLY_EXIT_ENGINES
+from pipeline import parse_item, build_result, analyze_batch, full_engines, ticket_entities
+import wire
+
+# Threads running the CPU-bound stages and persistent cache reads; the event
+# loop itself only parses, looks up the in-process cache and writes responses
+ASYNC_EXECUTOR_THREADS = int(os.environ.get('ASYNC_EXECUTOR_THREADS', 4))
+# Requests admitted at once (queued or running); more get 429 straight away
+ASYNC_MAX_IN_FLIGHT = int(os.environ.get('ASYNC_MAX_IN_FLIGHT', 64))
+# A request still waiting for its first stage after this long is shed with 503
+ASYNC_QUEUE_TIMEOUT_MS = float(os.environ.get('ASYNC_QUEUE_TIMEOUT_MS', 2000))
+# Give up on a request after this long; matches the Node backend's axios timeout
+ASYNC_DEADLINE_MS = float(os.environ.get('ASYNC_DEADLINE_MS', 30000))
+
+
+class Overloaded(Exception):
+    """Raised by a stage that was picked up too late to be worth running"""
+
+
+class StageRunner:
+    """Runs pipeline stages on a bounded executor with admission control"""
+
+    def __init__(self, threads, max_in_flight, queue_timeout_ms, deadline_ms):
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='stage')
+        self.threads = threads
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout_ms / 1000.0
+        self.deadline = deadline_ms / 1000.0
+        self.in_flight = 0
+        # Admission and outcome counters are only touched on the event loop
+        self.counts = Counter()
+
+    def admit(self):
+        """Take an in-flight slot; False when saturated (only called on the event loop)"""
+        if self.in_flight >= self.max_in_flight:
+            self.counts['rejected'] += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+
+    def _guarded(self, fn, admitted, first, args):
+        # Runs on an executor thread; checks are made when the stage is
+        # picked up, so stale work is dropped before it costs any CPU
+        waited = time.monotonic() - admitted
+        if (first and waited > self.queue_timeout) or waited > self.deadline:
+            raise Overloaded(f"waited {waited * 1000.0:.0f}ms")
+        return fn(*args)
+
+    async def run(self, fn, *args, admitted, first=False):
+        """Run one stage off the event loop
+
+        Cancelling the awaiting task (client disconnect) cancels the stage if
+        it has not started yet; a running stage finishes, but no further
+        stages of that request are submitted.
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self._guarded, fn, admitted, first, args)
+        return await loop.run_in_executor(self.executor, call)
+
+    def count(self, outcome):
+        self.counts[outcome] += 1
+
+    def stats(self):
+        return {
+            "threads": self.threads,
+            "maxInFlight": self.max_in_flight,
+            "inFlight": self.in_flight,
+            "queueTimeoutMs": self.queue_timeout * 1000.0,
+            "completed": self.counts['completed'],
+            "rejected": self.counts['rejected'],
+            "shed": self.counts['shed'],
+            "cancelled": self.counts['cancelled'],
+        }
+
+
+async def analyze_ticket(runner, text, request_type, models, admitted):
+    input_path, view, windows = split_input(text)
+    engines = full_engines(models)
+    calibration = models.get('calibration')
+    cascade = models['clf'] is not None and calibration is not None
+    early = None
+    if cascade:
+        early = await runner.run(keyword_exit, view, calibration, admitted=admitted, first=True)
+    if early is not None:
+        (category, cat_conf), nlp = early, None
+        engines.update(EARLY_EXIT_ENGINES)
+    else:
+        category, cat_conf = await runner.run(classify_category, view, models['vectorizer'], models['clf'],
+                                              request_type, calibration, admitted=admitted, first=not cascade)
+        nlp = models['nlp']
+    entities = await runner.run(ticket_entities, input_path, text, windows, nlp, admitted=admitted)
+    priority, pri_conf = await runner.run(detect_priority, view, admitted=admitted)
+    summary = await runner.run(summarize_text, view, models['vectorizer'], admitted=admitted)
+    return build_result(category, cat_conf, priority, pri_conf, summary, entities, engines,
+                        models['version'], input_path)
+
+
+def _overloaded(reason):
+    return web.json_response({"error": "overloaded", "detail": reason}, status=503, headers={"Retry-After": "1"})
+
+
+async def admitted_request(request, handler):
+    """Admission control, shedding and cancellation accounting shared by the analyze routes"""
+    runner = request.app['runner']
+    if not runner.admit():
+        return web.json_response({"error": "too many requests in flight"}, status=429,
+                                 headers={"Retry-After": "1"})
+    try:
+        response = await handler(request, runner, time.monotonic())
+        runner.count('completed')
+        return response
+    except Overloaded as e:
+        runner.count('shed')
+        return _overloaded(str(e))
+    except wire.UnsupportedFormat as e:
+        return web.json_response({"error": str(e)}, status=415)
+    except asyncio.CancelledError:
+        # aiohttp cancels the handler when the client goes away
+        runner.count('cancelled')
+        raise
+    finally:
+        runner.release()
+
+
+async def _analyze(request, runner, admitted):
+    data = await _body(request)
+    try:
+        text, request_type = parse_item(data or {})
+    except InputTooLarge as e:
+        return _reply(request, {"error": str(e)}, status=413)
+    except ValueError as e:
+        return _reply(request, {"error": str(e)}, status=400)
+
+    models = service.serving_models()
+    cache = service.serving_cache()
+    key = cache_key(text, request_type, models['version'])
+    if cache is None:
+        result = None
+    elif cache.store is None:
+        result = cache.get(key)
+    else:
+        # A miss in memory falls through to a SQLite read, which must not
+        # block the event loop
+        result = await runner.run(cache.get, key, admitted=admitted, first=True)
+    if result is None:
+        result = await analyze_ticket(runner, text, request_type, models, admitted)
+        if cache is not None:
+            cache.put(key, result)
+    return _reply(request, result)
+
+
+async def _analyze_many(request, runner, admitted):
+    data = await _body(request)
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return _reply(request, {"error": "expected a JSON array of tickets or {\"items\": [...]}"}, status=400)
+    if len(items) > service.MAX_BATCH_SIZE:
+        return _reply(request, {"error": f"batch too large, max {service.MAX_BATCH_SIZE} items"}, status=413)
+
+    # A batch is already vectorized, so it runs as a single stage
+    results = await runner.run(analyze_batch, items, service.serving_models(), service.serving_cache(),
+                               admitted=admitted, first=True)
+    return _reply(request, {"results": results})
+
+
+async def _body(request):
+    """The request's JSON (or MessagePack, see wire.py) document, or None if it does not parse"""
+    if wire.is_msgpack(request.content_type):
+        return wire.unpack(await request.read())
+    return await request.json(loads=_loads_or_none)
+
+
+def _reply(request, body, status=200):
+    if wire.response_format(request.headers.get('Accept'), request.content_type) == wire.JSON:
+        return web.json_response(body, status=status)
+    return web.Response(body=wire.pack(body), status=status, content_type=wire.MSGPACK)
+
+
+def _loads_or_none(body):
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+async def analyze(request):
+    return await admitted_request(request, _analyze)
+
+
+async def analyze_many(request):
+    return await admitted_request(request, _analyze_many)
+
+
+async def health(request):
+    return web.json_response({"status": "ok"})
+
+
+async def ready(request):
+    if not service.is_ready():
+        return web.json_response({"status": "warming_up"}, status=503)
+    return web.json_response({"status": "ready", "modelVersion": service.MODEL_REGISTRY.current['version']})
+
+
+async def stats(request):
+    return web.json_response({
+        "async": request.app['runner'].stats(),
+        "cache": service.CACHE.stats() if service.CACHE is not None else None,
+    })
+
+
+async def _warm_up(application):
+    # Eager warm-up runs before the server accepts connections; with
+    # WARMUP=background importing app.py has already started it
+    if service.WARMUP != 'background' and not service.is_ready():
+        await asyncio.get_running_loop().run_in_executor(application['runner'].executor, service.warm_up)
+
+
+async def _shutdown(application):
+    application['runner'].executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_app():
+    # aiohttp reads the body in chunks itself and answers 413 past client_max_size
+    application = web.Application(client_max_size=MAX_REQUEST_BYTES)
+    application['runner'] = StageRunner(ASYNC_EXECUTOR_THREADS, ASYNC_MAX_IN_FLIGHT,
+                                        ASYNC_QUEUE_TIMEOUT_MS, ASYNC_DEADLINE_MS)
+    application.on_startup.append(_warm_up)
+    application.on_cleanup.append(_shutdown)
+    application.router.add_get('/health', health)
+    application.router.add_get('/ready', ready)
+    application.router.add_post('/analyze', analyze)
+    application.router.add_post('/analyze/batch', analyze_many)
+    application.router.add_get('/stats', stats)
+    return application
+
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 3002))
+    # handler_cancellation: a client disconnect cancels its handler task
+    web.run_app(create_app(), host='0.0.0.0', port=port, handler_cancellation=True)
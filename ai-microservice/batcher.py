@@ -0,0 +1,105 @@
+"""
+Micro-batching request coalescer
+Holds concurrent single requests for a few milliseconds and hands them to
+the model as one batch, then routes each result back to its caller
+"""
+
+import threading
+import time
+import queue
+from collections import Counter
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Coalesce concurrent submit() calls into batched process_batch() calls
+
+    process_batch receives a list of items and must return a list of the same
+    length holding either a result or an Exception for each item. in_flight,
+    if given, returns how many requests could still submit an item; once no
+    more are in flight than are already in the batch, it is run at once
+    instead of waiting out max_wait_ms for company that cannot come.
+    """
+
+    def __init__(self, process_batch, max_batch_size=32, max_wait_ms=5, in_flight=None):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.in_flight = in_flight
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._items = 0
+        self._wait_total = 0.0
+        self._thread = None
+
+    def submit(self, item, timeout=None):
+        """Queue one item and block until its result is ready"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future.result(timeout=timeout)
+
+    def stats(self):
+        """Batch-size distribution actually achieved so far"""
+        with self._lock:
+            batches = sum(self._batch_sizes.values())
+            return {
+                "maxBatchSize": self.max_batch_size,
+                "maxWaitMs": self.max_wait * 1000.0,
+                "batches": batches,
+                "items": self._items,
+                "meanBatchSize": round(self._items / batches, 3) if batches else 0.0,
+                "meanQueueWaitMs": round(self._wait_total / self._items * 1000.0, 3) if self._items else 0.0,
+                "batchSizes": {str(size): count for size, count in sorted(self._batch_sizes.items())}
+            }
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                    self._thread.start()
+
+    def _collect(self):
+        """Block for the first item, then gather more until full or the window closes"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0 or self._alone(len(batch)):
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _alone(self, batched):
+        return self.in_flight is not None and self.in_flight() <= batched
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            items = [item for item, _, _ in batch]
+
+            try:
+                outcomes = self.process_batch(items)
+            except Exception as e:
+                outcomes = [e] * len(batch)
+
+            for (_, future, queued_at), outcome in zip(batch, outcomes):
+                if isinstance(outcome, Exception):
+                    future.set_exception(outcome)
+                else:
+                    future.set_result(outcome)
+
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+                self._items += len(batch)
+                self._wait_total += sum(started - queued_at for _, _, queued_at in batch)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: keyword-first cascade against the full pipeline
+Runs pipeline.analyze_text over labeled tickets with the cascade off and at
+each --threshold, with the models and calibration in models/ (run train.py
+first), and reports the share of tickets that exit at the keyword scorer,
+category accuracy, and mean/p95 latency per ticket. The default tickets are
+the typical and short shapes from bench_pipeline, which come from
+train.TRAINING_DATA, so the model's accuracy on them is optimistic; pass
+--data with a labeled JSONL/CSV export for held-out numbers. NER is only
+skipped (and only saves time) when en_core_web_sm is installed
+Run from ai-microservice/: python benchmarks/bench_cascade.py
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+os.environ.setdefault('CACHE_MAX_ENTRIES', '0')
+
+import model_loader
+from bench_pipeline import make_tickets
+from model_loader import load_models, CASCADE_STATS
+from pipeline import analyze_text
+from train_stream import read_labeled
+
+
+def run(tickets, models, threshold, repeat):
+    model_loader.CASCADE_MIN_CONFIDENCE = threshold
+    CASCADE_STATS.clear()
+    latencies, correct = [], 0
+    for _ in range(repeat):
+        for text, label in tickets:
+            started = time.perf_counter()
+            result = analyze_text(text, '', models)
+            latencies.append(time.perf_counter() - started)
+            correct += result['category'] == label
+    latencies.sort()
+    decided = CASCADE_STATS['early_exit'] + CASCADE_STATS['model']
+    return {
+        "threshold": threshold,
+        "earlyExitFraction": round(CASCADE_STATS['early_exit'] / decided, 3) if decided else 0.0,
+        "accuracy": round(correct / len(latencies), 3),
+        "meanMs": round(sum(latencies) / len(latencies) * 1000.0, 3),
+        "p95Ms": round(latencies[int(len(latencies) * 0.95)] * 1000.0, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threshold', type=float, nargs='+', default=[0.8, 0.9, 0.95])
+    parser.add_argument('--data', help='labeled JSONL/CSV export (description, category) to use instead')
+    parser.add_argument('--tickets', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args()
+
+    models = load_models()
+    if models['clf'] is None:
+        sys.exit("no classifier models found; run train.py first")
+    if models['calibration'] is None:
+        sys.exit("no models/calibration.json; run train.py to fit the calibration curves")
+
+    if args.data:
+        tickets = [(text, label) for _, text, label in itertools.islice(read_labeled(args.data), args.tickets)]
+    else:
+        tickets = make_tickets('typical', args.tickets // 2) + make_tickets('short', args.tickets - args.tickets // 2)
+    print(f"{len(tickets)} tickets, model {models['version']}, NER {'on' if models['nlp'] else 'off'}")
+
+    run(tickets[:50], models, 0, 1)  # warm-up
+    results = [run(tickets, models, threshold, args.repeat) for threshold in [0] + args.threshold]
+    full = results[0]
+    print(f"{'threshold':>10} {'early exit':>11} {'accuracy':>9} {'mean ms':>9} {'p95 ms':>9} {'speedup':>8}")
+    for result in results:
+        print(f"{result['threshold'] or 'off':>10} {result['earlyExitFraction']:>11.1%} {result['accuracy']:>9.3f} "
+              f"{result['meanMs']:>9.3f} {result['p95Ms']:>9.3f} {full['meanMs'] / result['meanMs']:>7.2f}x")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"tickets": len(tickets), "modelVersion": models['version'], "ner": bool(models['nlp']),
+                       "results": results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: near-duplicate index lookups with 1M indexed tickets
+Indexes --entries tickets drawn from a pool of seeded synthetic tickets
+(vectorized once with the serving vectorizer), then times --lookups queries
+and reports insert rate, lookup p50/p95/p99 and the memory the index holds.
+"novel" queries are pathological tickets that were never indexed: they have
+few or no duplicates, so their lookups walk every window of the index
+Run from ai-microservice/: python benchmarks/bench_dedup.py
+"""
+
+import os
+import sys
+import math
+import time
+import random
+import argparse
+import resource
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dedup import DuplicateIndex, row_terms
+from model_loader import load_classifier
+from bench_pipeline import make_tickets
+
+
+def rss_mb():
+    # Current resident set, from /proc on Linux; peak RSS elsewhere
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def percentile(ordered, q):
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=1000000)
+    parser.add_argument('--pool', type=int, default=20000, help='distinct tickets the entries are drawn from')
+    parser.add_argument('--lookups', type=int, default=1000)
+    parser.add_argument('--threshold', type=float, default=0.8)
+    parser.add_argument('--top-k', type=int, default=5)
+    args = parser.parse_args()
+
+    models = load_classifier()
+    if models['vectorizer'] is None:
+        sys.exit("No classifier models found. Run train.py first.")
+    rng = random.Random(42)
+    kinds = [kind for kind in ('short', 'typical', 'long') for _ in range(args.pool // 3)]
+    texts = [text for kind in ('short', 'typical', 'long') for text, _ in make_tickets(kind, args.pool // 3)]
+    matrix = models['vectorizer'].transform(texts)
+    pool = [(kind, row_terms(matrix, i)) for i, kind in enumerate(kinds)]
+    pool = [(kind, terms) for kind, terms in pool if len(terms[0])]
+    rows = models['vectorizer'].transform([text for text, _ in make_tickets('pathological', 200, seed=7)])
+    novel = [('novel', row_terms(rows, i)) for i in range(200)]
+    novel = [(kind, terms) for kind, terms in novel if len(terms[0])]
+    print(f"pool: {len(pool)} tickets, vocabulary: {len(models['vectorizer'].vocabulary)} terms, "
+          f"{sum(len(terms[0]) for _, terms in pool) / len(pool):.1f} terms/ticket")
+
+    before = rss_mb()
+    index = DuplicateIndex(max_entries=args.entries, ttl_seconds=0)
+    started = time.perf_counter()
+    for i in range(args.entries):
+        index.add(i, pool[rng.randrange(len(pool))][1])
+    insert_seconds = time.perf_counter() - started
+    held = rss_mb() - before
+    stats = index.stats()
+    print(f"indexed {stats['entries']} tickets in {insert_seconds:.1f}s ({args.entries / insert_seconds:,.0f}/s), "
+          f"{stats['postings']:,} postings, ~{held:.0f} MB")
+
+    latencies, found = {}, 0
+    for _ in range(args.lookups):
+        kind, terms = novel[rng.randrange(len(novel))] if rng.random() < 0.1 else pool[rng.randrange(len(pool))]
+        t0 = time.perf_counter()
+        matches = index.query(terms, args.threshold, args.top_k)
+        latencies.setdefault(kind, []).append(time.perf_counter() - t0)
+        latencies.setdefault('all', []).append(latencies[kind][-1])
+        found += bool(matches)
+    print(f"{found}/{args.lookups} lookups found duplicates at cosine >= {args.threshold}")
+    print(f"{'lookup ms':<10} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for kind, samples in latencies.items():
+        samples.sort()
+        print(f"{kind:<10} {percentile(samples, 0.5) * 1e3:>8.2f} {percentile(samples, 0.95) * 1e3:>8.2f} "
+              f"{percentile(samples, 0.99) * 1e3:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
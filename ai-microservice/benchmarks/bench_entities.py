@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: single-scan EntityExtractor vs the old per-pattern re.search loop
+Run from ai-microservice/: python benchmarks/bench_entities.py
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from entities import EntityExtractor, SERVICE_RULES, DEVICE_RULES, LOCATION_RULES
+
+
+def legacy_extract(text):
+    """The pre-extractor _fallback_entity_extraction, kept for comparison"""
+    entities = {"service": None, "device": None, "location": None}
+    for slot, rules in (("service", SERVICE_RULES), ("device", DEVICE_RULES), ("location", LOCATION_RULES)):
+        for rule in rules:
+            match = re.search(rule['pattern'], text, re.IGNORECASE)
+            if match:
+                entities[slot] = match.group().strip()
+                break
+    return entities
+
+
+FILLER = ("the user reports that the issue started after the last update and persists "
+          "across restarts; logs attached below show repeated retries and timeouts ").split()
+
+
+def make_ticket(rng, words, entity_position):
+    """Long ticket body with entity mentions near the start, the end, or nowhere"""
+    body = [rng.choice(FILLER) for _ in range(words)]
+    mentions = ["outlook", "keeps", "crashing", "on", "my", "laptop", "in", "building", "7"]
+    if entity_position == 'start':
+        body[5:5] = mentions
+    elif entity_position == 'end':
+        body.extend(mentions)
+    return ' '.join(body)
+
+
+def bench(fn, texts, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--words', type=int, default=5000, help='words per ticket body')
+    parser.add_argument('--tickets', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    extractor = EntityExtractor(SERVICE_RULES + DEVICE_RULES + LOCATION_RULES)
+
+    print(f"{'case':<8} {'legacy us':>12} {'single-scan us':>15} {'speedup':>8}")
+    for position in ('start', 'end', 'none'):
+        texts = [make_ticket(rng, args.words, position) for _ in range(args.tickets)]
+        for text in texts:
+            assert extractor.extract(text) == legacy_extract(text), text[:80]
+        legacy = bench(legacy_extract, texts, args.repeat)
+        single = bench(extractor.extract, texts, args.repeat)
+        print(f"{position:<8} {legacy * 1e6:>12.1f} {single * 1e6:>15.1f} {legacy / single:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
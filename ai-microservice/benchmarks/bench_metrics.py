@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-request cost of the /metrics instrumentation
+Replays the metric updates one /analyze request makes (input length, four
+stage histograms, four engine counters, parse and request histograms and
+their timer reads) and fails if they cost more than --max-us per request,
+net of the benchmark loop itself
+Run from ai-microservice/: python benchmarks/bench_metrics.py
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from metrics import REGISTRY, REQUEST_SECONDS, PARSE_SECONDS, INPUT_CHARS
+from pipeline import observe_stages
+
+ENGINES = {"category": "model", "entities": "ner", "priority": "lexicon", "summary": "extractive"}
+
+
+def one_request(elapsed):
+    clock = time.perf_counter
+    started = clock()
+    parse_started = clock()
+    PARSE_SECONDS.observe(clock() - parse_started, ('/analyze',))
+    INPUT_CHARS.observe(180)
+    observe_stages(elapsed, ENGINES)
+    REQUEST_SECONDS.observe(clock() - started, ('/analyze',))
+
+
+def no_request(elapsed):
+    return elapsed
+
+
+def loop_time(fn, requests, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        stages = [{"classify": 0.0001 * (i % 50), "entities": 0.002, "priority": 0.0002, "summary": 0.00002}
+                  for i in range(1000)]
+        start = time.perf_counter()
+        for i in range(requests):
+            fn(stages[i % 1000])
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-us', type=float, default=10.0, help='fail above this many microseconds per request')
+    args = parser.parse_args()
+
+    overhead = loop_time(one_request, args.requests, args.repeat) - loop_time(no_request, args.requests, args.repeat)
+    per_request = overhead / args.requests * 1e6
+
+    start = time.perf_counter()
+    body = REGISTRY.render()
+    render_ms = (time.perf_counter() - start) * 1000.0
+
+    print(f"instrumentation: {per_request:.2f} us/request (limit {args.max_us} us)")
+    print(f"/metrics render: {render_ms:.2f} ms for {len(body.splitlines())} lines")
+    sys.exit(1 if per_request > args.max_us else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the analysis pipeline
+Microbenchmarks of each stage function (model_loader and the app_minimal
+rule engine) and an in-process load test of both Flask apps, over seeded
+synthetic tickets built from train.TRAINING_DATA in four shapes: short,
+typical, long and pathological. Writes JSON with throughput, p50/p95/p99
+and peak RSS per benchmark, and with --baseline flags (exit 1) anything
+that got slower, or bigger, by more than --tolerance
+
+Run from ai-microservice/:
+  python benchmarks/bench_pipeline.py --output bench.json --save-baseline baseline.json   # on main
+  python benchmarks/bench_pipeline.py --output bench.json --baseline baseline.json        # on a branch
+"""
+
+import os
+import sys
+import json
+import time
+import math
+import random
+import argparse
+import platform
+import resource
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# Measure the pipeline, not the cache or the coalescer's wait for company
+os.environ.setdefault('CACHE_MAX_ENTRIES', '0')
+os.environ.setdefault('COALESCE_WAIT_MS', '0')
+
+from train import TRAINING_DATA
+
+KINDS = ('short', 'typical', 'long', 'pathological')
+
+OPENERS = ["", "Hi team, ", "URGENT: ", "Hello, ", "FYI - "]
+CLOSERS = ["", " Thanks.", " Please help asap!", " Not urgent.", " This is really frustrating."]
+FILLER = ("the user reports that the issue started after the last update and persists "
+          "across restarts while the logs show repeated retries and timeouts").split()
+LOG_LINE = "2024-05-01T10:{:02d}:{:02d}Z ERROR [worker-{}] connection reset by peer (errno=104) retry={}"
+
+
+def _short(rng):
+    text, label = rng.choice(TRAINING_DATA)
+    return ' '.join(text.split()[:rng.randint(1, 3)]), label
+
+
+def _typical(rng):
+    text, label = rng.choice(TRAINING_DATA)
+    return rng.choice(OPENERS) + text + '.' + rng.choice(CLOSERS), label
+
+
+def _long(rng):
+    text, label = rng.choice(TRAINING_DATA)
+    sentences = [' '.join(rng.choice(FILLER) for _ in range(rng.randint(8, 25))) + '.' for _ in range(80)]
+    logs = [LOG_LINE.format(i % 60, rng.randint(0, 59), rng.randint(1, 8), i) for i in range(60)]
+    return text + '. ' + ' '.join(sentences) + '\n' + '\n'.join(logs), label
+
+
+PATHOLOGICAL = [
+    lambda rng: 'a' * 20000,                                               # one 20k-char token
+    lambda rng: '!' * 5000,                                                # punctuation only
+    lambda rng: 'urgent critical down outage broken ' * 400,               # every keyword, repeated
+    lambda rng: 'building floor room ' * 1000,                             # location pattern bait
+    lambda rng: '. ' * 5000 + 'printer jam',                               # thousands of empty sentences
+    lambda rng: 'Drücker kaputt 😡 café wifi ✈ ' * 500,                    # non-ASCII and emoji
+    lambda rng: ''.join(rng.choice('{}[]":,0123456789abcdef') for _ in range(20000)),  # pasted JSON
+    lambda rng: 'password ' + ' '.join(str(rng.randint(0, 10 ** 9)) for _ in range(3000)),
+]
+
+
+def _pathological(rng):
+    return rng.choice(PATHOLOGICAL)(rng), rng.choice(TRAINING_DATA)[1]
+
+
+_GENERATORS = {'short': _short, 'typical': _typical, 'long': _long, 'pathological': _pathological}
+
+
+def make_tickets(kind, count, seed=42):
+    """[(text, request type)] of one shape; the same seed always gives the same tickets"""
+    rng = random.Random(f"{seed}:{kind}")
+    return [_GENERATORS[kind](rng) for _ in range(count)]
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0), 1)
+
+
+def _percentile(ordered, q):
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def summarize(latencies, wall_seconds, errors=0):
+    ordered = sorted(latencies)
+    return {
+        "calls": len(ordered),
+        "errors": errors,
+        "throughput": round(len(ordered) / wall_seconds, 1),
+        "p50_us": round(_percentile(ordered, 0.50) * 1e6, 1),
+        "p95_us": round(_percentile(ordered, 0.95) * 1e6, 1),
+        "p99_us": round(_percentile(ordered, 0.99) * 1e6, 1),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def time_calls(fn, tickets, repeat):
+    """Per-call latencies of fn(text, request_type) over the tickets, after one warm-up pass"""
+    for text, request_type in tickets[:5]:
+        fn(text, request_type)
+    clock = time.perf_counter
+    latencies = []
+    started = clock()
+    for _ in range(repeat):
+        for text, request_type in tickets:
+            t0 = clock()
+            fn(text, request_type)
+            latencies.append(clock() - t0)
+    return latencies, clock() - started
+
+
+def stage_functions():
+    """name -> fn(text, request_type) for every stage of both engines"""
+    import model_loader
+    from app_minimal import classifier as rules
+
+    models = model_loader.load_models()
+    vectorizer, clf, nlp = models['vectorizer'], models['clf'], models['nlp']
+    return {
+        "model_loader.classify_category": lambda text, rt: model_loader.classify_category(text, vectorizer, clf, rt),
+        "model_loader.extract_entities": lambda text, rt: model_loader.extract_entities(text, nlp),
+        "model_loader.detect_priority": lambda text, rt: model_loader.detect_priority(text),
+        "model_loader.summarize_text": lambda text, rt: model_loader.summarize_text(text, vectorizer),
+        "app_minimal.classify_category": lambda text, rt: rules.classify_category(text, rt),
+        "app_minimal.extract_entities": lambda text, rt: rules.extract_entities(text),
+        "app_minimal.detect_priority": lambda text, rt: rules.detect_priority(text),
+        "app_minimal.summarize_text": lambda text, rt: rules.summarize_text(text),
+    }, models
+
+
+def load_test(client, tickets, repeat, concurrency):
+    """POST every ticket to /analyze from `concurrency` threads; returns (latencies, wall seconds, errors)"""
+    payloads = [{"description": text, "requestType": request_type} for text, request_type in tickets] * repeat
+    clock = time.perf_counter
+
+    def post(payload):
+        t0 = clock()
+        status = client.post('/analyze', json=payload).status_code
+        return clock() - t0, status != 200
+
+    started = clock()
+    if concurrency <= 1:
+        outcomes = [post(payload) for payload in payloads]
+    else:
+        with ThreadPoolExecutor(concurrency) as pool:
+            outcomes = list(pool.map(post, payloads))
+    wall = clock() - started
+    return [latency for latency, _ in outcomes], wall, sum(failed for _, failed in outcomes)
+
+
+def run_suite(args):
+    corpus = {kind: make_tickets(kind, args.tickets, args.seed) for kind in KINDS}
+    results = {}
+
+    functions, models = stage_functions()
+    for name, fn in functions.items():
+        for kind in KINDS:
+            latencies, wall = time_calls(fn, corpus[kind], args.repeat)
+            results[f"micro/{name}/{kind}"] = summarize(latencies, wall)
+
+    import app as service
+    import app_minimal
+    service.warm_up()
+    for app_name, flask_app in (("app", service.app), ("app_minimal", app_minimal.app)):
+        client = flask_app.test_client()
+        for kind in KINDS:
+            client.post('/analyze', json={"description": corpus[kind][0][0]})
+            latencies, wall, errors = load_test(client, corpus[kind], args.repeat, args.concurrency)
+            results[f"e2e/{app_name}/{kind}"] = summarize(latencies, wall, errors)
+
+    return {
+        "meta": {
+            "seed": args.seed,
+            "tickets": args.tickets,
+            "repeat": args.repeat,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "modelVersion": models['version'],
+            "ner": models['nlp'] is not None,
+            "created": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        },
+        "results": results,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Benchmarks whose p95 or peak RSS grew, or whose throughput fell, by more than tolerance"""
+    regressions = []
+    for name, current in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            continue
+        for metric, worse_if_higher in (("p95_us", True), ("throughput", False), ("peak_rss_mb", True)):
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change > tolerance) if worse_if_higher else (change < -tolerance):
+                regressions.append({"benchmark": name, "metric": metric, "baseline": old, "current": new,
+                                    "change": round(change, 3)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickets', type=int, default=100, help='tickets per shape')
+    parser.add_argument('--repeat', type=int, default=3, help='passes over the tickets per benchmark')
+    parser.add_argument('--concurrency', type=int, default=1, help='client threads in the load test')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', help='report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative change before flagging')
+    parser.add_argument('--save-baseline', help='also write this run as the new baseline')
+    args = parser.parse_args()
+
+    report = run_suite(args)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        for key in ('seed', 'tickets', 'repeat', 'concurrency', 'cpus'):
+            if baseline.get('meta', {}).get(key) != report['meta'][key]:
+                print(f"Warning: baseline was run with {key}={baseline.get('meta', {}).get(key)}, "
+                      f"this run with {key}={report['meta'][key]}", file=sys.stderr)
+        report['regressions'] = compare(report, baseline, args.tolerance)
+
+    body = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(body + '\n')
+    else:
+        print(body)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            f.write(body + '\n')
+
+    for regression in report.get('regressions', []):
+        print("REGRESSION {benchmark} {metric}: {baseline} -> {current} ({change:+.0%})".format(**regression),
+              file=sys.stderr)
+    sys.exit(1 if report.get('regressions') else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: on-disk result store under multi-process contention
+Fills a fresh store with --entries results shaped like /analyze responses,
+then runs 1, 2, 4... --max-procs processes at once, each doing --lookups
+lookups of random keys (--miss-rate of them absent, each miss followed by a
+put, as the service does). Reports hit, miss and write p50/p95/p99 and the
+aggregate lookup rate per process count, next to the in-process LRU tier
+Run from ai-microservice/: python benchmarks/bench_result_store.py
+"""
+
+import os
+import sys
+import math
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from cache import AnalysisCache
+from result_store import ResultStore
+
+RESULT = {
+    "category": "Network", "priority": "High", "summary": "VPN drops every few minutes for the whole team",
+    "entities": {"service": "VPN", "device": None, "location": "floor 3"},
+    "confidence": {"category": 0.912, "priority": 0.8},
+    "engines": {"category": "model", "entities": "ner", "priority": "lexicon", "summary": "extractive"},
+    "modelVersion": "59c7acc5fd8b",
+}
+
+
+def key(i):
+    return hashlib.sha256(str(i).encode()).hexdigest()
+
+
+def percentile(ordered, q):
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)] if ordered else float('nan')
+
+
+def _worker(args):
+    path, entries, lookups, miss_rate, seed = args
+    store = ResultStore(path, max_entries=entries * 2, ttl_seconds=0)
+    rng = random.Random(seed)
+    hits, misses, writes = [], [], []
+    started = time.perf_counter()
+    for n in range(lookups):
+        absent = rng.random() < miss_rate
+        k = key(entries + seed * lookups + n if absent else rng.randrange(entries))
+        t0 = time.perf_counter()
+        value = store.get(k)
+        t1 = time.perf_counter()
+        if value is None:
+            misses.append(t1 - t0)
+            store.put(k, RESULT)
+            writes.append(time.perf_counter() - t1)
+        else:
+            hits.append(t1 - t0)
+    store.flush()
+    return hits, misses, writes, time.perf_counter() - started, store.errors + store.dropped
+
+
+def row(name, samples):
+    samples.sort()
+    return (f"{name:<8} {len(samples):>8} {percentile(samples, 0.5) * 1e6:>9.1f} "
+            f"{percentile(samples, 0.95) * 1e6:>9.1f} {percentile(samples, 0.99) * 1e6:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=200000)
+    parser.add_argument('--lookups', type=int, default=20000, help='per process')
+    parser.add_argument('--miss-rate', type=float, default=0.1)
+    parser.add_argument('--max-procs', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'results.db')
+        store = ResultStore(path, max_entries=args.entries * 2, ttl_seconds=0)
+        started = time.perf_counter()
+        for start in range(0, args.entries, 10000):
+            store.put_many([(key(i), RESULT) for i in range(start, min(start + 10000, args.entries))])
+        print(f"filled {args.entries} entries in {time.perf_counter() - started:.1f}s, "
+              f"{os.path.getsize(path) / 2 ** 20:.0f} MB")
+
+        memory = AnalysisCache(args.entries)
+        for i in range(args.entries):
+            memory.put(key(i), RESULT)
+        keys = [key(random.randrange(args.entries)) for _ in range(args.lookups)]
+        t0 = time.perf_counter()
+        for k in keys:
+            memory.get(k)
+        print(f"in-process LRU hit: {(time.perf_counter() - t0) / len(keys) * 1e6:.1f} us mean")
+
+        procs = 1
+        while procs <= args.max_procs:
+            with Pool(procs) as pool:
+                t0 = time.perf_counter()
+                outcomes = pool.map(_worker, [(path, args.entries, args.lookups, args.miss_rate, seed)
+                                              for seed in range(procs)])
+                wall = time.perf_counter() - t0
+            print(f"\n{procs} process(es): {procs * args.lookups / wall:,.0f} lookups/s, "
+                  f"{sum(o[4] for o in outcomes)} errors or dropped writes")
+            print(f"{'us':<8} {'count':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+            for name, index in (('hit', 0), ('miss', 1), ('put', 2)):
+                print(row(name, [sample for outcome in outcomes for sample in outcome[index]]))
+            procs *= 2
+
+
+if __name__ == '__main__':
+    main()
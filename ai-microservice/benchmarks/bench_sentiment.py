@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: lexicon sentiment scorer vs TextBlob(text).sentiment.polarity
+Reports how often the two agree (exact polarity, and the polarity < -0.1
+decision detect_priority actually uses) and how long each takes per ticket.
+Expected differences: the lexicon scorer negates "isn't"/"can't" (TextBlob
+splits them into "isn ' t") and does not read ": {" in pasted JSON as a frown.
+Run from ai-microservice/: python benchmarks/bench_sentiment.py
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from textblob import TextBlob
+
+from sentiment import load_lexicon_sentiment
+from train import TRAINING_DATA
+
+NEGATIVE_THRESHOLD = -0.1
+
+OPENERS = ["", "Hi team, ", "URGENT: ", "Hello, ", "FYI - "]
+COMPLAINTS = [
+    "the vpn is not working", "my laptop is extremely slow", "outlook keeps crashing",
+    "the printer isn't printing anything", "I can't login to the portal",
+    "wifi is really bad on floor 3", "the new update is terrible", "backups never finish",
+    "the server is down again", "access is not too bad but sometimes slow",
+]
+MOODS = [
+    "", " This is very frustrating.", " Thanks, great work!", " Not a big deal.",
+    " It's quite annoying!!", " Please help :(", " Really not good.", " Happy to test :)",
+    " Nothing urgent.", " Absolutely awful experience", " Not bad, just slow.",
+    " The workaround isn't good.", " Log: {code: 500, retry: true}", " Support was helpful, the fix wasn't.",
+]
+
+
+def make_corpus(rng, size):
+    """Training tickets plus synthetic ones with negations, intensifiers and '!'"""
+    corpus = [text for text, _ in TRAINING_DATA]
+    while len(corpus) < size:
+        corpus.append(rng.choice(OPENERS) + rng.choice(COMPLAINTS) + rng.choice(MOODS) + rng.choice(MOODS))
+    return corpus
+
+
+def textblob_polarity(text):
+    return TextBlob(text).sentiment.polarity
+
+
+def bench(fn, texts, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tickets', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--show', type=int, default=5, help='disagreements to print')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    texts = make_corpus(rng, args.tickets)
+    lexicon = load_lexicon_sentiment()
+
+    expected = [textblob_polarity(text) for text in texts]
+    actual = [lexicon.polarity(text) for text in texts]
+
+    exact = sum(abs(e - a) < 1e-9 for e, a in zip(expected, actual))
+    decisions = sum((e < NEGATIVE_THRESHOLD) == (a < NEGATIVE_THRESHOLD) for e, a in zip(expected, actual))
+    mean_error = sum(abs(e - a) for e, a in zip(expected, actual)) / len(texts)
+
+    print(f"corpus: {len(texts)} tickets, lexicon: {len(lexicon)} words")
+    print(f"exact polarity agreement:        {exact / len(texts):7.2%}")
+    print(f"priority decision agreement:     {decisions / len(texts):7.2%}  (polarity < {NEGATIVE_THRESHOLD})")
+    print(f"mean absolute polarity error:    {mean_error:.4f}")
+
+    shown = 0
+    for text, e, a in zip(texts, expected, actual):
+        if shown < args.show and (e < NEGATIVE_THRESHOLD) != (a < NEGATIVE_THRESHOLD):
+            print(f"  differs: textblob={e:+.3f} lexicon={a:+.3f} {text!r}")
+            shown += 1
+
+    textblob_time = bench(textblob_polarity, texts, args.repeat)
+    lexicon_time = bench(lexicon.polarity, texts, args.repeat)
+    print(f"{'textblob us':>12} {'lexicon us':>12} {'speedup':>8}")
+    print(f"{textblob_time * 1e6:>12.1f} {lexicon_time * 1e6:>12.1f} {textblob_time / lexicon_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: extractive summarizer on 100KB tickets
+Times summarize_text (with the serving vectorizer's IDF weights) against
+the previous first-sentences summarizer on large tickets of five shapes:
+an email thread with quoted replies, a log dump with the request at the
+bottom, a long prose report, a single 100KB line, and pasted JSON. Then
+doubles the input size to show the cost grows linearly (the ms/KB column
+stays flat), and prints each shape's summary
+Run from ai-microservice/: python benchmarks/bench_summarizer.py
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_pipeline import FILLER, LOG_LINE
+from model_loader import load_classifier, summarize_text
+from train import TRAINING_DATA
+
+
+def first_sentences(text):
+    """The summarizer before scoring: first one or two sentences"""
+    if not text:
+        return ""
+    sentences = [s.strip() for s in re.split(r'[.!?]+', text.strip()) if len(s.strip()) > 10]
+    if not sentences:
+        return text[:100] + "..." if len(text) > 100 else text
+    summary = sentences[0]
+    if len(summary) < 80 and len(sentences) > 1:
+        summary += ". " + sentences[1]
+    return summary[:147] + "..." if len(summary) > 150 else summary
+
+
+def _prose(rng, size):
+    sentences = []
+    while sum(len(s) + 1 for s in sentences) < size:
+        sentences.append(' '.join(rng.choice(FILLER) for _ in range(rng.randint(8, 25))).capitalize() + '.')
+    return ' '.join(sentences)
+
+
+def email_thread(rng, size):
+    parts = ["Hi team,", rng.choice(TRAINING_DATA)[0] + " and it is urgent.", "Thanks,", "Dana"]
+    while sum(len(p) for p in parts) < size:
+        parts.append(f"On Mon, May {rng.randint(1, 28)}, 2024 at 10:00 AM Sam <sam@example.com> wrote:")
+        parts += ['> ' + line for line in _prose(rng, 2000).split('. ')]
+    return '\n'.join(parts)
+
+
+def log_dump(rng, size):
+    lines = ["Hello,", "Logs from the client below."]
+    while sum(len(line) for line in lines) < size:
+        lines.append(LOG_LINE.format(len(lines) % 60, rng.randint(0, 59), rng.randint(1, 8), len(lines)))
+    return '\n'.join(lines + [rng.choice(TRAINING_DATA)[0] + ", this is critical and needs a fix asap."])
+
+
+def prose_report(rng, size):
+    return rng.choice(TRAINING_DATA)[0] + '. ' + _prose(rng, size)
+
+
+def one_line(rng, size):
+    return ' '.join(rng.choice(FILLER) for _ in range(size // 6))[:size]
+
+
+def pasted_json(rng, size):
+    return 'Portal returns this:\n' + ''.join(rng.choice('{}[]":,0123456789abcdef') for _ in range(size))
+
+
+SHAPES = {'email thread': email_thread, 'log dump': log_dump, 'prose report': prose_report,
+          'one line': one_line, 'pasted json': pasted_json}
+
+
+def bench(fn, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--kb', type=int, default=100, help='ticket size in KB')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    vectorizer = load_classifier()['vectorizer']
+    summarize = lambda text: summarize_text(text, vectorizer)
+    summarize('warm up the term weights')
+    size = args.kb * 1024
+
+    print(f"{'shape':<14} {'KB':>5} {'scored ms':>10} {'ms/KB':>7} {'first-sentence ms':>18}")
+    for name, make in SHAPES.items():
+        for scale in (1, 2, 4):
+            text = make(random.Random(42), size * scale)
+            scored = bench(summarize, text, args.repeat)
+            baseline = bench(first_sentences, text, args.repeat)
+            print(f"{name:<14} {len(text) // 1024:>5} {scored * 1e3:>10.2f} {scored * 1e3 / (len(text) / 1024):>7.3f} "
+                  f"{baseline * 1e3:>18.2f}")
+
+    print()
+    for name, make in SHAPES.items():
+        text = make(random.Random(42), size)
+        print(f"{name}:\n  scored:         {summarize(text)!r}\n  first-sentence: {first_sentences(text)!r}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streaming training on a large synthetic export
+Writes --tickets labeled tickets (train.TRAINING_DATA in the typical shape,
+plus a few words from a large random vocabulary so the term table grows like
+a real export) to a temporary JSONL file, trains on it with
+train_stream.train_streaming and reports throughput, peak memory of the main
+process and the training workers, and held-out accuracy per candidate. The
+winning model is exported to model.bin and checked against sklearn
+Run from ai-microservice/: python benchmarks/bench_training.py
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_pipeline import _typical
+from model_artifact import export_model, load_model
+from train_stream import train_streaming
+
+
+def write_export(path, count, seed=42):
+    rng = random.Random(seed)
+    noise = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 9)))
+             for _ in range(50000)]
+    with open(path, 'w', encoding='utf-8') as f:
+        for _ in range(count):
+            text, label = _typical(rng)
+            text += ' ' + ' '.join(rng.choice(noise) for _ in range(rng.randint(0, 6)))
+            f.write(json.dumps({"description": text, "category": label}) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tickets', type=int, default=1000000)
+    parser.add_argument('--epochs', type=int, default=2)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--output', help='write the report as JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data = os.path.join(tmp, 'tickets.jsonl')
+        write_export(data, args.tickets)
+        print(f"export: {args.tickets} tickets, {os.path.getsize(data) / 2 ** 20:.0f} MB")
+
+        vectorizer, clf, smoke_set, _, report = train_streaming(
+            data, epochs=args.epochs, workers=args.workers, chunk_size=args.chunk_size)
+
+        artifact = os.path.join(tmp, 'model.bin')
+        export_model(vectorizer, clf, artifact)
+        engine, _ = load_model(artifact)
+        texts = smoke_set['texts']
+        agree = sum(a == b for a, (b, _) in zip(clf.predict(vectorizer.transform(texts)), engine.predict(texts)))
+        report['artifactAgreement'] = agree / max(len(texts), 1)
+        print(f"model.bin agrees with sklearn on {agree}/{len(texts)} held-out tickets")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark: JSON against MessagePack on the /analyze wire
+Builds real /analyze results (pipeline.analyze_text over the typical tickets
+of bench_pipeline, with whatever models are in models/) and reports, for a
+single result and for --batch results, the payload size and the cost of
+building the response (jsonify against wire.pack into a Response) and of
+decoding it on the other end. A request carrying an --audio-kb clip is
+compared too: JSON with audioBase64 (decoded with json.loads plus
+b64decode) against MessagePack with raw bytes under "audio"
+Run from ai-microservice/: python benchmarks/bench_wire.py
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import Flask, Response, jsonify
+
+import wire
+from bench_pipeline import make_tickets
+from model_loader import load_models
+from pipeline import analyze_text
+
+
+def best_us(fn, repeat, number):
+    """Fastest of repeat runs of number calls, in microseconds per call"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - started) / number)
+    return round(best * 1e6, 1)
+
+
+def compare(name, flask_app, body, repeat, number):
+    with flask_app.app_context():
+        json_bytes = jsonify(body).get_data()
+        packed = wire.pack(body)
+        rows = [
+            (name, 'json', len(json_bytes),
+             best_us(lambda: jsonify(body).get_data(), repeat, number),
+             best_us(lambda: json.loads(json_bytes), repeat, number)),
+            (name, 'msgpack', len(packed),
+             best_us(lambda: Response(wire.pack(body), content_type=wire.MSGPACK).get_data(), repeat, number),
+             best_us(lambda: wire.unpack(packed), repeat, number)),
+        ]
+    return rows
+
+
+def compare_audio(ticket, audio, repeat, number):
+    json_body = json.dumps(dict(ticket, audioBase64=base64.b64encode(audio).decode('ascii'))).encode('utf-8')
+    packed = wire.pack(dict(ticket, audio=audio))
+
+    def decode_json():
+        data = json.loads(json_body)
+        base64.b64decode(data['audioBase64'])
+
+    return [
+        ('audio request', 'json', len(json_body),
+         best_us(lambda: json.dumps(dict(ticket, audioBase64=base64.b64encode(audio).decode('ascii'))).encode('utf-8'),
+                 repeat, number),
+         best_us(decode_json, repeat, number)),
+        ('audio request', 'msgpack', len(packed),
+         best_us(lambda: wire.pack(dict(ticket, audio=audio)), repeat, number),
+         best_us(lambda: wire.unpack(packed), repeat, number)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--batch', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--audio-kb', type=int, default=256)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args()
+
+    if wire.msgpack() is None:
+        sys.exit("msgpack is not installed; pip install msgpack")
+    models = load_models()
+    tickets = make_tickets('typical', max(args.batch))
+    results = [analyze_text(text, request_type, models) for text, request_type in tickets]
+    flask_app = Flask(__name__)
+
+    rows = compare('single', flask_app, results[0], args.repeat, 2000)
+    for size in args.batch:
+        rows += compare(f'batch {size}', flask_app, {"results": results[:size]}, args.repeat,
+                        max(1, 20000 // size))
+    audio = random.Random(42).randbytes(args.audio_kb * 1024)
+    rows += compare_audio({"description": tickets[0][0], "requestType": tickets[0][1]}, audio, args.repeat, 50)
+
+    print(f"model {models['version']}; encode = building the response, decode = the client's parse")
+    print(f"{'payload':>14} {'format':>8} {'bytes':>10} {'size':>7} {'encode us':>10} {'decode us':>10} {'speedup':>8}")
+    for i in range(0, len(rows), 2):
+        base = rows[i]
+        for row in rows[i:i + 2]:
+            name, fmt, size, encode, decode = row
+            print(f"{name:>14} {fmt:>8} {size:>10} {size / base[2]:>6.0%} {encode:>10} {decode:>10} "
+                  f"{(base[3] + base[4]) / (encode + decode):>7.2f}x")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"modelVersion": models['version'],
+                       "results": [dict(zip(('payload', 'format', 'bytes', 'encodeUs', 'decodeUs'), row))
+                                   for row in rows]}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
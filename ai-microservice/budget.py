@@ -0,0 +1,89 @@
+"""
+Latency-budget engine selection
+Decides, stage by stage, whether a request can afford the full models or
+should use a cheaper engine, from the live p95 of every stage and the
+number of requests in flight
+"""
+
+import threading
+from collections import Counter
+
+from pipeline import RULE_ENGINES, full_engines
+from timing import STAGE_LATENCY
+
+# Cheapest savings first: NER is the slowest stage, then sentiment, and the
+# classifier is kept as long as possible
+DEGRADATION_ORDER = [("entities", "regex"), ("priority", "keywords"), ("category", "keywords")]
+
+_STAGE_OF = {"category": "classify", "entities": "entities", "priority": "priority", "summary": "summary"}
+
+
+class InFlight:
+    """Number of requests currently being analyzed"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def __enter__(self):
+        with self._lock:
+            self.value += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.value -= 1
+
+
+IN_FLIGHT = InFlight()
+DEGRADED = Counter()
+_degraded_lock = threading.Lock()
+
+
+def estimate(engines, tracker=STAGE_LATENCY):
+    """Expected seconds for one ticket: the sum of each chosen engine's p95
+
+    Engines without recent samples count as free, so a skipped engine is
+    tried again once its old samples have left the tracker's window.
+    """
+    return sum(tracker.percentile(_STAGE_OF[field], engine) or 0.0 for field, engine in engines.items())
+
+
+def choose_engines(models, budget_ms=None, in_flight=0, max_queue_depth=0, tracker=STAGE_LATENCY):
+    """(engines, degraded) for one request, degrading stages until the estimate fits budget_ms
+
+    Over max_queue_depth requests in flight, or when even the cheap
+    per-stage engines do not fit, everything goes to the rule engine.
+    """
+    engines = full_engines(models)
+    if max_queue_depth and in_flight > max_queue_depth:
+        return _count(engines, dict(RULE_ENGINES))
+    if not budget_ms:
+        return engines, False
+
+    budget = budget_ms / 1000.0
+    chosen = dict(engines)
+    for field, cheaper in DEGRADATION_ORDER:
+        if estimate(chosen, tracker) <= budget:
+            return _count(engines, chosen)
+        chosen[field] = cheaper
+    if estimate(chosen, tracker) <= budget:
+        return _count(engines, chosen)
+    return _count(engines, dict(RULE_ENGINES))
+
+
+def _count(full, chosen):
+    degraded = [field for field, engine in chosen.items() if engine != full[field]]
+    with _degraded_lock:
+        DEGRADED.update(degraded)
+    return chosen, bool(degraded)
+
+
+def stats():
+    with _degraded_lock:
+        degraded = dict(DEGRADED)
+    return {
+        "inFlight": IN_FLIGHT.value,
+        "degraded": degraded,
+        "p95Ms": STAGE_LATENCY.stats()
+    }
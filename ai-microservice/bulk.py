@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Bulk re-triage of ticket backlogs
+Streams a JSONL or CSV file through the analysis pipeline in fixed-size
+chunks, spread over a pool of worker processes, and writes NDJSON results in
+input order. Memory is bounded by the chunks in flight, not the file size,
+and a checkpoint after every written chunk lets an interrupted run resume
+
+Usage:
+  python bulk.py tickets.jsonl -o results.ndjson
+  python bulk.py tickets.csv -o results.ndjson --workers 4 --chunk-size 256
+  python bulk.py tickets.jsonl -o results.ndjson --resume
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from large_input import InputTooLarge
+from pipeline import analyze_batch
+
+CHECKPOINT_SUFFIX = '.checkpoint'
+
+
+def parse_record(raw):
+    """One input record (NDJSON line as bytes/str, or a CSV row dict) -> payload dict"""
+    if isinstance(raw, dict):
+        return raw
+    if isinstance(raw, InputTooLarge):
+        # An over-long line from large_input.bounded_lines
+        raise raw
+    try:
+        return json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"invalid JSON: {e}")
+
+
+def analyze_records(records, models, cache=None):
+    """Analyze [(record number, raw record)] and return their NDJSON result lines
+
+    Every input record gets exactly one output line, tagged with its record
+    number (and its "id", when the input has one); bad records get an
+    "error" instead of failing the chunk.
+    """
+    items, results = [], [None] * len(records)
+    for i, (_, raw) in enumerate(records):
+        try:
+            items.append(parse_record(raw))
+        except ValueError as e:
+            items.append(None)
+            results[i] = {"error": str(e)}
+
+    pending = [i for i, result in enumerate(results) if result is None]
+    for i, result in zip(pending, analyze_batch([items[i] for i in pending], models, cache)):
+        results[i] = result
+
+    lines = []
+    for (number, _), item, result in zip(records, items, results):
+        head = {"record": number}
+        if isinstance(item, dict) and item.get('id') is not None:
+            head["id"] = item['id']
+        lines.append(json.dumps(dict(head, **result)))
+    return ''.join(line + '\n' for line in lines).encode('utf-8')
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def numbered_lines(lines, first=1):
+    """(record number, line) for every non-blank line"""
+    number = first
+    for line in lines:
+        if isinstance(line, InputTooLarge) or line.strip():
+            yield number, line
+            number += 1
+
+
+def read_jsonl(path, offset=0, first=1):
+    """Yield (record number, line bytes, byte offset after the line) from a JSONL file"""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        number = first
+        for line in iter(f.readline, b''):
+            offset += len(line)
+            if line.strip():
+                yield number, line, offset
+                number += 1
+
+
+def read_csv(path, skip=0):
+    """Yield (record number, row dict, None) from a CSV file with a header row"""
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = csv.DictReader(f)
+        for number, row in enumerate(itertools.islice(rows, skip, None), skip + 1):
+            yield number, row, None
+
+
+def load_checkpoint(path, input_path):
+    with open(path, encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('input') != os.path.abspath(input_path):
+        raise ValueError(f"{path} belongs to {state.get('input')}, not {input_path}")
+    return state
+
+
+def save_checkpoint(path, state):
+    # Atomic replace: a crash leaves either the old or the new checkpoint
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+# Per-process models for the pool. Loaded once in the parent before the pool
+# forks, so on Linux the workers inherit them instead of loading their own.
+_MODELS = None
+
+
+def _init_worker():
+    global _MODELS
+    if _MODELS is None:
+        from model_loader import load_models
+        _MODELS = load_models()
+
+
+def _analyze_chunk(records):
+    return analyze_records(records, _MODELS)
+
+
+def _completed(chunks, workers):
+    """Yield (chunk, NDJSON bytes) in input order, keeping at most 2 * workers chunks in flight"""
+    if workers <= 1:
+        for chunk in chunks:
+            yield chunk, _analyze_chunk([(number, raw) for number, raw, _ in chunk])
+        return
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append((chunk, pool.submit(_analyze_chunk, [(number, raw) for number, raw, _ in chunk])))
+            if len(in_flight) >= 2 * workers:
+                chunk, future = in_flight.popleft()
+                yield chunk, future.result()
+        while in_flight:
+            chunk, future = in_flight.popleft()
+            yield chunk, future.result()
+
+
+def run(input_path, output_path, input_format=None, chunk_size=256, workers=1, resume=False, log=sys.stderr):
+    """Analyze every record of input_path into output_path; returns the number of records written"""
+    input_format = input_format or ('csv' if input_path.lower().endswith('.csv') else 'jsonl')
+    checkpoint_path = output_path + CHECKPOINT_SUFFIX
+
+    state = {"input": os.path.abspath(input_path), "format": input_format,
+             "records": 0, "inputOffset": 0, "outputBytes": 0}
+    if resume and os.path.exists(checkpoint_path):
+        state = load_checkpoint(checkpoint_path, input_path)
+        print(f"Resuming after record {state['records']}", file=log)
+
+    if input_format == 'csv':
+        records = read_csv(input_path, skip=state['records'])
+    else:
+        records = read_jsonl(input_path, offset=state['inputOffset'], first=state['records'] + 1)
+
+    _init_worker()
+    started = last_report = time.perf_counter()
+    done = 0
+    with open(output_path, 'r+b' if state['outputBytes'] else 'wb') as out:
+        # Drop anything written after the last checkpoint
+        out.truncate(state['outputBytes'])
+        out.seek(state['outputBytes'])
+
+        for chunk, lines in _completed(chunked(records, chunk_size), workers):
+            out.write(lines)
+            out.flush()
+            number, _, offset = chunk[-1]
+            state.update(records=number, outputBytes=out.tell())
+            if offset is not None:
+                state['inputOffset'] = offset
+            save_checkpoint(checkpoint_path, state)
+
+            done += len(chunk)
+            now = time.perf_counter()
+            if now - last_report >= 10:
+                print(f"{state['records']} records ({done / (now - started):.0f}/s)", file=log)
+                last_report = now
+
+    elapsed = time.perf_counter() - started
+    print(f"Analyzed {done} records in {elapsed:.1f}s ({done / max(elapsed, 1e-9):.0f}/s) -> {output_path}",
+          file=log)
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze a JSONL/CSV ticket backlog into NDJSON results')
+    parser.add_argument('input', help='JSONL (one {"description", "requestType"} per line) or CSV with a header')
+    parser.add_argument('-o', '--output', required=True, help='NDJSON results file')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help='input format (default: from the extension)')
+    parser.add_argument('--chunk-size', type=int, default=256, help='tickets classified per vectorized call')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--resume', action='store_true', help='continue from the checkpoint next to the output')
+    args = parser.parse_args()
+
+    run(args.input, args.output, args.format, args.chunk_size, args.workers, args.resume)
+
+
+if __name__ == '__main__':
+    main()
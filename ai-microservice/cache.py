@@ -0,0 +1,136 @@
+"""
+Content-addressed LRU cache for ticket analysis results
+Entries are keyed on the normalized description, request type and model
+version, evicted by size (least recently used first) and by age. An optional
+store (result_store.ResultStore) is a second tier shared between processes:
+misses fall through to it and every result is written through to it
+"""
+
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Normalize a description for cache keying (unicode form and whitespace only)"""
+    # split() breaks on exactly the characters \s matches; it is several
+    # times faster than a regex on multi-megabyte tickets
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def cache_key(text, request_type, model_version):
+    """Content address of one analysis request"""
+    payload = '\x1f'.join((model_version or '', request_type or '', normalize_text(text)))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    """Bounded in-process LRU cache with TTL expiry and hit/miss counters
+
+    If a fingerprint function is given, it is polled at most every
+    check_interval seconds and the cache clears itself whenever the
+    fingerprint changes (e.g. the model pickles were rewritten by a retrain).
+    The store is not cleared: its keys carry the model version already.
+    With max_entries=0 only the store is used.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=3600, fingerprint=None, check_interval=1.0, store=None):
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl_seconds)
+        self.fingerprint = fingerprint
+        self.check_interval = check_interval
+        self.store = store
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._last_fingerprint = fingerprint() if fingerprint else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.store_hits = 0
+
+    def get(self, key):
+        """Return the cached result for key, or None"""
+        now = time.monotonic()
+        self._check_fingerprint(now)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl > 0 and now - entry[0] > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if self.store is None:
+                self.misses += 1
+                return None
+
+        # Outside the lock: the store is a disk read
+        value = self.store.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.store_hits += 1
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        """Store a result, evicting least recently used entries past max_entries"""
+        if self.store is not None:
+            self.store.put(key, value)
+        self._remember(key, value)
+
+    def _remember(self, key, value):
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        store = self.store.stats() if self.store is not None else None
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "storeHits": self.store_hits,
+                "store": store
+            }
+
+    def _check_fingerprint(self, now):
+        if self.fingerprint is None or now - self._last_check < self.check_interval:
+            return
+
+        self._last_check = now
+        current = self.fingerprint()
+        if current != self._last_fingerprint:
+            with self._lock:
+                self._entries.clear()
+                self._last_fingerprint = current
+                self.invalidations += 1
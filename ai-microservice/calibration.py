@@ -0,0 +1,138 @@
+"""
+Calibrated category confidence for the keyword scorer and the classifier
+train.py fits one monotone curve per engine on held-out tickets, mapping the
+engine's raw score (the keyword scorer's lead over its runner-up, the
+classifier's top probability) to the share of tickets it labels correctly at
+that score, and saves them to models/calibration.json. Calibrated, the two
+confidences mean the same thing, which lets the serving cascade answer from
+the keyword scorer alone when it is sure enough (see CASCADE_MIN_CONFIDENCE
+in model_loader.py). Serving needs only this module, not scikit-learn
+"""
+
+import bisect
+import json
+
+# Thresholds the train-time cascade report is computed for
+REPORT_THRESHOLDS = (0.7, 0.8, 0.85, 0.9, 0.95)
+
+
+class Curve:
+    """Non-decreasing piecewise-linear map from a raw score to P(correct), flat past its ends"""
+
+    def __init__(self, x, y):
+        if not x or len(x) != len(y):
+            raise ValueError("a calibration curve needs as many y values as x values, at least one")
+        self.x = [float(value) for value in x]
+        self.y = [float(value) for value in y]
+
+    @classmethod
+    def fit(cls, scores, correct, decimals=3):
+        """Isotonic fit (pool adjacent violators) of correct (bools) on scores
+
+        Scores are grouped by their value rounded to decimals. A block of n
+        tickets with k correct is worth (k + 1) / (n + 2), so a score seen a
+        handful of times is never calibrated to exactly 0 or 1.
+        """
+        groups = {}
+        for score, hit in zip(scores, correct):
+            group = groups.setdefault(round(float(score), decimals), [0, 0])
+            group[0] += bool(hit)
+            group[1] += 1
+        if not groups:
+            raise ValueError("no tickets to calibrate on")
+
+        blocks = []  # [lowest score, highest score, correct, tickets]
+        for score in sorted(groups):
+            blocks.append([score, score] + groups[score])
+            while len(blocks) > 1 and _rate(blocks[-2]) > _rate(blocks[-1]):
+                low, high, hits, count = blocks.pop()
+                blocks[-1][1:] = [high, blocks[-1][2] + hits, blocks[-1][3] + count]
+
+        x, y = [], []
+        for low, high, hits, count in blocks:
+            x.append(low)
+            y.append(_rate((low, high, hits, count)))
+            if high != low:
+                x.append(high)
+                y.append(y[-1])
+        return cls(x, y)
+
+    def __call__(self, score):
+        score = float(score)
+        i = bisect.bisect_right(self.x, score)
+        if i == 0:
+            return self.y[0]
+        if i == len(self.x):
+            return self.y[-1]
+        x0, x1, y0, y1 = self.x[i - 1], self.x[i], self.y[i - 1], self.y[i]
+        return y0 + (y1 - y0) * (score - x0) / (x1 - x0)
+
+    def to_dict(self):
+        return {"x": self.x, "y": self.y}
+
+
+def _rate(block):
+    return (block[2] + 1.0) / (block[3] + 2.0)
+
+
+class Calibration:
+    """The keyword and classifier curves of one model version, plus the train-time cascade report"""
+
+    def __init__(self, keywords, model, report=None):
+        self.keywords = keywords
+        self.model = model
+        self.report = report or {}
+
+    @classmethod
+    def load(cls, path):
+        """The calibration saved at path, or None if there is none"""
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        return cls(Curve(**data['keywords']), Curve(**data['model']), data.get('report'))
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"keywords": self.keywords.to_dict(), "model": self.model.to_dict(), "report": self.report}, f,
+                      indent=2)
+
+
+def fit_calibration(texts, labels, model_predictions, thresholds=REPORT_THRESHOLDS):
+    """Calibration from labeled tickets and the classifier's held-out (label, probability) for each
+
+    The report replays the cascade on the same tickets for every threshold:
+    the share that would exit at the keyword scorer and the cascade's
+    accuracy, next to the classifier's alone.
+    """
+    from model_loader import keyword_category
+
+    keyword_predictions = [keyword_category(text) for text in texts]
+    keyword_hits = [category == label for (category, _, _), label in zip(keyword_predictions, labels)]
+    model_hits = [category == label for (category, _), label in zip(model_predictions, labels)]
+    keywords = Curve.fit([lead for _, _, lead in keyword_predictions], keyword_hits)
+    model = Curve.fit([probability for _, probability in model_predictions], model_hits)
+
+    confidences = [keywords(lead) for _, _, lead in keyword_predictions]
+    total = len(labels)
+    cascade = []
+    for threshold in thresholds:
+        exits = [confidence >= threshold for confidence in confidences]
+        hits = sum(keyword_hit if exit else model_hit
+                   for exit, keyword_hit, model_hit in zip(exits, keyword_hits, model_hits))
+        cascade.append({"threshold": threshold, "earlyExitFraction": round(sum(exits) / total, 3),
+                        "accuracy": round(hits / total, 3)})
+    report = {"tickets": total, "keywordAccuracy": round(sum(keyword_hits) / total, 3),
+              "modelAccuracy": round(sum(model_hits) / total, 3), "cascade": cascade}
+    return Calibration(keywords, model, report)
+
+
+def print_report(calibration):
+    report = calibration.report
+    print(f"\nCalibrated on {report['tickets']} held-out tickets: keyword accuracy {report['keywordAccuracy']:.3f}, "
+          f"model accuracy {report['modelAccuracy']:.3f}")
+    print("Cascade (keywords first, model when their calibrated confidence is below the threshold):")
+    for row in report['cascade']:
+        print(f"  threshold {row['threshold']:.2f}: {row['earlyExitFraction']:.1%} exit early, "
+              f"accuracy {row['accuracy']:.3f}")
@@ -0,0 +1,227 @@
+"""
+Near-duplicate index over recently analyzed tickets
+Tickets are stored as their L2-normalized TF-IDF rows (the classifier's own
+vectorizer), so the dot product of two rows is their cosine similarity. An
+inverted index keeps, per term, the tickets containing it in arrival order;
+a lookup walks the postings of the query's rarest terms for candidates,
+only probes the long postings of common terms for those candidates, and
+searches newest tickets first. The index holds at most max_entries tickets
+and forgets tickets older than ttl_seconds
+"""
+
+import math
+import threading
+import time
+
+import numpy as np
+
+
+def row_terms(matrix, i=0):
+    """(term ids, weights) of row i of a CSR matrix (scipy or inference.SparseRows)"""
+    start, end = matrix.indptr[i], matrix.indptr[i + 1]
+    return matrix.indices[start:end], matrix.data[start:end]
+
+
+class _Postings:
+    """Growable (sequence number, weight) arrays for one term, oldest first"""
+
+    __slots__ = ('seqs', 'weights', 'start', 'end', 'peak')
+
+    def __init__(self):
+        self.seqs = np.empty(8, dtype=np.int64)
+        self.weights = np.empty(8, dtype=np.float32)
+        self.start = 0
+        self.end = 0
+        # Largest weight ever appended: an upper bound on any live posting
+        self.peak = 0.0
+
+    def append(self, seq, weight):
+        if self.end == len(self.seqs):
+            live = self.end - self.start
+            if live * 2 > len(self.seqs):
+                capacity = len(self.seqs) * 2
+                self.seqs = np.concatenate((self.seqs, np.empty(capacity - len(self.seqs), dtype=np.int64)))
+                self.weights = np.concatenate((self.weights, np.empty(capacity - len(self.weights),
+                                                                      dtype=np.float32)))
+            # Compact: slide the live postings to the front
+            self.seqs[:live] = self.seqs[self.start:self.end]
+            self.weights[:live] = self.weights[self.start:self.end]
+            self.start, self.end = 0, live
+        self.seqs[self.end] = seq
+        self.weights[self.end] = weight
+        self.end += 1
+        if weight > self.peak:
+            self.peak = weight
+
+    def trim(self, oldest):
+        """Drop postings of sequence numbers below oldest; returns the live count"""
+        if self.end > self.start and self.seqs[self.start] < oldest:
+            self.start += int(np.searchsorted(self.seqs[self.start:self.end], oldest))
+        return self.end - self.start
+
+
+class DuplicateIndex:
+    """Bounded, time-evicted cosine similarity index over TF-IDF rows
+
+    Every added ticket gets a sequence number and lives in slot
+    seq % max_entries, so adding the (max_entries + 1)th ticket evicts the
+    oldest. Postings of evicted tickets are skipped by sequence number and
+    reclaimed when their term is next touched or on the periodic sweep.
+    """
+
+    def __init__(self, max_entries=100000, ttl_seconds=86400.0):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl_seconds)
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._ids = [None] * self.max_entries
+        self._payloads = [None] * self.max_entries
+        self._added = np.zeros(self.max_entries, dtype=np.float64)
+        # Accumulator for one query's scores, indexed by slot; zeroed after use
+        self._scores = np.zeros(self.max_entries, dtype=np.float32)
+        self._next = 0
+        self._oldest = 0
+        self._lookups = 0
+        self._matches = 0
+
+    def __len__(self):
+        return self._next - self._oldest
+
+    def _evict(self, now, room=0):
+        """Advance the oldest live sequence number past expired tickets, leaving room free slots"""
+        oldest = max(self._oldest, self._next + room - self.max_entries)
+        if self.ttl > 0:
+            cutoff = now - self.ttl
+            while oldest < self._next and self._added[oldest % self.max_entries] < cutoff:
+                oldest += 1
+        for seq in range(self._oldest, oldest):
+            slot = seq % self.max_entries
+            self._ids[slot] = self._payloads[slot] = None
+        self._oldest = oldest
+
+    def add(self, ticket_id, terms, payload=None, now=None):
+        """Index one ticket's (term ids, weights); returns its sequence number"""
+        now = time.time() if now is None else now
+        indices, weights = terms
+        with self._lock:
+            self._evict(now, room=1)
+            seq = self._next
+            self._next += 1
+            slot = seq % self.max_entries
+            self._ids[slot] = ticket_id
+            self._payloads[slot] = payload
+            self._added[slot] = now
+            for term, weight in zip(indices.tolist(), weights.tolist()):
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = _Postings()
+                postings.trim(self._oldest)
+                postings.append(seq, weight)
+            if seq % self.max_entries == self.max_entries - 1:
+                self._sweep()
+        return seq
+
+    def _sweep(self):
+        # Once per max_entries additions: reclaim postings of terms that have
+        # not been touched since their tickets were evicted
+        for term in [term for term, postings in self._postings.items() if not postings.trim(self._oldest)]:
+            del self._postings[term]
+
+    def query(self, terms, threshold, top_k=5, now=None):
+        """[(similarity, ticket id, payload)] of indexed tickets at or above threshold, most similar first
+
+        The newest FIRST_WINDOW tickets are searched first, then windows
+        twice as large going back in time, until top_k matches are found:
+        in a flood of duplicates the cost depends on top_k, not on the size
+        of the flood, and the matches returned are the most recent ones.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._evict(now)
+            self._lookups += 1
+            visits = []
+            for term, weight in zip(terms[0].tolist(), terms[1].tolist()):
+                postings = self._postings.get(term)
+                if postings is not None and postings.trim(self._oldest):
+                    visits.append((postings.end - postings.start, weight, postings))
+            # Rarest terms first
+            visits.sort(key=lambda visit: visit[0])
+            # reach[i]: the most the terms from visits[i] on can add to any
+            # score, bounded per term by its peak weight and overall by the
+            # norm of the remaining query weights (tickets have unit norm)
+            reach = [0.0] * (len(visits) + 1)
+            linear = squares = 0.0
+            for i in range(len(visits) - 1, -1, -1):
+                linear += visits[i][1] * visits[i][2].peak
+                squares += visits[i][1] * visits[i][1]
+                reach[i] = min(linear, math.sqrt(squares))
+
+            found = []
+            high, window = self._next, self.FIRST_WINDOW
+            while visits and high > self._oldest and len(found) < top_k:
+                low = max(self._oldest, high - window)
+                found += self._search(visits, reach, threshold, low, high)
+                high, window = low, window * 2
+
+            found.sort(key=lambda match: -match[0])
+            matches = [(round(min(score, 1.0), 4), self._ids[slot], self._payloads[slot])
+                       for score, slot in found[:top_k]]
+            if matches:
+                self._matches += 1
+        return matches
+
+    FIRST_WINDOW = 4096
+
+    def _search(self, visits, reach, threshold, low, high):
+        """[(score, slot)] at or above threshold among sequence numbers [low, high)
+
+        Terms are visited rarest first. Once the query weight left in the
+        unvisited terms cannot reach the threshold on its own, no new ticket
+        can qualify: the remaining (long) postings are only binary-searched
+        for the candidates already found.
+        """
+        scores = self._scores
+        ranges = []
+        for _, weight, postings in visits:
+            live = postings.seqs[postings.start:postings.end]
+            begin, end = np.searchsorted(live, (low, high))
+            ranges.append((live[begin:end], postings.weights[postings.start + begin:postings.start + end], weight))
+
+        touched = []
+        i = 0
+        while i < len(ranges) and reach[i] >= threshold:
+            seqs, weights, weight = ranges[i]
+            # Each ticket appears once per term, so the fancy-indexed += is exact
+            slots = seqs % self.max_entries
+            scores[slots] += weights * weight
+            touched.append(slots)
+            i += 1
+        if not touched:
+            return []
+        slots = np.concatenate(touched)
+        candidates = np.unique(slots[scores[slots] >= threshold - reach[i]])
+        if len(candidates):
+            wanted = self._oldest + (candidates - self._oldest) % self.max_entries
+            for seqs, weights, weight in ranges[i:]:
+                if not len(seqs):
+                    continue
+                at = np.minimum(np.searchsorted(seqs, wanted), len(seqs) - 1)
+                hit = seqs[at] == wanted
+                scores[candidates[hit]] += weights[at[hit]] * weight
+
+        similar = candidates[scores[candidates] >= threshold]
+        found = list(zip(scores[similar].tolist(), similar.tolist()))
+        scores[slots] = 0.0
+        return found
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": self._next - self._oldest,
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl,
+                "terms": len(self._postings),
+                "postings": sum(p.end - p.start for p in self._postings.values()),
+                "lookups": self._lookups,
+                "withDuplicates": self._matches,
+            }
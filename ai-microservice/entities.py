@@ -0,0 +1,198 @@
+"""
+Precompiled single-scan entity extractor
+Combines every service/device/location rule into one compiled regex, so all
+entity slots are filled by a single pass over the text
+"""
+
+import json
+import os
+import re
+
+# Each rule fills one slot. Rules for the same slot are tried in order, as
+# with the old per-pattern loop: the first rule that matches anywhere wins,
+# and its leftmost match gives the value. 'group' selects a capture group
+# inside the pattern (0 = the whole match).
+SERVICE_RULES = [
+    {"slot": "service", "pattern": r'\b(?:office|outlook|teams|sharepoint|onedrive|dropbox|gmail|slack)\b'},
+    {"slot": "service", "pattern": r'\b(?:windows|linux|macos|ubuntu|ios|android)\b'},
+]
+
+DEVICE_RULES = [
+    {"slot": "device", "pattern": r'\b(?:laptop|desktop|computer|pc|server|router|switch|printer|phone)\b'},
+]
+
+LOCATION_RULES = [
+    {"slot": "location", "pattern": r'\b(?:office|building|floor|room|conference|lobby|parking)\s*\w*\b'},
+    {"slot": "location", "pattern": r'\b(?:headquarters|branch|site|location)\b'},
+]
+
+# Device rules applied next to spaCy NER
+MODEL_DEVICE_RULES = [
+    {"slot": "device", "pattern": r'\b(?:laptop|desktop|computer|pc|server|router|switch|printer|phone|tablet|iphone|android)\b'},
+    {"slot": "device", "pattern": r'\b(?:model|serial)[\s#:]*([A-Z0-9\-]+)\b', "group": 1},
+    {"slot": "device", "pattern": r'\b[A-Z]{2,}\d{3,}\b'},  # Device model patterns like HP123, DELL456
+]
+
+
+def load_rules(path):
+    """Read extra rules from a JSON list of {"slot", "pattern", "group"?} objects"""
+    with open(path, encoding='utf-8') as f:
+        rules = json.load(f)
+
+    for rule in rules:
+        if not isinstance(rule, dict) or 'slot' not in rule or 'pattern' not in rule:
+            raise ValueError(f"{path}: each rule needs 'slot' and 'pattern'")
+        re.compile(rule['pattern'])
+    return rules
+
+
+def with_site_rules(rules):
+    """Put the rules from ENTITY_PATTERNS_PATH ahead of the built-in ones for their slots
+
+    Site-specific patterns (e.g. device model numbers) are more specific than
+    the generic keyword rules, so they take precedence.
+    """
+    path = os.environ.get('ENTITY_PATTERNS_PATH')
+    if not path:
+        return rules
+
+    site_rules = load_rules(path)
+    merged, seen = [], set()
+    for rule in rules:
+        if rule['slot'] not in seen:
+            seen.add(rule['slot'])
+            merged.extend(site for site in site_rules if site['slot'] == rule['slot'])
+        merged.append(rule)
+    return merged
+
+
+_ESCAPE = re.compile(r'\\.')
+
+# EntityExtractor.extract lowercases the first WINDOW_CHARS of a text, then
+# four times more each time a match might run past WINDOW_MARGIN from the end
+WINDOW_CHARS = 2048
+WINDOW_MARGIN = 256
+
+
+def _needs_ignorecase(pattern):
+    """True if a pattern mentions uppercase letters, so lowercasing the text is not enough"""
+    return any(ch.isupper() for ch in _ESCAPE.sub('', pattern))
+
+
+class EntityExtractor:
+    """Fill entity slots from a list of case-insensitive regex rules in one scan
+
+    All rules are joined into one alternation that is searched over the
+    lowercased text (case-insensitive matching is much slower in the re
+    engine, so only rules that mention uppercase letters keep it). Wherever
+    the scan stops, every still-open rule is tried anchored at that
+    position, so rules that overlap (e.g. 'office' as a service and as a
+    location) all see the text.
+    """
+
+    def __init__(self, rules):
+        self.slots = []
+        self._slot_rules = {}
+        self._value_groups = []
+
+        for i, rule in enumerate(rules):
+            slot = rule['slot']
+            if slot not in self._slot_rules:
+                self.slots.append(slot)
+                self._slot_rules[slot] = []
+            self._slot_rules[slot].append(i)
+            self._value_groups.append(rule.get('group', 0))
+
+        patterns = [rule['pattern'] for rule in rules]
+        self._lower = self._compile(patterns, lowered=True)
+        # Fallback for text whose lowercase form has a different length
+        self._folded = self._compile(patterns, lowered=False)
+
+    @staticmethod
+    def _compile(patterns, lowered):
+        if not patterns:
+            return None, []
+
+        if lowered:
+            wrapped = [f'(?i:{p})' if _needs_ignorecase(p) else f'(?:{p})' for p in patterns]
+            flags = 0
+        else:
+            wrapped = [f'(?:{p})' for p in patterns]
+            flags = re.IGNORECASE
+
+        # Factor a shared leading word boundary out of the alternation
+        if all(p.startswith(r'\b') for p in patterns):
+            combined = r'\b(?:' + '|'.join(w.replace(r'\b', '', 1) for w in wrapped) + ')'
+        else:
+            combined = '|'.join(wrapped)
+
+        return re.compile(combined, flags), [re.compile(w, flags) for w in wrapped]
+
+    def _window(self, text, size):
+        """(target, scanner, rule regexes, complete) for the first size characters of text
+
+        The target is the lowercased prefix, or, if lowercasing changes the
+        length of the text, the text itself matched case-insensitively.
+        """
+        prefix = text[:size] if size < len(text) else text
+        lowered = prefix.lower()
+        if len(lowered) != len(prefix):
+            return (text,) + self._folded + (True,)
+        return (lowered,) + self._lower + (prefix is text,)
+
+    def extract(self, text):
+        """Return {slot: value or None} for every slot"""
+        found = dict.fromkeys(self.slots)
+        if not text or not self.slots:
+            return found
+
+        # Lowercasing a whole pasted log costs more than finding entities in
+        # its first lines, so the text is lowercased a growing window at a
+        # time. Until the window holds the whole text, a match is only
+        # trusted WINDOW_MARGIN characters short of its end (rules are assumed
+        # to match fewer characters than that)
+        size = WINDOW_CHARS
+        target, scanner, rule_regexes, complete = self._window(text, size)
+
+        # Rank of the rule that filled each slot; a slot is settled once its
+        # first rule has matched, and the scan stops when all are settled
+        ranks = {}
+        pending = list(self.slots)
+        pos = 0
+        while pending:
+            match = scanner.search(target, pos)
+            if not complete:
+                trusted = len(target) - WINDOW_MARGIN
+                if match is None or match.end() > trusted:
+                    # Nothing before the margin was cut off, so no need to rescan it
+                    pos = max(pos, min(match.start(), trusted) if match is not None else trusted)
+                    size *= 4
+                    target, scanner, rule_regexes, complete = self._window(text, size)
+                    continue
+            if match is None:
+                break
+
+            start = match.start()
+            hits = []
+            for slot in pending:
+                slot_rules = self._slot_rules[slot]
+                for rank, rule_index in enumerate(slot_rules[:ranks.get(slot, len(slot_rules))]):
+                    rule_match = rule_regexes[rule_index].match(target, start)
+                    if rule_match is not None:
+                        hits.append((slot, rank, rule_index, rule_match))
+                        break
+            if not complete and any(hit[3].end() > len(target) - WINDOW_MARGIN for hit in hits):
+                size *= 4
+                target, scanner, rule_regexes, complete = self._window(text, size)
+                continue
+
+            for slot, rank, rule_index, rule_match in hits:
+                begin, end = rule_match.span(self._value_groups[rule_index])
+                found[slot] = text[begin:end].strip() if begin != -1 else ''
+                ranks[slot] = rank
+                if rank == 0:
+                    pending.remove(slot)
+
+            pos = start + 1
+
+        return found
@@ -0,0 +1,49 @@
+# Production serving mode: load models once in the master, fork workers
+# Usage:
+#   gunicorn -c gunicorn.conf.py app:app
+#
+# With preload_app the master imports app.py, which loads spaCy, the
+# vectorizer and the classifier and runs a warm-up (PRELOAD_MODELS=1).
+# Workers are forked afterwards and share those pages copy-on-write.
+#
+# WARMUP=background trades that sharing for a fast start: no preload, each
+# worker comes up immediately, serves the rule-based path and loads its own
+# models in a background thread (see app.py).
+
+import gc
+import os
+
+BACKGROUND_WARMUP = os.environ.get('WARMUP', 'eager') == 'background'
+
+# Must be set before app.py is imported by the master
+if not BACKGROUND_WARMUP:
+    os.environ.setdefault('PRELOAD_MODELS', '1')
+# One BLAS/OpenMP thread per worker; the workers are the parallelism
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+os.environ.setdefault('OPENBLAS_NUM_THREADS', '1')
+os.environ.setdefault('MKL_NUM_THREADS', '1')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 3002)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+# Threads per worker let concurrent requests meet in the micro-batcher
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+preload_app = not BACKGROUND_WARMUP
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+
+# No collections while the models are being built, so the objects they
+# allocate are not scanned (and written to) before the fork
+gc.disable()
+
+
+def when_ready(server):
+    # Move everything allocated so far (the loaded models) into the permanent
+    # generation. The collector then never touches those objects, so their
+    # refcount/GC header pages are not copied into each worker.
+    gc.collect()
+    gc.freeze()
+    server.log.info("Models loaded and frozen; forking %s workers", workers)
+
+
+def post_fork(server, worker):
+    gc.enable()
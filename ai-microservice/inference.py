@@ -0,0 +1,253 @@
+"""
+Pure-NumPy inference engine for TF-IDF + linear classifiers
+Reproduces TfidfVectorizer.transform and predict_proba of the models that
+train.py fits, without sklearn's generic validation and CSR machinery: one
+token pass per text, a vocabulary lookup, IDF + L2 weighting and a single
+sparse-dense dot for the whole batch
+"""
+
+import re
+
+import numpy as np
+
+
+class SparseRows:
+    """Minimal CSR batch of feature vectors (indptr/indices/data like scipy)"""
+
+    def __init__(self, indptr, indices, data):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = (len(indptr) - 1,)
+
+    def row(self, i):
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.data[start:end]
+
+
+class DictVocabulary:
+    """Term -> column lookup through a hash table (built from vocabulary_)"""
+
+    def __init__(self, vocabulary):
+        self.vocabulary = vocabulary
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def lookup(self, features):
+        """Column of every feature, -1 for out-of-vocabulary ones"""
+        get = self.vocabulary.get
+        return np.fromiter((get(f, -1) for f in features), dtype=np.int64, count=len(features))
+
+
+class SortedVocabulary:
+    """Term -> column lookup by binary search over a sorted fixed-width byte array
+
+    The array can live in a memory-mapped file; column i is the i-th term.
+    """
+
+    def __init__(self, terms):
+        self.terms = terms
+        self.width = terms.dtype.itemsize
+
+    def __len__(self):
+        return len(self.terms)
+
+    def lookup(self, features):
+        """Column of every feature, -1 for out-of-vocabulary ones"""
+        if not features or not len(self.terms):
+            return np.full(len(features), -1, dtype=np.int64)
+
+        encoded = [f.encode('utf-8') for f in features]
+        # Longer features would be truncated to the array width, so they
+        # cannot be trusted to match
+        fits = np.fromiter((len(f) <= self.width for f in encoded), dtype=bool, count=len(encoded))
+        keys = np.array(encoded, dtype=self.terms.dtype)
+        pos = np.searchsorted(self.terms, keys)
+        pos[pos == len(self.terms)] = 0
+        return np.where(fits & (self.terms[pos] == keys), pos, -1)
+
+
+class TextFeaturizer:
+    """TfidfVectorizer.transform for the default word analyzer"""
+
+    def __init__(self, config, vocabulary, idf=None):
+        self.config = config
+        self.lowercase = config['lowercase']
+        self.token_pattern = re.compile(config['token_pattern'])
+        self.min_n, self.max_n = config['ngram_range']
+        self.stop_words = frozenset(config['stop_words']) if config['stop_words'] else None
+        self.binary = config['binary']
+        self.sublinear_tf = config['sublinear_tf']
+        self.norm = config['norm']
+        self.vocabulary = vocabulary
+        self.idf = idf
+
+    @classmethod
+    def from_sklearn(cls, vectorizer):
+        if type(vectorizer).__name__ != 'TfidfVectorizer':
+            raise ValueError(f"unsupported vectorizer: {type(vectorizer).__name__}")
+        if vectorizer.analyzer != 'word' or vectorizer.tokenizer or vectorizer.preprocessor \
+                or vectorizer.strip_accents:
+            raise ValueError("only the default word analyzer without custom preprocessing is supported")
+
+        stop_words = vectorizer.get_stop_words()
+        config = {
+            'lowercase': bool(vectorizer.lowercase),
+            'token_pattern': vectorizer.token_pattern,
+            'ngram_range': list(vectorizer.ngram_range),
+            'stop_words': sorted(stop_words) if stop_words else None,
+            'binary': bool(vectorizer.binary),
+            'sublinear_tf': bool(vectorizer.sublinear_tf),
+            'use_idf': bool(vectorizer.use_idf),
+            'norm': vectorizer.norm,
+        }
+        idf = np.asarray(vectorizer.idf_, dtype=np.float64) if vectorizer.use_idf else None
+        return cls(config, DictVocabulary(dict(vectorizer.vocabulary_)), idf)
+
+    def analyze(self, text):
+        """Same token/n-gram stream as sklearn's word analyzer"""
+        if self.lowercase:
+            text = text.lower()
+        tokens = self.token_pattern.findall(text)
+        if self.stop_words is not None:
+            tokens = [w for w in tokens if w not in self.stop_words]
+
+        if self.max_n == 1:
+            return tokens
+
+        original = tokens
+        min_n = self.min_n
+        if min_n == 1:
+            tokens = list(original)
+            min_n += 1
+        else:
+            tokens = []
+        for n in range(min_n, min(self.max_n + 1, len(original) + 1)):
+            for i in range(len(original) - n + 1):
+                tokens.append(' '.join(original[i:i + n]))
+        return tokens
+
+    def features(self, text):
+        """(column indices, tf-idf weights) of one text, sorted by column"""
+        return self.transform([text]).row(0)
+
+    def transform(self, texts):
+        """Tf-idf rows for a batch: one vocabulary lookup and vectorized weighting"""
+        features, rows = [], []
+        for row, text in enumerate(texts):
+            analyzed = self.analyze(text)
+            features.extend(analyzed)
+            rows.extend([row] * len(analyzed))
+
+        n_rows = len(texts)
+        n_features = len(self.vocabulary)
+        cols = self.vocabulary.lookup(features)
+        found = cols >= 0
+
+        # Count (row, column) pairs; unique keys come back sorted by row, then column
+        keys, counts = np.unique(np.asarray(rows, dtype=np.int64)[found] * n_features + cols[found],
+                                 return_counts=True)
+        row_of = keys // n_features
+        indices = keys % n_features
+        values = counts.astype(np.float64)
+
+        if self.binary:
+            values[:] = 1.0
+        if self.sublinear_tf:
+            values = np.log(values) + 1.0
+        if self.idf is not None:
+            values *= self.idf[indices]
+        if self.norm in ('l1', 'l2'):
+            weights = values * values if self.norm == 'l2' else np.abs(values)
+            lengths = np.bincount(row_of, weights=weights, minlength=n_rows)
+            if self.norm == 'l2':
+                lengths = np.sqrt(lengths)
+            lengths[lengths == 0] = 1.0
+            values /= lengths[row_of]
+
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_of, minlength=n_rows), out=indptr[1:])
+        return SparseRows(indptr, indices, values)
+
+
+def proba_mode(clf):
+    """How a fitted sklearn linear classifier turns decision scores into probabilities"""
+    if type(clf).__name__ == 'LogisticRegression':
+        multi_class = getattr(clf, 'multi_class', 'auto')
+        ovr = multi_class in ('ovr', 'warn') or (
+            multi_class == 'auto' and (len(clf.classes_) <= 2 or clf.solver == 'liblinear'))
+        return 'ovr' if ovr else 'softmax'
+    if hasattr(clf, 'coef_') and hasattr(clf, 'predict_proba'):
+        # SGDClassifier(loss='log_loss') and friends: one-vs-rest logistic
+        return 'ovr'
+    raise ValueError(f"unsupported classifier: {type(clf).__name__}")
+
+
+class LinearScorer:
+    """predict_proba of a linear classifier from its coefficient matrix"""
+
+    def __init__(self, classes, proba, coef, intercept):
+        self.classes_ = np.asarray(classes)
+        self.proba = proba
+        self.coef = coef
+        self.intercept = intercept
+
+    @classmethod
+    def from_sklearn(cls, clf):
+        return cls(clf.classes_, proba_mode(clf),
+                   np.ascontiguousarray(clf.coef_, dtype=np.float64),
+                   np.ascontiguousarray(np.atleast_1d(clf.intercept_), dtype=np.float64))
+
+    def decision_function(self, X):
+        """All rows in one sparse-dense product: gather, scale and segment-sum"""
+        n_rows = X.shape[0]
+        scores = np.zeros((n_rows, self.coef.shape[0]), dtype=np.float64)
+
+        starts = X.indptr[:-1]
+        nonempty = starts < X.indptr[1:]
+        if len(X.indices):
+            contributions = self.coef[:, X.indices].T * X.data[:, None]
+            scores[nonempty] = np.add.reduceat(contributions, starts[nonempty], axis=0)
+
+        scores += self.intercept
+        return scores
+
+    def predict_proba(self, X):
+        scores = self.decision_function(X)
+
+        if self.proba == 'softmax':
+            if scores.shape[1] == 1:
+                scores = np.hstack([-scores, scores])
+            scores -= scores.max(axis=1, keepdims=True)
+            np.exp(scores, out=scores)
+            scores /= scores.sum(axis=1, keepdims=True)
+            return scores
+
+        prob = 1.0 / (1.0 + np.exp(-scores))
+        if prob.shape[1] == 1:
+            return np.hstack([1.0 - prob, prob])
+        return prob / prob.sum(axis=1, keepdims=True)
+
+
+class InferenceEngine:
+    """Featurizer + scorer pair; also usable as (vectorizer, clf) in model_loader"""
+
+    def __init__(self, featurizer, scorer):
+        self.featurizer = featurizer
+        self.scorer = scorer
+        self.classes_ = scorer.classes_
+
+    @classmethod
+    def from_sklearn(cls, vectorizer, clf):
+        """Build from the fitted TfidfVectorizer and classifier train.py produces"""
+        return cls(TextFeaturizer.from_sklearn(vectorizer), LinearScorer.from_sklearn(clf))
+
+    def predict_proba(self, texts):
+        return self.scorer.predict_proba(self.featurizer.transform(texts))
+
+    def predict(self, texts):
+        """(class, probability) for every text"""
+        probabilities = self.predict_proba(texts)
+        best = np.argmax(probabilities, axis=1)
+        return [(self.classes_[idx], probabilities[row, idx]) for row, idx in enumerate(best)]
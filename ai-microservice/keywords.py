@@ -0,0 +1,114 @@
+"""
+Single-pass keyword matcher for rule-based scoring
+Compiles keyword tables into one trie-shaped regex with word boundaries so
+every table is scored in one scan of the text, however many keywords it holds
+"""
+
+import functools
+import json
+import re
+
+
+def _trie_pattern(node):
+    """Emit a regex for a character trie; longer keywords are tried first"""
+    branches = []
+    for ch in sorted(k for k in node if k != ''):
+        atom = r'\s+' if ch == ' ' else re.escape(ch)
+        branches.append(atom + _trie_pattern(node[ch]))
+
+    if not branches:
+        return ''
+    if len(branches) == 1 and '' not in node:
+        return branches[0]
+
+    group = '(?:' + '|'.join(branches) + ')'
+    return group + '?' if '' in node else group
+
+
+def _normalize_keyword(keyword):
+    return ' '.join(keyword.lower().split())
+
+
+class KeywordMatcher:
+    """Score {label: {keyword: weight}} tables against text in one scan
+
+    Keywords match whole words (so 'ip' does not fire inside 'shipping'),
+    multi-word keywords tolerate any whitespace between words, and a plain
+    plural suffix ('routers', 'switches') still counts. Like the substring
+    checks it replaces, each keyword counts once per text no matter how often
+    it appears.
+    """
+
+    def __init__(self, tables, cache_size=1024):
+        self.labels = list(tables)
+        self._owners = {}
+        for label, keywords in tables.items():
+            if not isinstance(keywords, dict):
+                keywords = {keyword: 1 for keyword in keywords}
+            for keyword, weight in keywords.items():
+                self._owners.setdefault(_normalize_keyword(keyword), []).append((label, weight))
+
+        trie = {}
+        for keyword in self._owners:
+            node = trie
+            for ch in keyword:
+                node = node.setdefault(ch, {})
+            node[''] = True
+
+        # Zero-width lookahead so keywords starting inside another match
+        # ('down' in 'shut down') are still found
+        body = _trie_pattern(trie)
+        self._regex = re.compile(r'\b(?=(' + body + r')(?:e?s)?\b)') if body else None
+
+        # A match only reports the longest keyword at its position, so
+        # credit keywords that are whole-word prefixes of it as well
+        self._implied = {}
+        for keyword in self._owners:
+            words = keyword.split(' ')
+            prefixes = (' '.join(words[:i]) for i in range(1, len(words)))
+            self._implied[keyword] = [prefix for prefix in prefixes if prefix in self._owners]
+
+        self.matches = functools.lru_cache(maxsize=cache_size)(self._matches)
+
+    def _matches(self, text):
+        """Set of keywords present in text"""
+        if self._regex is None or not text:
+            return frozenset()
+
+        found = set()
+        for match in self._regex.findall(text.lower()):
+            keyword = ' '.join(match.split())
+            found.add(keyword)
+            found.update(self._implied[keyword])
+        return frozenset(found)
+
+    def scores(self, text, cache=True):
+        """Total weight of matched keywords for every label
+
+        cache=False skips the LRU cache, for one-off texts (single sentences)
+        that would only push whole tickets out of it.
+        """
+        scores = dict.fromkeys(self.labels, 0)
+        for keyword in (self.matches(text) if cache else self._matches(text)):
+            for label, weight in self._owners[keyword]:
+                scores[label] += weight
+        return scores
+
+
+def load_keyword_tables(path, tables):
+    """Merge extra keywords from a JSON file into tables
+
+    The file maps table labels to either a list of keywords or a
+    {keyword: weight} object, e.g. {"Network": ["mpls", "sd-wan"]}.
+    """
+    with open(path, encoding='utf-8') as f:
+        extra = json.load(f)
+
+    merged = {}
+    for label, keywords in tables.items():
+        merged[label] = dict(keywords) if isinstance(keywords, dict) else {k: 1 for k in keywords}
+    for label, keywords in extra.items():
+        if not isinstance(keywords, dict):
+            keywords = {keyword: 1 for keyword in keywords}
+        merged.setdefault(label, {}).update(keywords)
+    return merged
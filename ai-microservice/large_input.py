@@ -0,0 +1,182 @@
+"""
+Size limits and the windowed path for very large tickets
+Request bodies are read and decoded in chunks and refused once they pass
+MAX_REQUEST_BYTES, so an oversized upload is never held in memory whole.
+A description longer than LARGE_INPUT_CHARS is not analyzed whole either:
+it is cut into windows (the head, the tail and evenly spaced ones between,
+LARGE_INPUT_CHARS in total), NER runs over the windows in one nlp.pipe pass
+with the entities merged, and classification, priority and the summary run
+on the windows joined into one sampled view. No stage sees more than
+LARGE_INPUT_CHARS of any ticket, so the per-request cost of a pasted 5MB
+log is bounded; only the size checks and the cache key read all of it
+"""
+
+import codecs
+import json
+import os
+
+# Bodies over MAX_REQUEST_BYTES get 413 (for /analyze/stream, any one NDJSON
+# line over it gets an error line). Descriptions over MAX_DESCRIPTION_CHARS
+# and audio over MAX_AUDIO_BYTES (decoded) are refused with 413 too.
+# Descriptions over LARGE_INPUT_CHARS take the windowed path, in windows of
+# LARGE_INPUT_WINDOW_CHARS.
+MAX_REQUEST_BYTES = int(os.environ.get('MAX_REQUEST_BYTES', 16 * 1024 * 1024))
+MAX_DESCRIPTION_CHARS = int(os.environ.get('MAX_DESCRIPTION_CHARS', 5000000))
+MAX_AUDIO_BYTES = int(os.environ.get('MAX_AUDIO_BYTES', 10 * 1024 * 1024))
+LARGE_INPUT_CHARS = int(os.environ.get('LARGE_INPUT_CHARS', 20000))
+LARGE_INPUT_WINDOW_CHARS = int(os.environ.get('LARGE_INPUT_WINDOW_CHARS', 2500))
+
+# Value of a result's "inputPath"
+FULL = 'full'
+WINDOWED = 'windowed'
+
+
+class InputTooLarge(ValueError):
+    """A request body, description or audio clip over its limit (answered with 413)"""
+
+
+def check_item(description, audio_b64, audio=None):
+    """Raise InputTooLarge if a ticket's description or audio (base64 or raw bytes) is over its limit"""
+    if len(description) > MAX_DESCRIPTION_CHARS:
+        raise InputTooLarge(f"description too large, max {MAX_DESCRIPTION_CHARS} characters")
+    # Four base64 characters per three bytes
+    if audio_b64 and len(audio_b64) * 3 // 4 > MAX_AUDIO_BYTES:
+        raise InputTooLarge(f"audioBase64 too large, max {MAX_AUDIO_BYTES} bytes")
+    if audio and len(audio) > MAX_AUDIO_BYTES:
+        raise InputTooLarge(f"audio too large, max {MAX_AUDIO_BYTES} bytes")
+
+
+def _chunks(stream, content_length, limit, chunk_size):
+    """A binary stream, chunk by chunk; InputTooLarge past limit bytes
+
+    At most limit + 1 bytes are read, so a refused body costs no more
+    memory than an accepted one.
+    """
+    limit = MAX_REQUEST_BYTES if limit is None else limit
+    if content_length is not None and content_length > limit:
+        raise InputTooLarge(f"request body too large, max {limit} bytes")
+    size = 0
+    while True:
+        chunk = stream.read(min(chunk_size, limit + 1 - size))
+        if not chunk:
+            return
+        size += len(chunk)
+        if size > limit:
+            raise InputTooLarge(f"request body too large, max {limit} bytes")
+        yield chunk
+
+
+def read_body(stream, content_length=None, limit=None, chunk_size=65536):
+    """A binary stream decoded as UTF-8, read chunk by chunk; InputTooLarge past limit bytes
+
+    A leading byte order mark is dropped, as Flask's get_json did. Raises
+    UnicodeDecodeError on invalid UTF-8.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    parts = [decoder.decode(chunk) for chunk in _chunks(stream, content_length, limit, chunk_size)]
+    parts.append(decoder.decode(b'', final=True))
+    return ''.join(parts)
+
+
+def read_bytes(stream, content_length=None, limit=None, chunk_size=65536):
+    """A binary stream read chunk by chunk, undecoded; InputTooLarge past limit bytes"""
+    return b''.join(_chunks(stream, content_length, limit, chunk_size))
+
+
+def read_json(stream, content_length=None, limit=None):
+    """The JSON document in a request body, or None if it is not valid JSON; InputTooLarge past limit bytes"""
+    try:
+        return json.loads(read_body(stream, content_length, limit))
+    except InputTooLarge:
+        raise
+    except ValueError:
+        return None
+
+
+def bounded_lines(stream, limit=None, chunk_size=65536):
+    """Lines of a binary stream; a line over limit bytes is read through and yielded as an InputTooLarge"""
+    limit = MAX_REQUEST_BYTES if limit is None else limit
+    while True:
+        line = stream.readline(limit + 1)
+        if not line:
+            return
+        if len(line) > limit and not line.endswith(b'\n'):
+            while True:
+                rest = stream.readline(chunk_size)
+                if not rest or rest.endswith(b'\n'):
+                    break
+            yield InputTooLarge(f"record too large, max {limit} bytes")
+        else:
+            yield line
+
+
+def is_large(text):
+    return len(text) > LARGE_INPUT_CHARS
+
+
+def windows(text, total=None, size=None):
+    """At most total characters of text, as windows of at most size characters
+
+    The first window is the head of the ticket, the last its tail, the rest
+    evenly spaced between them; windows are trimmed to line (or word)
+    boundaries when one is near their edges.
+    """
+    total = LARGE_INPUT_CHARS if total is None else total
+    size = LARGE_INPUT_WINDOW_CHARS if size is None else size
+    if len(text) <= total:
+        return [text]
+    count = max(1, total // max(1, size))
+    if count == 1:
+        return [_trimmed(text, 0, total)]
+    # Room for the newlines split_input joins the windows with
+    size = (total - (count - 1)) // count
+    step = (len(text) - size) / (count - 1)
+    return [_trimmed(text, round(i * step), round(i * step) + size) for i in range(count)]
+
+
+def _trimmed(text, start, end):
+    slack = (end - start) // 10
+    if start > 0:
+        cut = _break(text, start, start + slack)
+        if cut >= 0:
+            start = cut + 1
+    if end < len(text):
+        cut = _break(text, end - slack, end, reverse=True)
+        if cut >= start:
+            end = cut
+    return text[start:end]
+
+
+def _break(text, start, end, reverse=False):
+    """Position of the first (or last) newline in text[start:end], else of a space, else -1"""
+    for separator in ('\n', ' '):
+        found = text.rfind(separator, start, end) if reverse else text.find(separator, start, end)
+        if found >= 0:
+            return found
+    return -1
+
+
+def split_input(text):
+    """(input path, view, windows) of a ticket: the text itself, or a bounded sample of it"""
+    if not is_large(text):
+        return FULL, text, [text]
+    parts = windows(text)
+    # Each window on its own lines, so no sentence runs across a seam
+    return WINDOWED, '\n'.join(parts), parts
+
+
+def merge_entities(found):
+    """One entity dict from per-window ones: the first value found per slot, each "other" entity once"""
+    merged, seen = {}, set()
+    for entities in found:
+        for slot, value in entities.items():
+            if slot != 'other':
+                if merged.get(slot) is None:
+                    merged[slot] = value
+                continue
+            other = merged.setdefault('other', [])
+            for entity in value:
+                if entity not in seen:
+                    seen.add(entity)
+                    other.append(entity)
+    return merged
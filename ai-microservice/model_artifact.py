@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Compact, memory-mappable model artifact for TF-IDF + logistic regression
+Stores the sorted vocabulary, IDF vector and coefficient/intercept matrices
+as flat arrays in one file, so loading is an mmap (pages shared by every
+worker) and no pickle code is ever executed
+
+Usage:
+  python model_artifact.py export   # models/*.pkl -> models/model.bin
+  python model_artifact.py verify   # check predictions match the pickles
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+
+from inference import InferenceEngine, LinearScorer, SortedVocabulary, TextFeaturizer
+
+MAGIC = b'SSHMODEL'
+FORMAT_VERSION = 1
+ALIGN = 64
+_PREAMBLE = struct.Struct('<8sIQ')  # magic, format version, header length
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def export_model(vectorizer, clf, path):
+    """Write a fitted TfidfVectorizer + linear classifier as one flat artifact"""
+    engine = InferenceEngine.from_sklearn(vectorizer, clf)
+
+    terms = sorted(vectorizer.vocabulary_, key=lambda term: term.encode('utf-8'))
+    order = np.array([vectorizer.vocabulary_[term] for term in terms], dtype=np.int64)
+    encoded = [term.encode('utf-8') for term in terms]
+    width = max((len(term) for term in encoded), default=1)
+
+    arrays = {
+        'terms': np.array(encoded, dtype=f'S{width}'),
+        'coef': np.ascontiguousarray(engine.scorer.coef[:, order]),
+        'intercept': engine.scorer.intercept,
+    }
+    if engine.featurizer.idf is not None:
+        arrays['idf'] = np.ascontiguousarray(engine.featurizer.idf[order])
+
+    header = {
+        'vectorizer': engine.featurizer.config,
+        'classifier': {
+            'classes': [str(c) for c in engine.classes_],
+            'proba': engine.scorer.proba,
+        },
+        'arrays': {},
+    }
+
+    offset = 0
+    for name, array in arrays.items():
+        header['arrays'][name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        offset = _align(offset + array.nbytes)
+
+    digest = hashlib.sha256(json.dumps(header, sort_keys=True).encode('utf-8'))
+    for array in arrays.values():
+        digest.update(array.tobytes())
+    header['version'] = digest.hexdigest()[:12]
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _align(_PREAMBLE.size + len(header_bytes))
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + header['arrays'][name]['offset'])
+            f.write(array.tobytes())
+    # Atomic replace so a serving process never maps a half-written file
+    os.replace(tmp_path, path)
+    return header['version']
+
+
+def load_model(path):
+    """Memory-map an artifact; returns (InferenceEngine, version)"""
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, header_len = _PREAMBLE.unpack_from(buffer, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"{path}: not a model artifact (format {version})")
+    header = json.loads(buffer[_PREAMBLE.size:_PREAMBLE.size + header_len])
+    data_start = _align(_PREAMBLE.size + header_len)
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape']))
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count,
+                                     offset=data_start + spec['offset']).reshape(spec['shape'])
+
+    featurizer = TextFeaturizer(header['vectorizer'], SortedVocabulary(arrays['terms']), arrays.get('idf'))
+    classifier = header['classifier']
+    scorer = LinearScorer(classifier['classes'], classifier['proba'], arrays['coef'], arrays['intercept'])
+    return InferenceEngine(featurizer, scorer), header['version']
+
+
+def _load_pickles(models_dir):
+    import pickle
+    with open(os.path.join(models_dir, 'vectorizer.pkl'), 'rb') as f:
+        vectorizer = pickle.load(f)
+    with open(os.path.join(models_dir, 'classifier.pkl'), 'rb') as f:
+        clf = pickle.load(f)
+    return vectorizer, clf
+
+
+def verify(models_dir, texts):
+    """Compare artifact predictions with the pickled sklearn objects; returns mismatches"""
+    vectorizer, clf = _load_pickles(models_dir)
+    engine, _ = load_model(os.path.join(models_dir, 'model.bin'))
+
+    expected = clf.predict_proba(vectorizer.transform(texts))
+    actual = engine.predict_proba(texts)
+
+    mismatches = []
+    for text, e, a in zip(texts, expected, actual):
+        if clf.classes_[np.argmax(e)] != engine.classes_[np.argmax(a)] or not np.allclose(e, a, rtol=0, atol=1e-9):
+            mismatches.append((text, e, a))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export or verify the compact model artifact')
+    parser.add_argument('command', choices=['export', 'verify'])
+    parser.add_argument('--models-dir', default=os.environ.get('MODEL_PATH', 'models'))
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        vectorizer, clf = _load_pickles(args.models_dir)
+        version = export_model(vectorizer, clf, os.path.join(args.models_dir, 'model.bin'))
+        print(f"Wrote {os.path.join(args.models_dir, 'model.bin')} (version {version})")
+        return
+
+    from train import TRAINING_DATA
+    texts = [text for text, _ in TRAINING_DATA]
+    texts += [text.upper() + ' urgent!!' for text, _ in TRAINING_DATA]
+    texts += ['', 'zzz qqq', 'the and of']
+
+    mismatches = verify(args.models_dir, texts)
+    for text, e, a in mismatches[:10]:
+        print(f"MISMATCH {text!r}: sklearn={e} compact={a}")
+    print(f"{len(texts) - len(mismatches)}/{len(texts)} predictions match")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,68 +1,280 @@
 import os
-import re
 import pickle
-import spacy
-import numpy as np
-from textblob import TextBlob
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+import hashlib
+import threading
+from collections import Counter
+from keywords import KeywordMatcher, load_keyword_tables
+from summarizer import summarize, TermWeights
+from entities import (
+    EntityExtractor, with_site_rules, SERVICE_RULES, DEVICE_RULES, LOCATION_RULES, MODEL_DEVICE_RULES
+)
+from startup import timed_import
+from large_input import merge_entities
+from calibration import Calibration
+
+# spaCy, TextBlob, NumPy and scikit-learn are imported by the stage that needs
+# them (load_nlp, load_sentiment, load_classifier), never at module import, so
+# the rule-based paths are usable before any of them has loaded.
+
+MODEL_DIR = os.environ.get('MODEL_PATH', 'models')
+CLASSIFIER_PATH = os.path.join(MODEL_DIR, 'classifier.pkl')
+VECTORIZER_PATH = os.path.join(MODEL_DIR, 'vectorizer.pkl')
+ARTIFACT_PATH = os.path.join(MODEL_DIR, 'model.bin')
+# Held-out tickets train.py sets aside; new model versions must pass them
+SMOKE_SET_PATH = os.path.join(MODEL_DIR, 'smoke_set.json')
+# Confidence curves train.py fits for the keyword scorer and the classifier
+CALIBRATION_PATH = os.path.join(MODEL_DIR, 'calibration.json')
+
+# MODEL_FORMAT=auto (default) serves models/model.bin when present and at
+# least as new as the pickles, else the pickles; 'compact' or 'pickle' force
+# one format.
+MODEL_FORMAT = os.environ.get('MODEL_FORMAT', 'auto')
+
+# INFERENCE_ENGINE=numpy (default) serves pickled models through the pure-NumPy
+# engine in inference.py; 'sklearn' keeps TfidfVectorizer/predict_proba.
+INFERENCE_ENGINE = os.environ.get('INFERENCE_ENGINE', 'numpy')
+
+# Keyword tables for the rule-based paths. KEYWORD_TABLES_PATH may point to a
+# JSON file with extra site-specific keywords (see keywords.load_keyword_tables).
+CATEGORY_KEYWORDS = {
+    'Network': ['wifi', 'internet', 'connection', 'network', 'bandwidth', 'router', 'switch', 'vpn', 'dns'],
+    'Security': ['password', 'access', 'login', 'security', 'breach', 'virus', 'malware', 'authentication', 'firewall'],
+    'Cloud': ['cloud', 'backup', 'sync', 'storage', 'drive', 'aws', 'azure', 'google', 'dropbox', 'onedrive']
+}
+
+# Urgency keywords with weights
+URGENCY_KEYWORDS = {
+    'emergency': 3, 'critical': 3, 'urgent': 3, 'immediately': 3,
+    'asap': 2, 'quickly': 2, 'fast': 2, 'soon': 2, 'important': 2,
+    'down': 3, 'outage': 3, 'broken': 2, 'not working': 2, 'failed': 2,
+    'problem': 1, 'issue': 1, 'help': 1
+}
+
+_keyword_tables = dict(CATEGORY_KEYWORDS, urgency=URGENCY_KEYWORDS)
+if os.environ.get('KEYWORD_TABLES_PATH'):
+    _keyword_tables = load_keyword_tables(os.environ['KEYWORD_TABLES_PATH'], _keyword_tables)
+
+# Built once; scores every category and the urgency weights in one scan
+TICKET_KEYWORDS = KeywordMatcher(_keyword_tables)
+
+# Summary sentences gain this much per point of keyword score: urgency
+# weights count in full, category keywords at half
+SUMMARY_KEYWORD_WEIGHTS = {label: 1.0 if label == 'urgency' else 0.5 for label in _keyword_tables}
+
+# Entity extractors are compiled once; ENTITY_PATTERNS_PATH may add site rules
+DEVICE_EXTRACTOR = EntityExtractor(with_site_rules(MODEL_DEVICE_RULES))
+FALLBACK_EXTRACTOR = EntityExtractor(with_site_rules(SERVICE_RULES + DEVICE_RULES + LOCATION_RULES))
+SKIP_NER_EXTRACTOR = EntityExtractor(with_site_rules(SERVICE_RULES + MODEL_DEVICE_RULES + LOCATION_RULES))
+
+# SPACY_PIPELINE=ner (default) loads only what NER needs; 'full' keeps every component.
+# extract_entities only reads doc.ents, so the tagger/parser/lemmatizer are dead weight.
+SPACY_PIPELINE = os.environ.get('SPACY_PIPELINE', 'ner')
+UNUSED_SPACY_COMPONENTS = ['tagger', 'parser', 'lemmatizer', 'attribute_ruler']
+
+# NER_SKIP_POLICY=when_filled skips spaCy when the regex rules already filled
+# service, device and location; 'never' (default) always runs NER.
+NER_SKIP_POLICY = os.environ.get('NER_SKIP_POLICY', 'never')
+
+# PRIORITY_SENTIMENT=lexicon (default) scores sentiment with the precomputed
+# lexicon in sentiment.py; 'textblob' builds a TextBlob per ticket (same
+# lexicon, slower); 'none' uses the urgency keywords only.
+PRIORITY_SENTIMENT = os.environ.get('PRIORITY_SENTIMENT', 'lexicon')
+
+# CASCADE_MIN_CONFIDENCE > 0 answers the category from the keyword scorer,
+# skipping the classifier and NER, when its calibrated confidence is at least
+# this much; only with models/calibration.json from train.py. 0 disables it.
+CASCADE_MIN_CONFIDENCE = float(os.environ.get('CASCADE_MIN_CONFIDENCE', 0))
+# Fields an early exit answers with the cheap engines
+EARLY_EXIT_ENGINES = {"category": "keywords", "entities": "regex"}
+
+# With WARMUP=background the warm-up thread loads the sentiment backend, and
+# requests served before that use keywords only; otherwise it loads on first use.
+LAZY_SENTIMENT = os.environ.get('WARMUP', 'eager') != 'background'
+
+NER_STATS = Counter()
+_ner_stats_lock = threading.Lock()
+CASCADE_STATS = Counter()
+_cascade_stats_lock = threading.Lock()
+
+def model_fingerprint():
+    """Cheap stat-based signature of the model pickles on disk"""
+    signature = []
+    for path in (CLASSIFIER_PATH, VECTORIZER_PATH, ARTIFACT_PATH):
+        try:
+            st = os.stat(path)
+            signature.append((path, st.st_size, st.st_mtime_ns))
+        except OSError:
+            signature.append((path, None, None))
+    return tuple(signature)
 
 def load_models():
     """Load all models and components"""
-    models = {}
-    
-    # Load spaCy model
+    models = load_classifier()
+    models['nlp'] = load_nlp()
+    load_sentiment()
+    return models
+
+def load_nlp():
+    """Load the spaCy pipeline, or None if en_core_web_sm is not installed"""
     try:
-        models['nlp'] = spacy.load('en_core_web_sm')
+        return _load_spacy()
     except OSError:
         print("Warning: en_core_web_sm not found. Install with: python -m spacy download en_core_web_sm")
-        models['nlp'] = None
-    
-    # Load classifier and vectorizer
+        return None
+
+def load_classifier():
+    """Load classifier and vectorizer; returns {'vectorizer', 'clf', 'calibration', 'version'}"""
+    models = {'calibration': load_calibration()}
+    
+    # Compact artifact: memory-mapped, shared between workers, no pickle code
+    if MODEL_FORMAT == 'compact' or (MODEL_FORMAT == 'auto' and _artifact_is_current()):
+        try:
+            timed_import('numpy')
+            from model_artifact import load_model
+            engine, models['version'] = load_model(ARTIFACT_PATH)
+            models['vectorizer'], models['clf'] = engine.featurizer, engine.scorer
+            return models
+        except (OSError, ValueError) as e:
+            print(f"Warning: could not load {ARTIFACT_PATH} ({e}); falling back to pickles")
+    
+    # Load classifier and vectorizer; the model version is a hash of the
+    # exact bytes that were unpickled
     try:
-        with open('models/classifier.pkl', 'rb') as f:
-            models['clf'] = pickle.load(f)
-        with open('models/vectorizer.pkl', 'rb') as f:
-            models['vectorizer'] = pickle.load(f)
+        with open(CLASSIFIER_PATH, 'rb') as f:
+            clf_bytes = f.read()
+        with open(VECTORIZER_PATH, 'rb') as f:
+            vectorizer_bytes = f.read()
+        timed_import('numpy')
+        timed_import('sklearn.linear_model')
+        timed_import('sklearn.feature_extraction.text')
+        models['clf'] = pickle.loads(clf_bytes)
+        models['vectorizer'] = pickle.loads(vectorizer_bytes)
+        models['version'] = hashlib.sha256(clf_bytes + vectorizer_bytes).hexdigest()[:12]
+        if INFERENCE_ENGINE == 'numpy':
+            models['vectorizer'], models['clf'] = _numpy_engine(models['vectorizer'], models['clf'])
     except FileNotFoundError:
         print("Warning: Classifier models not found. Run train.py first.")
         models['clf'] = None
         models['vectorizer'] = None
+        models['calibration'] = None
+        models['version'] = 'rules'
     
     return models
 
-def classify_category(text, vectorizer, clf, request_type=None):
+def _artifact_is_current():
+    """True if model.bin exists and no pickle was written after it (it would not match them)"""
+    try:
+        built = os.stat(ARTIFACT_PATH).st_mtime_ns
+    except OSError:
+        return False
+    for path in (CLASSIFIER_PATH, VECTORIZER_PATH):
+        try:
+            if os.stat(path).st_mtime_ns > built:
+                print(f"Warning: {path} is newer than {ARTIFACT_PATH}; serving the pickles "
+                      f"(run python model_artifact.py export to rebuild it)")
+                return False
+        except OSError:
+            pass
+    return True
+
+def load_calibration():
+    """The calibration train.py saved with the models, or None (raw confidences)"""
+    try:
+        return Calibration.load(CALIBRATION_PATH)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Warning: could not load {CALIBRATION_PATH} ({e}); confidences are not calibrated")
+        return None
+
+_sentiment_polarity = None
+
+def load_sentiment():
+    """Load the PRIORITY_SENTIMENT backend for detect_priority; False if unavailable"""
+    global _sentiment_polarity
+    if _sentiment_polarity is None:
+        _sentiment_polarity = _load_sentiment_backend()
+    return bool(_sentiment_polarity)
+
+def _load_sentiment_backend():
+    if PRIORITY_SENTIMENT == 'none':
+        return False
+    if PRIORITY_SENTIMENT == 'textblob':
+        try:
+            TextBlob = timed_import('textblob').TextBlob
+        except ImportError:
+            print("Warning: textblob not installed; priority uses keywords only")
+            return False
+        return lambda text: TextBlob(text).sentiment.polarity
+    
+    from sentiment import load_lexicon_sentiment
+    try:
+        return load_lexicon_sentiment().polarity
+    except (OSError, ImportError, ValueError) as e:
+        print(f"Warning: sentiment lexicon unavailable ({e}); priority uses keywords only")
+        return False
+
+def _load_spacy():
+    """Load en_core_web_sm with the components SPACY_PIPELINE asks for"""
+    spacy = timed_import('spacy')
+    if SPACY_PIPELINE == 'full':
+        return spacy.load('en_core_web_sm')
+    
+    nlp = spacy.load('en_core_web_sm', exclude=UNUSED_SPACY_COMPONENTS)
+    # In en_core_web_sm the shared tok2vec only feeds the tagger and parser;
+    # NER embeds its own, so drop tok2vec once nothing listens to it
+    if 'tok2vec' in nlp.pipe_names and not nlp.get_pipe('tok2vec').listening_components:
+        nlp.remove_pipe('tok2vec')
+    return nlp
+
+def _numpy_engine(vectorizer, clf):
+    """Swap fitted sklearn objects for the NumPy engine when it supports them"""
+    from inference import InferenceEngine
+    try:
+        engine = InferenceEngine.from_sklearn(vectorizer, clf)
+    except ValueError as e:
+        print(f"Warning: NumPy inference engine unavailable ({e}); using sklearn")
+        return vectorizer, clf
+    return engine.featurizer, engine.scorer
+
+def classify_category(text, vectorizer, clf, request_type=None, calibration=None):
     """Classify text into Network/Security/Cloud/General categories"""
     if not vectorizer or not clf:
         # Fallback to rule-based classification
-        return _fallback_category_classification(text, request_type)
+        return _fallback_category_classification(text, request_type, calibration)
     
     # Use trained model
+    import numpy as np
     text_features = vectorizer.transform([text])
     probabilities = clf.predict_proba(text_features)[0]
     predicted_class = clf.classes_[np.argmax(probabilities)]
     confidence = np.max(probabilities)
+    if calibration is not None:
+        confidence = calibration.model(confidence)
     
     return predicted_class, confidence
 
-def _fallback_category_classification(text, request_type):
-    """Rule-based fallback for category classification"""
-    text_lower = text.lower()
+def classify_categories(texts, vectorizer, clf, request_types=None, calibration=None):
+    """Classify a batch of texts with a single transform/predict_proba call"""
+    if request_types is None:
+        request_types = [None] * len(texts)
     
-    network_keywords = ['wifi', 'internet', 'connection', 'network', 'bandwidth', 'router', 'switch', 'vpn', 'dns']
-    security_keywords = ['password', 'access', 'login', 'security', 'breach', 'virus', 'malware', 'authentication', 'firewall']
-    cloud_keywords = ['cloud', 'backup', 'sync', 'storage', 'drive', 'aws', 'azure', 'google', 'dropbox', 'onedrive']
+    if not vectorizer or not clf:
+        return [_fallback_category_classification(text, request_type, calibration)
+                for text, request_type in zip(texts, request_types)]
     
-    network_score = sum(1 for kw in network_keywords if kw in text_lower)
-    security_score = sum(1 for kw in security_keywords if kw in text_lower)
-    cloud_score = sum(1 for kw in cloud_keywords if kw in text_lower)
+    import numpy as np
+    text_features = vectorizer.transform(texts)
+    probabilities = clf.predict_proba(text_features)
+    best = np.argmax(probabilities, axis=1)
     
-    scores = {
-        'Network': network_score,
-        'Security': security_score,
-        'Cloud': cloud_score,
-        'General': 0
-    }
+    if calibration is not None:
+        return [(clf.classes_[idx], calibration.model(probabilities[row, idx])) for row, idx in enumerate(best)]
+    return [(clf.classes_[idx], probabilities[row, idx]) for row, idx in enumerate(best)]
+
+def keyword_category(text, request_type=None):
+    """(category, score, lead over the runner-up) from the category keywords"""
+    scores = TICKET_KEYWORDS.scores(text)
+    scores.pop('urgency')
+    scores.setdefault('General', 0)
     
     # Boost score if request_type matches
     if request_type in scores:
@@ -72,20 +284,90 @@ def _fallback_category_classification(text, request_type):
     max_score = scores[max_category]
     
     if max_score == 0:
+        return 'General', 0, 0
+    
+    runner_up = max((score for category, score in scores.items() if category != max_category), default=0)
+    return max_category, max_score, max_score - runner_up
+
+def _fallback_category_classification(text, request_type, calibration=None):
+    """Rule-based fallback for category classification
+
+    requestType still breaks ties, but the calibrated confidence only counts
+    the text's own keywords, as the curve was fitted: a category that leads
+    only through the boost gets the curve's value for no lead at all.
+    """
+    category, score, lead = keyword_category(text, request_type)
+    if calibration is not None:
+        text_category, _, text_lead = keyword_category(text)
+        return category, calibration.keywords(text_lead if text_category == category else 0)
+    
+    if score == 0:
         return 'General', 0.5
     
-    confidence = min(0.9, 0.5 + (max_score / 10))
-    return max_category, confidence
+    confidence = min(0.9, 0.5 + (score / 10))
+    return category, confidence
+
+def keyword_exit(text, calibration):
+    """The keyword scorer's (category, confidence) when the cascade can skip the model, else None
+
+    Scored without the requestType boost, like the tickets the curve was
+    fitted on: a lead that comes only from the requester's own requestType
+    says nothing about the text, and must not let it skip the classifier.
+    """
+    if CASCADE_MIN_CONFIDENCE <= 0 or calibration is None:
+        return None
+    category, _, lead = keyword_category(text)
+    confidence = calibration.keywords(lead)
+    early = confidence >= CASCADE_MIN_CONFIDENCE
+    with _cascade_stats_lock:
+        CASCADE_STATS['early_exit' if early else 'model'] += 1
+    return (category, confidence) if early else None
 
 def extract_entities(text, nlp):
     """Extract entities using spaCy NER and custom rules"""
-    entities = {"service": None, "device": None, "location": None, "other": []}
-    
     if not nlp:
         # Fallback regex extraction
         return _fallback_entity_extraction(text)
     
-    doc = nlp(text)
+    entities = _entities_without_ner(text)
+    if entities is not None:
+        return entities
+    
+    return _entities_from_doc(text, nlp(text))
+
+def extract_entities_batch(texts, nlp, batch_size=64):
+    """Extract entities for many texts, running NER through nlp.pipe"""
+    if not nlp:
+        return [_fallback_entity_extraction(text) for text in texts]
+    
+    results = [_entities_without_ner(text) for text in texts]
+    pending = [i for i, entities in enumerate(results) if entities is None]
+    
+    docs = nlp.pipe((texts[i] for i in pending), batch_size=batch_size)
+    for i, doc in zip(pending, docs):
+        results[i] = _entities_from_doc(texts[i], doc)
+    
+    return results
+
+def extract_entities_windowed(windows, nlp):
+    """Entities of a ticket too large to run whole: its windows through one nlp.pipe pass, merged"""
+    return merge_entities(extract_entities_batch(windows, nlp))
+
+def _entities_without_ner(text):
+    """Regex-only entities when NER_SKIP_POLICY allows skipping spaCy, else None"""
+    entities = None
+    if NER_SKIP_POLICY == 'when_filled':
+        found = SKIP_NER_EXTRACTOR.extract(text)
+        if all(found.values()):
+            entities = found
+    
+    with _ner_stats_lock:
+        NER_STATS['skipped' if entities is not None else 'run'] += 1
+    return entities
+
+def _entities_from_doc(text, doc):
+    """Map spaCy entities plus device regex matches to the entity slots"""
+    entities = {"service": None, "device": None, "location": None, "other": []}
     
     # Extract entities from spaCy
     for ent in doc.ents:
@@ -99,17 +381,7 @@ def extract_entities(text, nlp):
             entities["other"].append(ent.text)
     
     # Custom regex patterns for devices
-    device_patterns = [
-        r'\b(?:laptop|desktop|computer|pc|server|router|switch|printer|phone|tablet|iphone|android)\b',
-        r'\b(?:model|serial)[\s#:]*([A-Z0-9\-]+)\b',
-        r'\b[A-Z]{2,}\d{3,}\b'  # Device model patterns like HP123, DELL456
-    ]
-    
-    for pattern in device_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        if matches and not entities["device"]:
-            entities["device"] = matches[0] if isinstance(matches[0], str) else matches[0][0]
-            break
+    entities["device"] = DEVICE_EXTRACTOR.extract(text)["device"]
     
     # Clean up empty lists
     if not entities["other"]:
@@ -119,68 +391,23 @@ def extract_entities(text, nlp):
 
 def _fallback_entity_extraction(text):
     """Regex-based entity extraction fallback"""
-    entities = {"service": None, "device": None, "location": None}
-    
-    # Service patterns
-    service_patterns = [
-        r'\b(?:office|outlook|teams|sharepoint|onedrive|dropbox|gmail|slack)\b',
-        r'\b(?:windows|linux|macos|ubuntu|ios|android)\b'
-    ]
-    
-    for pattern in service_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            entities["service"] = match.group()
-            break
-    
-    # Device patterns
-    device_patterns = [
-        r'\b(?:laptop|desktop|computer|pc|server|router|switch|printer|phone)\b'
-    ]
-    
-    for pattern in device_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            entities["device"] = match.group()
-            break
-    
-    # Location patterns
-    location_patterns = [
-        r'\b(?:office|building|floor|room|conference|lobby|parking)\s*\w*\b',
-        r'\b(?:headquarters|branch|site|location)\b'
-    ]
-    
-    for pattern in location_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            entities["location"] = match.group().strip()
-            break
-    
-    return entities
+    return FALLBACK_EXTRACTOR.extract(text)
+
+def sentiment_engine():
+    """Name of the sentiment backend detect_priority is using"""
+    return PRIORITY_SENTIMENT if _sentiment_polarity else 'keywords'
 
-def detect_priority(text):
+def detect_priority(text, use_sentiment=True):
     """Detect priority based on keywords and sentiment"""
-    text_lower = text.lower()
-    
-    # Urgency keywords with weights
-    urgent_keywords = {
-        'emergency': 3, 'critical': 3, 'urgent': 3, 'immediately': 3,
-        'asap': 2, 'quickly': 2, 'fast': 2, 'soon': 2, 'important': 2,
-        'down': 3, 'outage': 3, 'broken': 2, 'not working': 2, 'failed': 2,
-        'problem': 1, 'issue': 1, 'help': 1
-    }
-    
-    urgency_score = sum(weight for keyword, weight in urgent_keywords.items() if keyword in text_lower)
+    urgency_score = TICKET_KEYWORDS.scores(text)['urgency']
     
-    # Sentiment analysis
-    try:
-        blob = TextBlob(text)
-        sentiment_score = blob.sentiment.polarity
+    # Sentiment analysis; skipped until load_sentiment has run (see LAZY_SENTIMENT)
+    if use_sentiment and _sentiment_polarity is None and LAZY_SENTIMENT:
+        load_sentiment()
+    if use_sentiment and _sentiment_polarity:
         # Negative sentiment increases urgency
-        if sentiment_score < -0.1:
+        if _sentiment_polarity(text) < -0.1:
             urgency_score += 1
-    except:
-        sentiment_score = 0
     
     # Priority determination
     if urgency_score >= 5:
@@ -198,23 +425,17 @@ def detect_priority(text):
     
     return priority, confidence
 
-def summarize_text(text):
-    """Create extractive summary"""
-    if not text:
-        return ""
-    
-    sentences = re.split(r'[.!?]+', text.strip())
-    sentences = [s.strip() for s in sentences if len(s.strip()) > 10]
-    
-    if not sentences:
-        return text[:100] + "..." if len(text) > 100 else text
-    
-    # Take first 1-2 sentences, max 150 chars
-    summary = sentences[0]
-    if len(summary) < 80 and len(sentences) > 1:
-        summary += ". " + sentences[1]
-    
-    if len(summary) > 150:
-        summary = summary[:147] + "..."
-    
-    return summary
\ No newline at end of file
+def summarize_text(text, vectorizer=None):
+    """Create extractive summary (sentences scored by TF-IDF and urgency/category keywords)"""
+    return summarize(text, _summary_weights(vectorizer), TICKET_KEYWORDS, SUMMARY_KEYWORD_WEIGHTS)
+
+_term_weights = (None, TermWeights())  # (vectorizer, its TermWeights)
+
+def _summary_weights(vectorizer):
+    # Built once per vectorizer; a hot-reloaded model gets its own weights
+    global _term_weights
+    current = _term_weights
+    if current[0] is not vectorizer:
+        current = _term_weights = (vectorizer, TermWeights.from_vectorizer(vectorizer) if vectorizer is not None
+                                   else TermWeights())
+    return current[1]
\ No newline at end of file
@@ -0,0 +1,311 @@
+"""
+Ticket analysis pipeline shared by the HTTP endpoints
+Runs classification, entity extraction, priority detection and summarization
+for one ticket or for a whole batch of tickets. Tickets over LARGE_INPUT_CHARS
+run on bounded windows of their text (see large_input.py). With
+CASCADE_MIN_CONFIDENCE set, the keyword scorer goes first and a ticket it is
+sure about skips the classifier and NER
+"""
+
+import time
+from collections import Counter
+
+from cache import cache_key
+from timing import STAGE_TIMER, STAGE_LATENCY
+from metrics import STAGE_SECONDS, INPUT_CHARS, ENGINE_RESULTS
+from model_loader import (
+    classify_category, classify_categories, extract_entities, extract_entities_batch, extract_entities_windowed,
+    detect_priority, summarize_text, sentiment_engine, keyword_exit, EARLY_EXIT_ENGINES
+)
+from large_input import FULL, check_item, merge_entities, split_input
+
+# Every field of a result names the engine that produced it:
+#   category: model | keywords | rules      entities: ner | regex | rules
+#   priority: lexicon | textblob | keywords | rules   summary: extractive | rules
+# "rules" is the dependency-free SimpleTicketClassifier from app_minimal.py.
+RULE_ENGINES = {"category": "rules", "entities": "rules", "priority": "rules", "summary": "rules"}
+
+_rule_engine = None
+
+# Timer stage -> result field it produces
+_STAGE_FIELDS = (("classify", "category"), ("entities", "entities"), ("priority", "priority"), ("summary", "summary"))
+
+# Engine combination -> (stage label sets, field label sets), built once each
+_metric_labels = {}
+
+
+def parse_item(data):
+    """Validate a request payload and return (text, request_type)"""
+    if not isinstance(data, dict):
+        raise ValueError("each item must be an object")
+
+    for field in ('description', 'requestType', 'audioBase64'):
+        if data.get(field) is not None and not isinstance(data[field], str):
+            raise ValueError(f"{field} must be a string")
+
+    description = data.get('description') or ''
+    audio_b64 = data.get('audioBase64')
+    # Raw audio bytes only come from MessagePack bodies (see wire.py)
+    audio = data.get('audio') if isinstance(data.get('audio'), bytes) else None
+    # Size limits first, so an oversized ticket is not even copied by strip()
+    check_item(description, audio_b64, audio)
+    description = description.strip()
+    request_type = (data.get('requestType') or '').strip()
+
+    if not description and not audio_b64 and not audio:
+        raise ValueError("description or audioBase64 is required")
+
+    INPUT_CHARS.observe(len(description))
+
+    # TODO: Audio transcription can be added later if needed
+    return description, request_type
+
+
+def build_result(category, cat_conf, priority, pri_conf, summary, entities, engines, model_version=None,
+                 input_path=FULL):
+    """Assemble the /analyze response body
+
+    input_path is large_input.FULL when every stage saw the whole ticket,
+    WINDOWED when they ran on bounded windows of it.
+    """
+    return {
+        "category": category,
+        "priority": priority,
+        "summary": summary,
+        "entities": entities,
+        "confidence": {"category": round(cat_conf, 3), "priority": round(pri_conf, 3)},
+        "engines": engines,
+        "modelVersion": model_version,
+        "inputPath": input_path
+    }
+
+
+def full_engines(models):
+    """Engines the full pipeline uses with the models that are loaded"""
+    return {
+        "category": "model" if models['clf'] else "keywords",
+        "entities": "ner" if models['nlp'] else "regex",
+        "priority": sentiment_engine(),
+        "summary": "extractive"
+    }
+
+
+def _rules():
+    global _rule_engine
+    if _rule_engine is None:
+        from app_minimal import SimpleTicketClassifier
+        _rule_engine = SimpleTicketClassifier()
+    return _rule_engine
+
+
+def ticket_entities(input_path, text, windows, nlp):
+    """Entities of a ticket, whole or from its windows (see large_input.split_input)"""
+    return extract_entities(text, nlp) if input_path == FULL else extract_entities_windowed(windows, nlp)
+
+
+def _run_stages(text, request_type, models, engines):
+    """(category, cat_conf, entities, priority, pri_conf, summary, elapsed, input path, early exit) with the given engines"""
+    clock = time.perf_counter
+    input_path, view, windows = split_input(text)
+    early = None
+    if engines == RULE_ENGINES:
+        rules = _rules()
+        t0 = clock()
+        category, cat_conf = rules.classify_category(view, request_type)
+        t1 = clock()
+        if input_path == FULL:
+            entities = rules.extract_entities(text)
+        else:
+            entities = merge_entities([rules.extract_entities(window) for window in windows])
+        t2 = clock()
+        priority, pri_conf = rules.detect_priority(view)
+        t3 = clock()
+        summary = rules.summarize_text(view)
+    else:
+        with_model = engines['category'] == 'model'
+        nlp = models['nlp'] if engines['entities'] == 'ner' else None
+        calibration = models.get('calibration')
+        t0 = clock()
+        early = keyword_exit(view, calibration) if with_model else None
+        if early is not None:
+            category, cat_conf = early
+            nlp = None
+        else:
+            category, cat_conf = classify_category(
+                view, models['vectorizer'] if with_model else None, models['clf'] if with_model else None,
+                request_type, calibration)
+        t1 = clock()
+        entities = ticket_entities(input_path, text, windows, nlp)
+        t2 = clock()
+        priority, pri_conf = detect_priority(view, use_sentiment=engines['priority'] != 'keywords')
+        t3 = clock()
+        summary = summarize_text(view, models['vectorizer'])
+    t4 = clock()
+    elapsed = {"classify": t1 - t0, "entities": t2 - t1, "priority": t3 - t2, "summary": t4 - t3}
+    return category, cat_conf, entities, priority, pri_conf, summary, elapsed, input_path, early is not None
+
+
+def observe_stages(elapsed, engines):
+    """Feed one ticket's stage times and engines into the /metrics histograms and counters"""
+    key = tuple(engines.values())
+    labels = _metric_labels.get(key)
+    if labels is None:
+        labels = _metric_labels[key] = (tuple((stage, engines[field]) for stage, field in _STAGE_FIELDS),
+                                        tuple((field, engines[field]) for _, field in _STAGE_FIELDS))
+    STAGE_SECONDS.observe_many(labels[0], [elapsed[stage] for stage, _ in _STAGE_FIELDS])
+    ENGINE_RESULTS.inc_many(labels[1])
+
+
+def analyze_text(text, request_type, models, timings=None, engines=None):
+    """Run the pipeline on a single ticket
+
+    engines picks a cheaper engine per field (see budget.choose_engines);
+    by default every stage uses the full models. Stage times are always
+    added to STAGE_TIMER and STAGE_LATENCY; pass a dict as timings to also
+    get this request's per-stage milliseconds.
+    """
+    category, cat_conf, entities, priority, pri_conf, summary, elapsed, input_path, early = _run_stages(
+        text, request_type, models, engines or full_engines(models))
+    # Named after the stages ran: the sentiment backend may load on first use
+    engines = engines or full_engines(models)
+    if early:
+        engines = dict(engines, **EARLY_EXIT_ENGINES)
+
+    STAGE_TIMER.record(elapsed)
+    for stage, field in _STAGE_FIELDS:
+        STAGE_LATENCY.record(stage, engines[field], elapsed[stage])
+    observe_stages(elapsed, engines)
+    if timings is not None:
+        timings.update({stage: round(seconds * 1000.0, 3) for stage, seconds in elapsed.items()})
+
+    return build_result(category, cat_conf, priority, pri_conf, summary, entities, engines, models['version'],
+                        input_path)
+
+
+def analyze_batch(items, models, cache=None):
+    """Run the pipeline over many raw payloads, returning results in input order
+
+    Invalid or failing items get an {"error": ...} entry instead of failing
+    the batch. With a cache, only the misses are analyzed.
+    """
+    results = [None] * len(items)
+    texts, request_types, positions, keys = [], [], [], []
+
+    for i, item in enumerate(items):
+        try:
+            text, request_type = parse_item(item)
+        except ValueError as e:
+            results[i] = {"error": str(e)}
+            continue
+
+        if cache is not None:
+            key = cache_key(text, request_type, models.get('version'))
+            cached = cache.get(key)
+            if cached is not None:
+                results[i] = cached
+                continue
+            keys.append(key)
+
+        texts.append(text)
+        request_types.append(request_type)
+        positions.append(i)
+
+    for n, outcome in enumerate(analyze_texts(texts, request_types, models)):
+        if isinstance(outcome, Exception):
+            outcome = {"error": f"analysis failed: {outcome}"}
+        elif cache is not None:
+            cache.put(keys[n], outcome)
+        results[positions[n]] = outcome
+
+    return results
+
+
+def analyze_texts(texts, request_types, models):
+    """Analyze already-validated tickets as one batch
+
+    Classification uses one vectorizer/classifier call and NER one nlp.pipe
+    pass for the whole batch (the windows of large tickets included), both
+    over the tickets the cascade did not answer from keywords alone.
+    Returns a result dict per ticket, or the exception raised while
+    analyzing that ticket.
+    """
+    if not texts:
+        return []
+
+    inputs = [split_input(text) for text in texts]
+    calibration = models.get('calibration')
+    clock = time.perf_counter
+    t0 = clock()
+    exits = [keyword_exit(view, calibration) if models['clf'] else None for _, view, _ in inputs]
+    modeled = [n for n, early in enumerate(exits) if early is None]
+    try:
+        categories = dict(zip(modeled, classify_categories(
+            [inputs[n][1] for n in modeled], models['vectorizer'], models['clf'], [request_types[n] for n in modeled],
+            calibration)))
+    except Exception:
+        categories = None
+    t1 = clock()
+    try:
+        found = iter(extract_entities_batch([window for n in modeled for window in inputs[n][2]], models['nlp']))
+        entities = {n: next(found) if inputs[n][0] == FULL else merge_entities([next(found) for _ in inputs[n][2]])
+                    for n in modeled}
+    except Exception:
+        entities = None
+    t2 = clock()
+    STAGE_TIMER.record({"classify": t1 - t0, "entities": t2 - t1}, items=len(texts))
+    # The batch stages are shared, so each ticket is one sample of its share:
+    # a 1000-item batch must not look like one very slow single ticket
+    engines = full_engines(models)
+    classify_labels, entities_labels = ("classify", engines['category']), ("entities", engines['entities'])
+    classify_time, entities_time = (t1 - t0) / len(texts), (t2 - t1) / len(texts)
+    for _ in texts:
+        STAGE_LATENCY.record(*classify_labels, classify_time)
+        STAGE_LATENCY.record(*entities_labels, entities_time)
+    STAGE_SECONDS.observe_many([classify_labels, entities_labels] * len(texts),
+                               [classify_time, entities_time] * len(texts))
+
+    outcomes = []
+    priority_times, summary_times = [], []
+    for n, ((input_path, view, windows), request_type) in enumerate(zip(inputs, request_types)):
+        try:
+            item_engines = full_engines(models)
+            if exits[n] is not None:
+                category, cat_conf = exits[n]
+                item_entities = ticket_entities(input_path, view, windows, None)
+                item_engines.update(EARLY_EXIT_ENGINES)
+            else:
+                # A failed batch stage is retried per item so one bad ticket
+                # only costs itself
+                if categories is not None:
+                    category, cat_conf = categories[n]
+                else:
+                    category, cat_conf = classify_category(view, models['vectorizer'], models['clf'], request_type,
+                                                           calibration)
+                if entities is not None:
+                    item_entities = entities[n]
+                else:
+                    item_entities = ticket_entities(input_path, view, windows, models['nlp'])
+            t3 = clock()
+            priority, pri_conf = detect_priority(view)
+            t4 = clock()
+            summary = summarize_text(view, models['vectorizer'])
+            priority_times.append(t4 - t3)
+            summary_times.append(clock() - t4)
+        except Exception as e:
+            outcomes.append(e)
+            continue
+        outcomes.append(build_result(category, cat_conf, priority, pri_conf, summary, item_entities,
+                                     item_engines, models['version'], input_path))
+
+    STAGE_TIMER.record({"priority": sum(priority_times), "summary": sum(summary_times)}, items=len(texts))
+    # Priority and summary run ticket by ticket, so each ticket is one sample
+    priority_labels, summary_labels = ("priority", sentiment_engine()), ("summary", "extractive")
+    for priority_time, summary_time in zip(priority_times, summary_times):
+        STAGE_LATENCY.record(*priority_labels, priority_time)
+        STAGE_LATENCY.record(*summary_labels, summary_time)
+    STAGE_SECONDS.observe_many([priority_labels] * len(priority_times) + [summary_labels] * len(summary_times),
+                               priority_times + summary_times)
+    completed = Counter(tuple(outcome['engines'].items()) for outcome in outcomes if not isinstance(outcome, Exception))
+    for engines, count in completed.items():
+        ENGINE_RESULTS.inc_many(engines, count)
+    return outcomes
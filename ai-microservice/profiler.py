@@ -0,0 +1,169 @@
+"""
+Sampling profiler for /analyze requests
+While a traced request runs, a background thread samples its Python stack
+every few milliseconds. A trace is kept when the request was picked by the
+sample rate or turned out slower than the threshold; the last N kept traces
+live in a ring buffer and are served as collapsed stacks (flamegraph input)
+"""
+
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+
+class Trace:
+    """Stack samples and ticket details for one request"""
+
+    __slots__ = ('id', 'thread', 'started', 'sampled', 'stacks', 'samples', 'info')
+
+    def __init__(self, trace_id, sampled):
+        self.id = trace_id
+        self.thread = threading.get_ident()
+        self.started = time.perf_counter()
+        self.sampled = sampled
+        self.stacks = Counter()
+        self.samples = 0
+        self.info = {}
+
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse(frame):
+    """Root-first 'a;b;c' stack of a frame, as flamegraph.pl and speedscope read it"""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class RequestProfiler:
+    """Samples the stacks of in-flight requests and keeps the interesting ones
+
+    sample_rate is the fraction of requests kept regardless of latency and
+    slow_ms keeps any request slower than that; with both at 0 the profiler
+    is off and start() returns None.
+    """
+
+    def __init__(self, sample_rate=0.0, slow_ms=0.0, interval_ms=5.0, keep=50):
+        self.sample_rate = max(0.0, min(float(sample_rate), 1.0))
+        self.slow = max(0.0, float(slow_ms)) / 1000.0
+        self.interval = max(0.5, float(interval_ms)) / 1000.0
+        self.enabled = self.sample_rate > 0 or self.slow > 0
+        self._ids = itertools.count(1)
+        self._active = {}
+        self._kept = deque(maxlen=max(1, int(keep)))
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._discarded = 0
+
+    def start(self):
+        """Begin tracing the calling thread's request; None when profiling is off"""
+        if not self.enabled:
+            return None
+        trace = Trace(next(self._ids), random.random() < self.sample_rate)
+        with self._lock:
+            self._active[trace.id] = trace
+        self._ensure_sampler()
+        self._wake.set()
+        return trace
+
+    def finish(self, trace, **info):
+        """Stop sampling; keep the trace if it was sampled or slow
+
+        info is stored with the trace (ticket length, category, stage
+        timings...). Returns True if the trace was kept.
+        """
+        duration = time.perf_counter() - trace.started
+        with self._lock:
+            self._active.pop(trace.id, None)
+            reason = 'sampled' if trace.sampled else ('slow' if self.slow and duration >= self.slow else None)
+            if reason is None:
+                self._discarded += 1
+                return False
+            trace.info = dict(info, id=trace.id, reason=reason, durationMs=round(duration * 1000.0, 3),
+                              at=time.time(), samples=trace.samples)
+            self._kept.append(trace)
+            return True
+
+    def _ensure_sampler(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            with self._lock:
+                active = list(self._active.values())
+            if not active:
+                self._wake.clear()
+                # A start() between the snapshot and clear() must not be missed
+                with self._lock:
+                    if self._active:
+                        self._wake.set()
+                continue
+            frames = sys._current_frames()
+            for trace in active:
+                frame = frames.get(trace.thread)
+                if frame is not None:
+                    trace.stacks[collapse(frame)] += 1
+                    trace.samples += 1
+            del frames
+            time.sleep(self.interval)
+
+    def profiles(self):
+        """Kept traces, newest first, without their stacks"""
+        with self._lock:
+            return [dict(trace.info) for trace in reversed(self._kept)]
+
+    def collapsed(self, trace_id=None, by=None):
+        """Collapsed stack lines ('frame;frame;frame count') for one kept trace or all of them
+
+        by='category' or by='length' prefixes every stack with the ticket's
+        category or length bucket, so a flamegraph splits by input.
+        """
+        with self._lock:
+            traces = [trace for trace in self._kept if trace_id is None or trace.id == trace_id]
+        if trace_id is not None and not traces:
+            return None
+        merged = Counter()
+        for trace in traces:
+            prefix = _group(trace.info, by)
+            for stack, count in trace.stacks.items():
+                merged[prefix + stack if prefix else stack] += count
+        return ''.join(f"{stack} {count}\n" for stack, count in merged.most_common())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "sampleRate": self.sample_rate,
+                "slowMs": self.slow * 1000.0,
+                "intervalMs": self.interval * 1000.0,
+                "active": len(self._active),
+                "kept": len(self._kept),
+                "capacity": self._kept.maxlen,
+                "discarded": self._discarded,
+            }
+
+
+def _group(info, by):
+    if by == 'category':
+        return f"category={info.get('category')};"
+    if by == 'length':
+        chars = info.get('chars') or 0
+        upper = 16
+        while upper <= chars:
+            upper *= 4
+        return f"chars<{upper};"
+    return ''
@@ -0,0 +1,159 @@
+"""
+Versioned model registry with hot reload
+Serving code reads registry.current once per request and keeps that dict for
+the whole request. A reload loads the new classifier in the background,
+checks it against the held-out smoke set train.py writes, and publishes it
+by replacing the reference, so in-flight requests finish on the version
+they started with. The replaced version is kept for rollback
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+# Used when train.py has not written a smoke set (older model directories)
+DEFAULT_SMOKE_SET = [
+    ("WiFi is down in the conference room on floor 3", "Network"),
+    ("Cannot connect to the VPN from home", "Network"),
+    ("My password is not working and my account is locked", "Security"),
+    ("Suspicious email with a virus attachment", "Security"),
+    ("OneDrive is not syncing my files to the cloud", "Cloud"),
+    ("Cannot access the AWS console", "Cloud"),
+    ("Printer is out of toner", "General"),
+    ("Need a new keyboard and mouse", "General"),
+]
+
+
+def read_smoke_set(path):
+    """[(text, label)] from a smoke set file, or DEFAULT_SMOKE_SET if there is none"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return list(DEFAULT_SMOKE_SET)
+    return list(zip(data['texts'], data['labels']))
+
+
+class ModelRegistry:
+    """Current and previous model sets, swapped atomically
+
+    load() returns the classifier part of a model set ({'vectorizer',
+    'clf', 'version'}); the rest of the current set (the spaCy pipeline)
+    carries over to the new version. fingerprint() is a cheap signature of
+    the files load() reads, polled by watch().
+    """
+
+    def __init__(self, models, load, fingerprint, smoke_path, min_accuracy=0.0, max_accuracy_drop=0.1):
+        self._current = models
+        self._previous = None
+        self.load = load
+        self.fingerprint = fingerprint
+        self.smoke_path = smoke_path
+        self.min_accuracy = min_accuracy
+        self.max_accuracy_drop = max_accuracy_drop
+        self.history = deque(maxlen=20)
+        # One reload or rollback at a time; serving never takes this lock
+        self._lock = threading.Lock()
+        self._watch_lock = threading.Lock()
+        self._thread = None
+        self._seen = fingerprint()
+
+    @property
+    def current(self):
+        return self._current
+
+    @property
+    def previous(self):
+        return self._previous
+
+    def _record(self, action, outcome, **details):
+        event = dict(details, action=action, outcome=outcome, at=time.time())
+        self.history.append(event)
+        print(f"Model {action}: {outcome} {details}")
+        return event
+
+    def accuracy(self, models, smoke_set):
+        """Share of the smoke set the model set's classifier labels correctly"""
+        from model_loader import classify_categories
+        predictions = classify_categories([text for text, _ in smoke_set], models['vectorizer'], models['clf'])
+        return sum(predicted == label for (predicted, _), (_, label) in zip(predictions, smoke_set)) / len(smoke_set)
+
+    def reload(self, force=False):
+        """Load, validate and publish the model files on disk; returns what happened"""
+        with self._lock:
+            current = self._current
+            started = time.perf_counter()
+            try:
+                candidate = dict(current, **self.load())
+            except Exception as e:
+                return self._record('reload', 'failed', error=f"load: {e}")
+            if candidate['clf'] is None:
+                return self._record('reload', 'rejected', error="no classifier on disk")
+            if candidate['version'] == current['version'] and not force:
+                return self._record('reload', 'unchanged', version=current['version'])
+
+            try:
+                smoke_set = read_smoke_set(self.smoke_path)
+                accuracy = self.accuracy(candidate, smoke_set)
+                baseline = self.accuracy(current, smoke_set) if current['clf'] is not None else None
+            except Exception as e:
+                return self._record('reload', 'rejected', version=candidate['version'], error=f"smoke test: {e}")
+            details = dict(version=candidate['version'], accuracy=round(accuracy, 3),
+                           currentAccuracy=None if baseline is None else round(baseline, 3),
+                           smokeSetSize=len(smoke_set))
+            # The absolute floor only guards the first model; after that a new
+            # version is judged against the one it replaces, on the same tickets
+            floor = self.min_accuracy if baseline is None else baseline - self.max_accuracy_drop
+            if accuracy < floor:
+                return self._record('reload', 'rejected', error=f"smoke accuracy below {floor:.3f}", **details)
+
+            self._previous, self._current = current, candidate
+            return self._record('reload', 'swapped', previous=current['version'],
+                                loadMs=round((time.perf_counter() - started) * 1000.0, 1), **details)
+
+    def rollback(self):
+        """Swap back to the previous version (and keep the current one as previous)"""
+        with self._lock:
+            if self._previous is None:
+                return self._record('rollback', 'rejected', error="no previous version")
+            self._previous, self._current = self._current, self._previous
+            return self._record('rollback', 'swapped', version=self._current['version'],
+                                previous=self._previous['version'])
+
+    def check(self):
+        """Reload if the model files changed and are no longer being written"""
+        current = self.fingerprint()
+        if current == self._seen:
+            return None
+        time.sleep(0.5)
+        if self.fingerprint() != current:
+            return None  # still being written; look again next poll
+        self._seen = current
+        return self.reload()
+
+    def watch(self, interval):
+        """Poll the model files every interval seconds from a daemon thread (once per process)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._watch_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            # A forked worker inherits _thread but not the running thread
+            self._thread = threading.Thread(target=self._watch, args=(interval,), name='model-watch', daemon=True)
+            self._thread.start()
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.check()
+            except Exception as e:
+                self._record('reload', 'failed', error=str(e))
+
+    def stats(self):
+        return {
+            "version": self._current['version'],
+            "previousVersion": self._previous['version'] if self._previous is not None else None,
+            "history": list(self.history),
+        }
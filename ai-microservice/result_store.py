@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+On-disk second tier for the analysis result cache
+One SQLite file in WAL mode, shared by every worker process on the node and
+kept across restarts: readers never block each other or the writer. Entries
+are keyed on the cache key (text hash + model version, see cache.cache_key),
+bounded by compaction that drops expired entries and then the least recently
+used ones. Prewarm it from historical tickets with:
+
+  python result_store.py prewarm tickets.jsonl --db /var/cache/ai/results.db
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key BLOB PRIMARY KEY,
+    version TEXT,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    used_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_used_at ON results (used_at);
+"""
+
+
+class ResultStore:
+    """Bounded, TTL-evicted result store in a SQLite file
+
+    Recency is tracked to touch_interval seconds: a hit only writes its new
+    last-used time when the stored one is older than that, so a hot key
+    costs one read, not a write per hit. put() only queues the result: a
+    background thread per process writes the queue in batches, so requests
+    never wait for SQLite's single writer lock (at most max_pending results
+    wait; more are dropped). Every compact_every writes (per process) the
+    store is compacted back to max_entries. SQLite errors, including a
+    writer that stayed busy past busy_timeout_ms, count as a miss or a
+    skipped write, never as a failed request.
+    """
+
+    def __init__(self, path, max_entries=1000000, ttl_seconds=7 * 86400, touch_interval=60.0,
+                 compact_every=1000, busy_timeout_ms=50, max_pending=10000):
+        self.path = path
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl_seconds)
+        self.touch_interval = float(touch_interval)
+        self.compact_every = max(1, int(compact_every))
+        self.busy_timeout = busy_timeout_ms / 1000.0
+        self.max_pending = int(max_pending)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = []
+        self._wake = threading.Event()
+        self._writer_pid = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+        self.compactions = 0
+        self.removed = 0
+        self.dropped = 0
+        self._connect()
+
+    def _connect(self):
+        """This thread's connection; connections are never shared across threads or a fork"""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                 check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            # WAL + NORMAL: a commit is durable once checkpointed; a crash
+            # can only lose the last few cache writes, never corrupt the file
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.executescript(_SCHEMA)
+            local.db, local.pid = db, os.getpid()
+        return local.db
+
+    def _count(self, counter, n=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def get(self, key):
+        """The stored result for key, or None"""
+        now = time.time()
+        try:
+            db = self._connect()
+            row = db.execute('SELECT value, stored_at, used_at FROM results WHERE key = ?',
+                             (bytes.fromhex(key),)).fetchone()
+            if row is None or (self.ttl > 0 and now - row[1] > self.ttl):
+                self._count('misses')
+                return None
+            if now - row[2] > self.touch_interval:
+                db.execute('UPDATE results SET used_at = ? WHERE key = ?', (now, bytes.fromhex(key)))
+        except sqlite3.Error:
+            self._count('errors')
+            return None
+        self._count('hits')
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        """Queue a result for the background writer"""
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending.append((key, value))
+        if self._writer_pid != os.getpid():
+            self._start_writer()
+        self._wake.set()
+
+    def _start_writer(self):
+        with self._lock:
+            # A forked worker inherits _writer_pid but not the thread
+            if self._writer_pid == os.getpid():
+                return
+            self._writer_pid = os.getpid()
+        threading.Thread(target=self._write_behind, name='result-store', daemon=True).start()
+
+    def _write_behind(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write every queued result now"""
+        while True:
+            with self._lock:
+                batch, self._pending = self._pending[:500], self._pending[500:]
+            if not batch:
+                return
+            self.put_many(batch)
+
+    def put_many(self, items):
+        """Store [(key, result)] in one transaction, synchronously"""
+        now = time.time()
+        rows = [(bytes.fromhex(key), value.get('modelVersion'), json.dumps(value), now, now) for key, value in items]
+        if not rows:
+            return
+        try:
+            self._connect().executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)', rows)
+        except sqlite3.Error:
+            self._count('errors')
+            return
+        with self._lock:
+            before = self.writes
+            self.writes += len(rows)
+            due = before // self.compact_every != self.writes // self.compact_every
+        if due:
+            self.compact()
+
+    def compact(self):
+        """Drop expired entries, then the least recently used down to max_entries; returns how many"""
+        try:
+            db = self._connect()
+            # IMMEDIATE: workers compacting at once run one after the other
+            # instead of all deleting the same overflow
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                removed = 0
+                if self.ttl > 0:
+                    removed += db.execute('DELETE FROM results WHERE stored_at < ?',
+                                          (time.time() - self.ttl,)).rowcount
+                overflow = db.execute('SELECT COUNT(*) FROM results').fetchone()[0] - self.max_entries
+                if overflow > 0:
+                    removed += db.execute('DELETE FROM results WHERE key IN '
+                                          '(SELECT key FROM results ORDER BY used_at LIMIT ?)', (overflow,)).rowcount
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+        except sqlite3.Error:
+            self._count('errors')
+            return 0
+        with self._lock:
+            self.compactions += 1
+            self.removed += removed
+        return removed
+
+    def clear(self):
+        self._connect().execute('DELETE FROM results')
+
+    def stats(self):
+        try:
+            entries = self._connect().execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        size = sum(os.path.getsize(self.path + suffix) for suffix in ('', '-wal')
+                   if os.path.exists(self.path + suffix))
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": entries,
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl,
+                "bytes": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "writes": self.writes,
+                "pending": len(self._pending),
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "compactions": self.compactions,
+                "removed": self.removed,
+            }
+
+
+def prewarm(store, path, input_format=None, chunk_size=256, log=sys.stderr):
+    """Analyze a JSONL/CSV ticket export and store every result; returns (records, newly stored)
+
+    Tickets already in the store for the serving model version are skipped,
+    so an interrupted prewarm can simply be run again.
+    """
+    from bulk import read_csv, read_jsonl, chunked, parse_record
+    from cache import AnalysisCache
+    from model_loader import load_models
+    from pipeline import analyze_batch
+
+    models = load_models()
+    if models['clf'] is None:
+        raise ValueError("no classifier models found; run train.py first")
+    input_format = input_format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    records = read_csv(path) if input_format == 'csv' else read_jsonl(path)
+    # Write-through only: the memory tier would just hold the whole export
+    cache = AnalysisCache(0, store.ttl, store=store)
+
+    started = last_report = time.perf_counter()
+    done, writes = 0, store.writes
+    for chunk in chunked(records, chunk_size):
+        items = []
+        for _, raw, _ in chunk:
+            try:
+                items.append(parse_record(raw))
+            except ValueError:
+                items.append(None)
+        analyze_batch(items, models, cache)
+        store.flush()
+        done += len(chunk)
+        now = time.perf_counter()
+        if now - last_report >= 10:
+            print(f"{done} records ({done / (now - started):.0f}/s)", file=log)
+            last_report = now
+    store.compact()
+    elapsed = time.perf_counter() - started
+    stored = store.writes - writes
+    print(f"Prewarmed {stored} results from {done} records in {elapsed:.1f}s "
+          f"(model {models['version']}) -> {store.path}", file=log)
+    return done, stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the on-disk analysis result store')
+    parser.add_argument('command', choices=['prewarm', 'compact', 'stats'])
+    parser.add_argument('input', nargs='?', help='prewarm: JSONL or CSV ticket export')
+    parser.add_argument('--db', default=os.environ.get('CACHE_DB_PATH'), help='store file (default: $CACHE_DB_PATH)')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help='input format (default: from the extension)')
+    parser.add_argument('--chunk-size', type=int, default=256, help='tickets analyzed per batch')
+    parser.add_argument('--max-entries', type=int, default=int(os.environ.get('CACHE_DB_MAX_ENTRIES', 1000000)))
+    parser.add_argument('--ttl', type=float, default=float(os.environ.get('CACHE_DB_TTL_SECONDS', 7 * 86400)))
+    args = parser.parse_args()
+    if not args.db:
+        parser.error('--db or CACHE_DB_PATH is required')
+
+    store = ResultStore(args.db, args.max_entries, args.ttl)
+    if args.command == 'prewarm':
+        if not args.input:
+            parser.error('prewarm needs an input file')
+        prewarm(store, args.input, args.format, args.chunk_size)
+    elif args.command == 'compact':
+        print(f"Removed {store.compact()} entries")
+    print(json.dumps(store.stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Lexicon sentiment scorer for priority detection
+Scores polarity like TextBlob's PatternAnalyzer (same lexicon, negation,
+intensifier and '!' rules) in one regex token pass, without building a
+TextBlob, tokenizing sentences or parsing the XML lexicon per process
+
+Usage:
+  python sentiment.py export   # TextBlob's en-sentiment.xml -> sentiment_lexicon.tsv
+"""
+
+import argparse
+import os
+import re
+from array import array
+
+LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sentiment_lexicon.tsv')
+
+NEGATIONS = frozenset(('no', 'not', "n't", 'never'))
+
+# Whitespace-delimited emoticons score like words (TextBlob's mood table, lowercased)
+EMOTICONS = {
+    1.0: ('<3', '\u2665', ':d', ':-d', '=d', '=-d', 'xd', 'x-d', '8-d', '>:d'),
+    0.75: (':p', ':-p', '>:p', ':b', ':-b', ':o)', ':^)', ':c)'),
+    0.5: (':)', ':-)', '>:)', '=)', '8)', '8-)', ':]', '=]', ':}', ':>', ':3'),
+    0.25: (';)', ';-)', ';]', ';-]', '>;]', ';^)', '*)', '*-)', ';d'),
+    0.05: (':o', ':-o', '>:o', 'o_o', 'o.o', '\u00b0o\u00b0'),
+    -0.25: (':s', ':-s', ':/', ':-/', '>:/', ':\\', '>:\\', '>.>', ':-.'),
+    -0.75: (':(', ':-(', '=(', '=/', ':[', ':-[', '>:[', ':{', ':c', ':-c', ':-<'),
+    -1.0: (":'(", ";'(", ":'''("),
+}
+_EMOTICON_POLARITY = {emoticon: polarity for polarity, group in EMOTICONS.items() for emoticon in group}
+
+# TextBlob's tokens are whitespace/apostrophe-separated runs with leading and
+# trailing punctuation split off; punctuation other than '!' and lone
+# contraction letters never change the score, so they are not tokenized.
+# Unlike TextBlob (whose apostrophe splitting turns "isn't" into "isn ' t"),
+# "n't" is kept as a negation.
+_PUNCTUATION = r"""\.,;:!?()\[\]{}`"@#$^&*+\-|=~_"""
+_TOKEN = re.compile(
+    r"(?<!\S)(?:" + '|'.join(map(re.escape, sorted(_EMOTICON_POLARITY, key=len, reverse=True))) + r")(?!\S)"
+    r"|\w+(?=n't\b)|n't\b"
+    rf"|[^\s'{_PUNCTUATION}](?:[^\s']*[^\s'{_PUNCTUATION}])?"
+    r"|!"
+)
+
+
+def _average(values):
+    return sum(values) / len(values)
+
+
+def read_textblob_lexicon(path=None):
+    """Parse TextBlob's en-sentiment.xml into {word: (polarity, intensity, is_modifier)}
+
+    Senses are averaged per part of speech and then across parts of speech,
+    and every adjective also gets its '-ly' adverb, as textblob.en does.
+    """
+    import xml.etree.ElementTree as ElementTree
+
+    if path is None:
+        import textblob.en
+        path = os.path.join(os.path.dirname(textblob.en.__file__), 'en-sentiment.xml')
+
+    senses = {}
+    for node in ElementTree.parse(path).getroot().iter('word'):
+        form = node.attrib.get('form')
+        if form:
+            scores = (float(node.attrib.get('polarity', 0.0)), float(node.attrib.get('intensity', 1.0)))
+            senses.setdefault(form, {}).setdefault(node.attrib.get('pos'), []).append(scores)
+
+    lexicon = {}
+    by_pos = {}
+    for form, tags in senses.items():
+        by_pos[form] = {pos: tuple(map(_average, zip(*scores))) for pos, scores in tags.items()}
+        polarity, intensity = map(_average, zip(*by_pos[form].values()))
+        lexicon[form] = (polarity, intensity, 'RB' in tags)
+
+    for form, tags in by_pos.items():
+        if 'JJ' in tags:
+            stem = form[:-1] + 'i' if form.endswith('y') else form
+            stem = stem[:-2] if stem.endswith('le') else stem
+            polarity, intensity = tags['JJ']
+            lexicon[stem + 'ly'] = (polarity, intensity, True)
+    return lexicon
+
+
+def write_lexicon(lexicon, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for word in sorted(lexicon):
+            polarity, intensity, modifier = lexicon[word]
+            f.write(f"{word}\t{polarity!r}\t{intensity!r}\t{int(modifier)}\n")
+
+
+def read_lexicon(path):
+    """Read a word<TAB>polarity<TAB>intensity<TAB>is_modifier file"""
+    lexicon = {}
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip() or line.startswith('#'):
+                continue
+            try:
+                word, polarity, intensity, modifier = line.rstrip('\n').split('\t')
+                lexicon[word] = (float(polarity), float(intensity), modifier == '1')
+            except ValueError:
+                raise ValueError(f"{path}:{line_no}: expected word, polarity, intensity, modifier")
+    return lexicon
+
+
+def _clamp(value):
+    return max(-1.0, min(value, 1.0))
+
+
+class LexiconSentiment:
+    """Polarity in [-1, 1] from a word lexicon, scored in a single token pass
+
+    The lexicon is held as one word -> slot dict plus flat arrays of
+    polarity, intensity and adverb flags.
+    """
+
+    def __init__(self, lexicon):
+        words = sorted(lexicon)
+        self._slot = {word: i for i, word in enumerate(words)}
+        self._polarity = array('d', (lexicon[w][0] for w in words))
+        self._intensity = array('d', (lexicon[w][1] for w in words))
+        self._modifier = bytes(bool(lexicon[w][2]) for w in words)
+
+    def __len__(self):
+        return len(self._slot)
+
+    def polarity(self, text):
+        # Each assessment is [polarity, intensity, negated] for one known word,
+        # or for a modifier and the known word it modifies ("very slow")
+        assessments = []
+        modifier = None
+        negation = None
+        slot_of = self._slot
+
+        for word in _TOKEN.findall(text.lower()):
+            slot = slot_of.get(word)
+            if slot is not None:
+                polarity, intensity = self._polarity[slot], self._intensity[slot]
+                if modifier is None:
+                    assessments.append([polarity, intensity, False])
+                else:
+                    last = assessments[-1]
+                    last[0] = _clamp(polarity * last[1])
+                    last[1] = intensity
+                if negation is not None:
+                    last = assessments[-1]
+                    last[1] = 1.0 / last[1]
+                    last[2] = True
+                modifier = word if self._modifier[slot] else None
+                negation = word if word in NEGATIONS else None
+                continue
+
+            if word in NEGATIONS:
+                negation = word
+            elif negation and len(word.strip("'")) > 1:
+                # A negation carries across short words only ("not a good")
+                negation = None
+            if negation is not None and modifier is not None and modifier.endswith('ly'):
+                # "really not good"
+                assessments[-1][2] = True
+                negation = None
+            elif modifier and len(word) > 2:
+                modifier = None
+            if word == '!' and assessments:
+                assessments[-1][0] = _clamp(assessments[-1][0] * 1.25)
+            elif word in _EMOTICON_POLARITY:
+                assessments.append([_EMOTICON_POLARITY[word], 1.0, False])
+
+        if not assessments:
+            return 0.0
+        # "not good" is slightly bad, "not bad" slightly good
+        return sum(p * -0.5 if negated else p for p, _, negated in assessments) / len(assessments)
+
+
+def load_lexicon_sentiment(path=None):
+    """Scorer over SENTIMENT_LEXICON_PATH, the bundled lexicon, or TextBlob's XML"""
+    path = path or os.environ.get('SENTIMENT_LEXICON_PATH') or LEXICON_PATH
+    if os.path.exists(path):
+        return LexiconSentiment(read_lexicon(path))
+    return LexiconSentiment(read_textblob_lexicon())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the sentiment lexicon used by detect_priority')
+    parser.add_argument('command', choices=['export'])
+    parser.add_argument('--source', help="path to en-sentiment.xml (default: TextBlob's)")
+    parser.add_argument('--output', default=LEXICON_PATH)
+    args = parser.parse_args()
+
+    lexicon = read_textblob_lexicon(args.source)
+    write_lexicon(lexicon, args.output)
+    print(f"Wrote {len(lexicon)} words to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
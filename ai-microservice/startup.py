@@ -0,0 +1,61 @@
+"""
+Startup-time accounting
+Heavy dependencies (spaCy, TextBlob, NumPy, scikit-learn) are imported on
+first use through timed_import, and model loading runs in named stages, so
+the service can report where its cold start went
+"""
+
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+_T0 = time.perf_counter()
+_lock = threading.Lock()
+_imports = {}
+_stages = {}
+_ready_at = None
+
+
+def timed_import(name):
+    """Import a module, recording how long it took the first time"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = time.perf_counter() - started
+    with _lock:
+        _imports.setdefault(name, elapsed)
+    return module
+
+
+@contextmanager
+def timed_stage(name):
+    """Record the wall time of one startup stage (model load, warm-up, ...)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            _stages[name] = time.perf_counter() - started
+
+
+def mark_ready():
+    global _ready_at
+    with _lock:
+        if _ready_at is None:
+            _ready_at = time.perf_counter() - _T0
+
+
+def report():
+    """Import and load cost per dependency/stage, in milliseconds"""
+    with _lock:
+        return {
+            "imports": {name: round(seconds * 1000.0, 1) for name, seconds in _imports.items()},
+            "stages": {name: round(seconds * 1000.0, 1) for name, seconds in _stages.items()},
+            "readyAfterMs": round(_ready_at * 1000.0, 1) if _ready_at is not None else None,
+            "uptimeMs": round((time.perf_counter() - _T0) * 1000.0, 1)
+        }
@@ -0,0 +1,195 @@
+"""
+Extractive ticket summarizer
+A streaming pre-pass walks the ticket line by line and keeps only prose:
+log lines, stack traces, pasted data, quoted replies (and everything after a
+reply header), greetings and sign-offs are dropped, and the walk stops once
+max_prose_chars of prose are kept. The prose is split into sentences, each
+scored by the TF-IDF weight of its words (IDF from the serving vectorizer)
+plus the keyword tables priority detection uses, and the best one or two
+sentences are returned in their original order. Every step is a single pass
+over its input, so the cost is linear in the ticket length and bounded by
+max_prose_chars for the scoring
+"""
+
+import math
+import re
+
+_TOKEN = re.compile(r'(?u)\b\w\w+\b')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_NON_LETTERS = re.compile(r'[\W\d_]+')
+
+_LOG_LINE = re.compile(
+    r'\s*(?:'
+    r'\[?\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}'                   # ISO timestamp
+    r'|\[?\d{1,2}:\d{2}:\d{2}\b'                             # time of day
+    r'|(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\s+\d{1,2}\s+\d{2}:\d{2}'  # syslog
+    r'|\[?(?-i:ERROR|WARN|WARNING|INFO|DEBUG|TRACE|FATAL)\b'  # level (upper case only: "Error:" is prose)
+    r'|at\s+[\w$.<>]+\('                                     # Java/JS stack frame
+    r'|File\s+"[^"]*",\s+line\s+\d'                         # Python stack frame
+    r'|Traceback\s+\(most recent call last\)'
+    r'|[\w.]+(?:Exception|Error)\b[:\s]'                     # exception line
+    r')', re.IGNORECASE)
+_REPLY_HEADER = re.compile(
+    r'\s*(?:on\b.{0,200}\bwrote:\s*$'
+    r'|-{2,}\s*(?:original|forwarded) message\s*-{2,}'
+    r'|from:\s[^\n]{0,200}[@<]'
+    r'|sent from my\b)', re.IGNORECASE)
+# A greeting is at most three words ending in a comma/colon ("Hi team,");
+# a sign-off line is at most three words after the closing word
+_GREETING = re.compile(r'\s*(?:hi|hello|hey|dear|greetings|good (?:morning|afternoon|evening))\b(?:\s+[\w.\'-]+){0,3}'
+                       r'\s*[,:]\s*', re.IGNORECASE)
+_SIGN_OFF = re.compile(r'\s*(?:thanks|thank you|many thanks|(?:best |kind )?regards|best|cheers)\b(?:\s+[\w.\'-]+){0,3}'
+                       r'\s*[,.!]?\s*$', re.IGNORECASE)
+
+# Words that carry no topic even without a vectorizer stop list
+STOP_WORDS = frozenset("""
+a about after all also am an and any are as at be been but by can could did do does for from had has have
+he her him his how i if in into is it its just me my no not now of on or our please she so some than that
+the their them then there these they this to too up us was we were what when where which who will with
+would you your
+""".split())
+
+# Tokens longer than this are hashes, URLs or pasted blobs, not words
+MAX_WORD_CHARS = 30
+
+
+def _lines(text):
+    """Lines of text, lazily, so a walk that stops early never splits the rest"""
+    start = 0
+    while start <= len(text):
+        end = text.find('\n', start)
+        if end < 0:
+            end = len(text)
+        yield text[start:end]
+        start = end + 1
+
+
+def _is_data(line):
+    # Pasted JSON, hex dumps, tables of numbers: mostly not letters (judged
+    # on the start of the line, so the check costs the same for any length)
+    head = line[:200]
+    return len(head) >= 20 and len(_NON_LETTERS.sub('', head)) < len(head) * 0.5
+
+
+def prose_lines(text, max_prose_chars=10000):
+    """The prose lines of a ticket, in order, until max_prose_chars are kept"""
+    kept = 0
+    for line in _lines(text):
+        # A single huge line is cut too, so the cap holds for any shape
+        stripped = line[:max_prose_chars - kept].strip()
+        if not stripped or stripped.startswith(('>', '|')):
+            continue
+        if _REPLY_HEADER.match(stripped):
+            # Everything below a reply header is the quoted thread
+            if kept:
+                return
+            continue
+        if _LOG_LINE.match(stripped) or _SIGN_OFF.match(stripped) or _is_data(stripped):
+            continue
+        greeting = _GREETING.match(stripped)
+        if greeting:
+            stripped = stripped[greeting.end():]
+        if stripped:
+            yield stripped
+            kept += len(stripped)
+            if kept >= max_prose_chars:
+                return
+
+
+class TermWeights:
+    """IDF weight per word, from a fitted vectorizer's unigrams
+
+    Words the vectorizer never saw get the mean IDF: its vocabulary is the
+    ticket domain, so they are not given more weight than an average term.
+    Without a vectorizer every word weighs 1.
+    """
+
+    def __init__(self, idf=None, stop_words=()):
+        self.idf = idf or {}
+        self.unknown = sum(self.idf.values()) / len(self.idf) if self.idf else 1.0
+        self.stop_words = STOP_WORDS | frozenset(stop_words)
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer):
+        """From a TfidfVectorizer or inference.TextFeaturizer; plain weights for anything else"""
+        if hasattr(vectorizer, 'vocabulary_'):
+            vocabulary, idf = vectorizer.vocabulary_, getattr(vectorizer, 'idf_', None)
+            stop_words = vectorizer.get_stop_words() or ()
+        elif hasattr(vectorizer, 'vocabulary') and hasattr(vectorizer, 'idf'):
+            vocabulary, idf = _featurizer_vocabulary(vectorizer.vocabulary), vectorizer.idf
+            stop_words = vectorizer.stop_words or ()
+        else:
+            return cls()
+        if idf is None:
+            return cls(stop_words=stop_words)
+        idf = idf.tolist() if hasattr(idf, 'tolist') else list(idf)
+        return cls({term: idf[column] for term, column in vocabulary.items() if ' ' not in term}, stop_words)
+
+    def weight(self, word):
+        if word in self.stop_words or len(word) > MAX_WORD_CHARS or word.isdigit():
+            return 0.0
+        return self.idf.get(word, self.unknown)
+
+
+def _featurizer_vocabulary(vocabulary):
+    """{term: column} of an inference.DictVocabulary or SortedVocabulary"""
+    if hasattr(vocabulary, 'vocabulary'):
+        return vocabulary.vocabulary
+    return {term.decode('utf-8'): column for column, term in enumerate(vocabulary.terms.tolist())}
+
+
+def summarize(text, weights=None, matcher=None, label_weights=None, max_chars=150, max_prose_chars=10000):
+    """One or two of the ticket's best sentences, at most max_chars long
+
+    A sentence scores the document TF-IDF weight of its distinct words,
+    divided by the square root of its word count, plus label_weights[label]
+    times the matcher's keyword score for every label. Keywords are only
+    matched in sentences that could still make the top two: no sentence
+    can gain more than the keyword score of the whole ticket.
+    """
+    if not text:
+        return ""
+    weights = weights or TermWeights()
+
+    sentences = []
+    for line in prose_lines(text, max_prose_chars):
+        for sentence in _SENTENCE_END.split(line):
+            sentence = sentence.strip().rstrip('.!? \t')
+            if len(sentence) > 10:
+                sentences.append(sentence)
+    if not sentences:
+        return text[:100] + "..." if len(text) > 100 else text
+
+    words = [_TOKEN.findall(sentence.lower()) for sentence in sentences]
+    frequency = {}
+    for sentence_words in words:
+        for word in sentence_words:
+            frequency[word] = frequency.get(word, 0) + 1
+    term_weight = {word: (1.0 + math.log(count)) * weights.weight(word) for word, count in frequency.items()}
+    base = [sum(term_weight[word] for word in set(sentence_words)) / math.sqrt(len(sentence_words) or 1)
+            for sentence_words in words]
+
+    def keyword_bonus(text):
+        keywords = matcher.scores(text, cache=False)
+        return sum(weight * keywords.get(label, 0) for label, weight in label_weights.items())
+
+    reach = keyword_bonus('\n'.join(sentences)) if matcher is not None and label_weights else 0.0
+    # Ties go to the earlier sentence
+    best = []
+    for i in sorted(range(len(sentences)), key=lambda i: (-base[i], i)):
+        if len(best) == 2 and base[i] + reach < best[1][0]:
+            break
+        score = base[i] + keyword_bonus(sentences[i]) if reach else base[i]
+        best = sorted(best + [(score, -i)], reverse=True)[:2]
+    best = [-i for _, i in best]
+
+    summary = sentences[best[0]]
+    if len(summary) < 80 and len(best) > 1:
+        first, second = sorted(best)
+        combined = sentences[first] + ". " + sentences[second]
+        if len(combined) <= max_chars:
+            summary = combined
+
+    if len(summary) > max_chars:
+        summary = summary[:max_chars - 3] + "..."
+    return summary
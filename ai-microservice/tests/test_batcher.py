@@ -0,0 +1,28 @@
+import threading
+import time
+
+from batcher import MicroBatcher
+
+
+def _echo(items):
+    return list(items)
+
+
+def test_a_lone_request_is_not_held_back():
+    batcher = MicroBatcher(_echo, max_wait_ms=500, in_flight=lambda: 1)
+    started = time.perf_counter()
+    assert batcher.submit('a') == 'a'
+    assert time.perf_counter() - started < 0.25
+
+
+def test_requests_in_flight_are_waited_for():
+    in_flight = [2]
+    batcher = MicroBatcher(_echo, max_wait_ms=2000, in_flight=lambda: in_flight[0])
+    results = []
+    first = threading.Thread(target=lambda: results.append(batcher.submit('a')))
+    first.start()
+    time.sleep(0.05)
+    # The second request in flight joins the first one's batch
+    assert batcher.submit('b') == 'b'
+    first.join()
+    assert results == ['a'] and batcher.stats()['batchSizes'] == {"2": 1}
@@ -0,0 +1,26 @@
+import pytest
+
+import entities
+from entities import DEVICE_RULES, LOCATION_RULES, SERVICE_RULES, EntityExtractor
+
+EXTRACTOR = EntityExtractor(SERVICE_RULES + DEVICE_RULES + LOCATION_RULES)
+FILLER = "the sync job retried and timed out again "
+
+
+@pytest.mark.parametrize("offset", [0, entities.WINDOW_CHARS - entities.WINDOW_MARGIN - 5, entities.WINDOW_CHARS - 3,
+                                    entities.WINDOW_CHARS * 4 + 1, 200000])
+def test_entities_are_found_wherever_the_windows_end(offset):
+    text = (FILLER * (offset // len(FILLER) + 1))[:offset] + " Outlook on my Laptop in Building 7 " + FILLER * 100
+    assert EXTRACTOR.extract(text) == {"service": "Outlook", "device": "Laptop", "location": "Building 7"}
+
+
+def test_a_match_cut_by_the_window_is_read_whole():
+    # The first window ends inside 'Buildingwing'
+    prefix = "x " * ((entities.WINDOW_CHARS - 4) // 2)
+    text = prefix + "Buildingwing" + " lobby"
+    assert EXTRACTOR.extract(text)['location'] == "Buildingwing"
+
+
+def test_text_whose_lowercase_changes_length():
+    text = "İ" * 5000 + " printer in room 12"
+    assert EXTRACTOR.extract(text) == {"service": None, "device": "printer", "location": "room 12"}
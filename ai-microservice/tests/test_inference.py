@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from inference import InferenceEngine
+from model_artifact import export_model, load_model
+from train import TRAINING_DATA
+
+TEXTS = [text for text, _ in TRAINING_DATA] + [
+    "",
+    "the and of",
+    "WIFI wifi WiFi router router down!!!",
+    "Cannot login to Outlook on my laptop in building 7, password rejected twice",
+    "zzz qqq completely unknown words",
+    "Drücker funktioniert nicht — café wifi",
+]
+
+
+def _fit(**vectorizer_options):
+    texts = [text for text, _ in TRAINING_DATA]
+    labels = [label for _, label in TRAINING_DATA]
+    options = dict(max_features=1000, ngram_range=(1, 2), stop_words='english', lowercase=True)
+    options.update(vectorizer_options)
+    vectorizer = TfidfVectorizer(**options)
+    classifier = LogisticRegression(random_state=42, max_iter=1000, class_weight='balanced')
+    classifier.fit(vectorizer.fit_transform(texts), labels)
+    return vectorizer, classifier
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"sublinear_tf": True},
+    {"norm": "l1", "ngram_range": (1, 3)},
+    {"binary": True, "stop_words": None, "use_idf": False},
+])
+def test_probabilities_match_sklearn(options):
+    vectorizer, classifier = _fit(**options)
+    engine = InferenceEngine.from_sklearn(vectorizer, classifier)
+
+    expected = classifier.predict_proba(vectorizer.transform(TEXTS))
+    np.testing.assert_allclose(engine.predict_proba(TEXTS), expected, rtol=0, atol=1e-12)
+    assert list(engine.classes_) == list(classifier.classes_)
+
+
+def test_single_texts_match_batch():
+    vectorizer, classifier = _fit()
+    engine = InferenceEngine.from_sklearn(vectorizer, classifier)
+
+    batch = engine.predict_proba(TEXTS)
+    for row, text in enumerate(TEXTS):
+        np.testing.assert_allclose(engine.predict_proba([text])[0], batch[row], rtol=0, atol=1e-15)
+
+
+def test_binary_classifier_matches_sklearn():
+    texts = [text for text, _ in TRAINING_DATA]
+    labels = ["Network" if label == "Network" else "Other" for _, label in TRAINING_DATA]
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2))
+    classifier = LogisticRegression(max_iter=1000).fit(vectorizer.fit_transform(texts), labels)
+    engine = InferenceEngine.from_sklearn(vectorizer, classifier)
+
+    expected = classifier.predict_proba(vectorizer.transform(TEXTS))
+    np.testing.assert_allclose(engine.predict_proba(TEXTS), expected, rtol=0, atol=1e-12)
+
+
+def test_memory_mapped_artifact_matches_sklearn(tmp_path):
+    vectorizer, classifier = _fit()
+    path = str(tmp_path / "model.bin")
+    version = export_model(vectorizer, classifier, path)
+
+    engine, loaded_version = load_model(path)
+
+    assert loaded_version == version
+    expected = classifier.predict_proba(vectorizer.transform(TEXTS))
+    np.testing.assert_allclose(engine.predict_proba(TEXTS), expected, rtol=0, atol=1e-12)
+    predicted = [label for label, _ in engine.predict(TEXTS)]
+    assert predicted == list(classifier.predict(vectorizer.transform(TEXTS)))
+
+
+def test_unsupported_vectorizer_is_rejected():
+    vectorizer, classifier = _fit(analyzer='char', stop_words=None)
+    with pytest.raises(ValueError):
+        InferenceEngine.from_sklearn(vectorizer, classifier)
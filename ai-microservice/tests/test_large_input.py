@@ -0,0 +1,208 @@
+import codecs
+import io
+import json
+import time
+import tracemalloc
+
+import pytest
+import spacy
+
+import large_input
+from large_input import (
+    FULL, WINDOWED, InputTooLarge, bounded_lines, merge_entities, read_body, read_json, split_input, windows
+)
+from model_loader import extract_entities_windowed
+from pipeline import analyze_batch, analyze_text, parse_item
+
+NO_MODELS = {"nlp": None, "clf": None, "vectorizer": None, "version": None}
+
+LOG_LINE = "2024-01-01 12:00:00 ERROR com.example.Pool connection refused to db01 on port 5432\n"
+HEAD = "Hi team, Outlook keeps crashing on my laptop in building 7, this is urgent.\n"
+TAIL = "The printer on floor 3 is also showing a paper jam error"
+
+
+def _ticket(chars):
+    return HEAD + LOG_LINE * ((chars - len(HEAD) - len(TAIL)) // len(LOG_LINE)) + TAIL
+
+
+class CountingStream(io.BytesIO):
+    """A request body that records how many bytes were read from it"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+class RecordingNlp:
+    """A blank spaCy pipeline with an entity ruler that records the length of every text it is given"""
+
+    def __init__(self):
+        self.nlp = spacy.blank('en')
+        ruler = self.nlp.add_pipe('entity_ruler')
+        ruler.add_patterns([{"label": "PRODUCT", "pattern": "Outlook"}, {"label": "FAC", "pattern": "db01"},
+                            {"label": "EVENT", "pattern": "jam"}])
+        self.lengths = []
+
+    def __call__(self, text):
+        self.lengths.append(len(text))
+        return self.nlp(text)
+
+    def pipe(self, texts, batch_size=64):
+        texts = list(texts)
+        self.lengths.extend(len(text) for text in texts)
+        return self.nlp.pipe(texts, batch_size=batch_size)
+
+
+def test_small_ticket_runs_whole():
+    text = "WiFi is down on floor 3"
+    assert split_input(text) == (FULL, text, [text])
+    assert analyze_text(text, '', NO_MODELS)['inputPath'] == FULL
+
+
+@pytest.mark.parametrize("chars", [large_input.LARGE_INPUT_CHARS + 1000, 100000, 5000000])
+def test_windows_are_bounded(chars):
+    text = _ticket(chars)
+    input_path, view, parts = split_input(text)
+    assert input_path == WINDOWED
+    assert len(view) <= large_input.LARGE_INPUT_CHARS
+    assert len(parts) == large_input.LARGE_INPUT_CHARS // large_input.LARGE_INPUT_WINDOW_CHARS
+    assert all(len(part) <= large_input.LARGE_INPUT_WINDOW_CHARS for part in parts)
+    assert text.startswith(parts[0]) and text.endswith(parts[-1])
+    # Windows are cut at line breaks
+    assert all(part.startswith('2024-') and part.endswith('5432') for part in parts[1:-1])
+
+
+def test_windows_fall_back_to_a_head_when_one_window_fits():
+    text = "x" * 1000
+    assert windows(text, total=100, size=500) == ["x" * 100]
+    assert windows(text, total=1000) == [text]
+
+
+def test_large_ticket_takes_the_windowed_path():
+    result = analyze_text(_ticket(2000000), '', NO_MODELS)
+    assert result['inputPath'] == WINDOWED
+    # Found in the head and in the tail window
+    assert result['entities']['device'] == 'laptop'
+    assert result['priority'] in ('High', 'Urgent')
+    assert result['summary'].startswith('Outlook keeps crashing')
+
+
+def test_batch_records_the_path_of_every_ticket():
+    results = analyze_batch([{"description": _ticket(100000)}, {"description": "printer jam"}], NO_MODELS)
+    assert [result['inputPath'] for result in results] == [WINDOWED, FULL]
+
+
+def test_ner_only_sees_bounded_windows():
+    nlp = RecordingNlp()
+    text = _ticket(3000000)
+    result = analyze_text(text, '', dict(NO_MODELS, nlp=nlp))
+    assert max(nlp.lengths) <= large_input.LARGE_INPUT_WINDOW_CHARS
+    assert sum(nlp.lengths) <= large_input.LARGE_INPUT_CHARS
+    assert result['entities']['service'] == 'Outlook'
+    assert result['entities']['other'] == ['jam']
+
+
+def test_batch_ner_runs_windows_in_one_pipe_pass():
+    nlp = RecordingNlp()
+    models = dict(NO_MODELS, nlp=nlp)
+    results = analyze_batch([{"description": _ticket(100000)}, {"description": "Outlook crashed"}], models)
+    parts = windows(_ticket(100000))
+    assert nlp.lengths == [len(part) for part in parts] + [len("Outlook crashed")]
+    assert results[0]['entities'] == extract_entities_windowed(parts, RecordingNlp())
+    assert results[1]['entities']['service'] == 'Outlook'
+
+
+def test_merge_entities_keeps_the_first_value_per_slot():
+    merged = merge_entities([
+        {"service": None, "device": "laptop", "location": None, "other": ["a"]},
+        {"service": "Outlook", "device": "printer", "location": None},
+        {"service": "Teams", "device": None, "location": "floor 3", "other": ["a", "b"]},
+    ])
+    assert merged == {"service": "Outlook", "device": "laptop", "location": "floor 3", "other": ["a", "b"]}
+
+
+def test_large_ticket_cost_does_not_grow_with_its_size():
+    def seconds(text):
+        return min(_timed(lambda: analyze_text(text, '', NO_MODELS)) for _ in range(3))
+
+    seconds(_ticket(50000))  # first use loads the sentiment lexicon
+    small, large = seconds(_ticket(50000)), seconds(_ticket(5000000))
+    assert large < small * 5 + 0.05
+
+
+def test_large_ticket_memory_is_bounded():
+    text = _ticket(4000000)
+    analyze_text(text[:50000], '', NO_MODELS)
+    tracemalloc.start()
+    try:
+        analyze_text(text, '', NO_MODELS)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Nothing proportional to the ticket: not even one copy of it
+    assert peak < len(text) // 4
+
+
+def test_description_and_audio_limits(monkeypatch):
+    monkeypatch.setattr(large_input, 'MAX_DESCRIPTION_CHARS', 1000)
+    monkeypatch.setattr(large_input, 'MAX_AUDIO_BYTES', 300)
+    assert parse_item({"description": "a" * 1000}) == ("a" * 1000, '')
+    with pytest.raises(InputTooLarge):
+        parse_item({"description": "a" * 1001})
+    parse_item({"audioBase64": "A" * 400})
+    with pytest.raises(InputTooLarge):
+        parse_item({"audioBase64": "A" * 404})
+    results = analyze_batch([{"description": "a" * 1001}, {"description": "printer jam"}], NO_MODELS)
+    assert 'too large' in results[0]['error'] and results[1]['inputPath'] == FULL
+
+
+def test_read_body_stops_at_the_limit():
+    stream = CountingStream(b'{"description": "' + b'a' * 10000000 + b'"}')
+    with pytest.raises(InputTooLarge):
+        read_body(stream, limit=100000, chunk_size=4096)
+    assert stream.bytes_read == 100001
+
+    # A declared length over the limit is refused before reading anything
+    stream = CountingStream(b'{}')
+    with pytest.raises(InputTooLarge):
+        read_body(stream, content_length=100001, limit=100000)
+    assert stream.bytes_read == 0
+
+
+def test_read_body_decodes_characters_split_across_chunks():
+    body = json.dumps({"description": "Drücker funktioniert nicht — café wifi"}, ensure_ascii=False).encode('utf-8')
+    assert read_json(io.BytesIO(body), limit=len(body)) == json.loads(body)
+    assert read_body(io.BytesIO(body), chunk_size=1) == body.decode('utf-8')
+    assert read_json(io.BytesIO(b'{"description": "\xff"}')) is None
+    # A UTF-8 byte order mark is skipped, even when it arrives one byte at a time
+    assert read_json(io.BytesIO(codecs.BOM_UTF8 + body)) == json.loads(body)
+    assert read_body(io.BytesIO(codecs.BOM_UTF8 + body), chunk_size=1) == body.decode('utf-8')
+    assert read_json(io.BytesIO(b'not json')) is None
+
+
+def test_bounded_lines_replace_oversized_records():
+    stream = io.BytesIO(b'{"a": 1}\n' + b'x' * 1000 + b'\n{"b": 2}')
+    lines = list(bounded_lines(stream, limit=100, chunk_size=7))
+    assert lines[0] == b'{"a": 1}\n' and lines[2] == b'{"b": 2}'
+    assert isinstance(lines[1], InputTooLarge)
+
+
+def test_minimal_app_limits_and_paths(monkeypatch):
+    import app_minimal
+    client = app_minimal.app.test_client()
+    monkeypatch.setattr(large_input, 'MAX_REQUEST_BYTES', 200000)
+    assert client.post('/analyze', data=json.dumps({"description": "a" * 300000})).status_code == 413
+    response = client.post('/analyze', data=json.dumps({"description": _ticket(150000)}))
+    assert response.status_code == 200 and response.get_json()['inputPath'] == WINDOWED
+    assert client.post('/analyze', data=json.dumps({"description": "wifi down"})).get_json()['inputPath'] == FULL
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
@@ -0,0 +1,82 @@
+import json
+
+import numpy
+import pytest
+
+from pipeline import analyze_batch, analyze_text, parse_item
+
+NO_MODELS = {"nlp": None, "clf": None, "vectorizer": None, "version": None}
+
+
+@pytest.mark.parametrize("item, field", [
+    ({"description": 5}, 'description'),
+    ({"description": "wifi down", "requestType": ["Network"]}, 'requestType'),
+    ({"audioBase64": {"data": "AAAA"}}, 'audioBase64'),
+])
+def test_non_string_fields_are_rejected(item, field):
+    with pytest.raises(ValueError, match=f"{field} must be a string"):
+        parse_item(item)
+
+
+def test_batch_reports_a_bad_typed_item_on_its_own():
+    results = analyze_batch([{"description": 5}, {"description": "printer jam", "requestType": None}], NO_MODELS)
+    assert results[0] == {"error": "description must be a string"}
+    assert results[1]['category'] and 'error' not in results[1]
+
+
+def test_stream_reports_a_bad_typed_record_on_its_own(monkeypatch):
+    import app
+    monkeypatch.setattr(app, 'CACHE', None)
+    body = b'{"description": 5}\n{"description": "printer jam", "requestType": 7}\n{"description": "wifi down"}\n'
+    response = app.app.test_client().post('/analyze/stream', data=body)
+    lines = [json.loads(line) for line in response.data.splitlines()]
+    assert response.status_code == 200 and [line['record'] for line in lines] == [1, 2, 3]
+    assert lines[0]['error'] == "description must be a string"
+    assert lines[1]['error'] == "requestType must be a string"
+    assert lines[2]['category'] and 'error' not in lines[2]
+
+
+def test_batch_records_priority_and_summary_per_ticket(monkeypatch):
+    import pipeline
+    from timing import LatencyTracker
+    tracker = LatencyTracker()
+    monkeypatch.setattr(pipeline, 'STAGE_LATENCY', tracker)
+    pipeline.analyze_texts(["printer jam on floor 3"] * 32, [''] * 32, NO_MODELS)
+    # One sample per ticket, not one summed over the batch
+    assert len(tracker._samples[("priority", pipeline.sentiment_engine())]) == 32
+    assert len(tracker._samples[("summary", "extractive")]) == 32
+    assert len(tracker._samples[("classify", "keywords")]) == 32
+    assert len(tracker._samples[("entities", "regex")]) == 32
+
+
+def test_request_type_alone_never_exits_the_cascade(monkeypatch):
+    import model_loader
+    from calibration import Calibration, Curve
+    monkeypatch.setattr(model_loader, 'CASCADE_MIN_CONFIDENCE', 0.9)
+    # A keyword lead of 2 (what the requestType boost alone adds) calibrates to 0.926
+    calibration = Calibration(Curve([0, 2], [0.3, 0.926]), Curve([0, 1], [0.0, 1.0]))
+    assert model_loader.keyword_exit("Printer is out of toner", calibration) is None
+    assert model_loader.keyword_exit("vpn firewall router wifi down", calibration)[0] == 'Network'
+
+    class Classifier:
+        classes_ = ['General', 'Network']
+
+        def predict_proba(self, features):
+            return numpy.array([[0.8, 0.2]])
+
+    class Vectorizer:
+        def transform(self, texts):
+            return texts
+
+    models = dict(NO_MODELS, clf=Classifier(), vectorizer=Vectorizer(), calibration=calibration)
+    result = analyze_text("Printer is out of toner", 'Network', models)
+    assert result['engines']['category'] == 'model' and result['category'] == 'General'
+
+
+def test_fallback_confidence_ignores_the_request_type_boost():
+    from model_loader import classify_category
+    from calibration import Calibration, Curve
+    calibration = Calibration(Curve([0, 2], [0.3, 0.926]), Curve([0, 1], [0.0, 1.0]))
+    # Without a classifier the keyword scorer answers, boosted by requestType
+    assert classify_category("Printer is out of toner", None, None, 'Network', calibration) == ('Network', 0.3)
+    assert classify_category("Printer is out of toner", None, None, '', calibration) == ('General', 0.3)
@@ -0,0 +1,24 @@
+import json
+
+import app
+from cache import AnalysisCache
+from profiler import RequestProfiler
+
+
+def test_sampled_requests_get_the_normal_response(monkeypatch):
+    monkeypatch.setattr(app, 'BATCHER', None)
+    cache = AnalysisCache(100, 0)
+    monkeypatch.setattr(app, 'serving_cache', lambda: cache)
+    monkeypatch.setattr(app, '_duplicates', None)
+    client = app.app.test_client()
+    ticket = json.dumps({"description": "VPN keeps disconnecting from the office network", "id": "T-1"})
+    unsampled = client.post('/analyze', data=ticket).get_json()
+
+    profiler = RequestProfiler(sample_rate=1.0, interval_ms=1)
+    monkeypatch.setattr(app, 'PROFILER', profiler)
+    sampled = client.post('/analyze', data=ticket).get_json()
+    # Served from the cache and checked against the duplicate index, like any request
+    assert profiler.profiles()[-1]['path'] == 'cache'
+    assert sampled.pop('duplicates') == [{"id": "T-1", "similarity": 1.0}]
+    unsampled.pop('duplicates')
+    assert sampled == unsampled
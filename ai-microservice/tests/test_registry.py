@@ -0,0 +1,42 @@
+import hashlib
+import os
+import pickle
+
+import app
+import train
+from model_loader import SMOKE_SET_PATH, load_classifier, model_fingerprint
+from registry import ModelRegistry
+
+
+def test_reload_accepts_the_model_train_py_writes(tmp_path, monkeypatch):
+    # model_loader's paths are relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    train.save_models(*train.train_classifier())
+    empty = {"nlp": None, "clf": None, "vectorizer": None, "calibration": None, "version": None}
+    registry = ModelRegistry(empty, load_classifier, model_fingerprint, SMOKE_SET_PATH,
+                             app.MODEL_MIN_ACCURACY, app.MODEL_MAX_ACCURACY_DROP)
+
+    assert registry.reload()['outcome'] == 'swapped'
+    # The version being served must pass against itself
+    event = registry.reload(force=True)
+    assert event['outcome'] == 'swapped', event
+    assert event['accuracy'] == event['currentAccuracy']
+
+
+def test_pickles_newer_than_the_artifact_are_served(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    vectorizer, classifier, smoke_set, calibration = train.train_classifier()
+    train.save_models(vectorizer, classifier, smoke_set, calibration)
+    artifact_version = load_classifier()['version']
+
+    # Only the classifier pickle is retrained
+    classifier.set_params(C=0.01).fit(vectorizer.transform([t for t, _ in train.TRAINING_DATA]),
+                                      [label for _, label in train.TRAINING_DATA])
+    with open('models/classifier.pkl', 'wb') as f:
+        pickle.dump(classifier, f)
+    built = os.stat('models/model.bin').st_mtime_ns
+    os.utime('models/classifier.pkl', ns=(built + 10 ** 9, built + 10 ** 9))
+
+    with open('models/classifier.pkl', 'rb') as f, open('models/vectorizer.pkl', 'rb') as g:
+        pickle_version = hashlib.sha256(f.read() + g.read()).hexdigest()[:12]
+    assert load_classifier()['version'] == pickle_version != artifact_version
@@ -0,0 +1,83 @@
+import json
+
+import msgpack
+import pytest
+
+import app
+import large_input
+import wire
+from large_input import InputTooLarge
+from pipeline import parse_item
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, 'CACHE', None)
+    monkeypatch.setattr(app, 'BATCHER', None)
+    monkeypatch.setattr(app, 'DEDUP_MAX_ENTRIES', 0)
+    return app.app.test_client()
+
+
+@pytest.mark.parametrize("accept, content_type, expected", [
+    (None, None, wire.JSON),
+    ('*/*', 'application/json', wire.JSON),
+    (None, 'application/msgpack', wire.MSGPACK),
+    ('*/*', 'application/x-msgpack', wire.MSGPACK),
+    ('application/msgpack', None, wire.MSGPACK),
+    ('application/json;q=0.5, application/vnd.msgpack', None, wire.MSGPACK),
+    ('application/json', 'application/msgpack', wire.JSON),
+    ('application/*;q=0.8, application/json;q=0.1', 'application/json', wire.MSGPACK),
+    ('text/html', None, wire.JSON),
+])
+def test_response_format(accept, content_type, expected):
+    assert wire.response_format(accept, content_type) == expected
+
+
+def test_json_path_is_unchanged(client):
+    ticket = {"description": "Outlook crashes on my laptop, urgent", "requestType": "IT"}
+    response = client.post('/analyze', data=json.dumps(ticket))
+    assert response.status_code == 200 and response.content_type == 'application/json'
+    with app.app.app_context():
+        assert response.data == app.jsonify(response.get_json()).data
+
+
+def test_msgpack_round_trip_matches_json(client):
+    ticket = {"description": "Outlook crashes on my laptop, urgent", "requestType": "IT"}
+    expected = client.post('/analyze', data=json.dumps(ticket)).get_json()
+    response = client.post('/analyze', data=msgpack.packb(ticket), content_type=wire.MSGPACK)
+    assert response.content_type == wire.MSGPACK
+    assert msgpack.unpackb(response.data) == expected
+
+    batch = client.post('/analyze/batch', data=json.dumps([ticket] * 3), headers={'Accept': wire.MSGPACK})
+    assert msgpack.unpackb(batch.data)['results'] == [expected] * 3
+
+
+def test_raw_audio_bytes(client, monkeypatch):
+    body = msgpack.packb({"audio": b'\x00\xff' * 100}, use_bin_type=True)
+    response = client.post('/analyze', data=body, content_type=wire.MSGPACK)
+    assert response.status_code == 200
+
+    monkeypatch.setattr(large_input, 'MAX_AUDIO_BYTES', 100)
+    response = client.post('/analyze', data=body, content_type=wire.MSGPACK)
+    assert response.status_code == 413 and 'audio too large' in msgpack.unpackb(response.data)['error']
+    with pytest.raises(InputTooLarge):
+        parse_item({"audio": b'\x00' * 101})
+    # Only bytes count as audio; a JSON string under "audio" is ignored as before
+    with pytest.raises(ValueError):
+        parse_item({"audio": "not audio"})
+
+
+def test_bad_msgpack_body_is_a_400(client):
+    response = client.post('/analyze', data=b'\xc1', content_type=wire.MSGPACK)
+    assert response.status_code == 400
+    response = client.post('/analyze/batch', data=msgpack.packb({"items": "nope"}), content_type=wire.MSGPACK)
+    assert response.status_code == 400
+
+
+def test_without_msgpack_only_json_is_served(client, monkeypatch):
+    monkeypatch.setattr(wire, '_msgpack', False)
+    assert wire.response_format(wire.MSGPACK, wire.MSGPACK) == wire.JSON
+    response = client.post('/analyze', data=msgpack.packb({"description": "wifi"}), content_type=wire.MSGPACK)
+    assert response.status_code == 415
+    response = client.post('/analyze', data=json.dumps({"description": "wifi"}), headers={'Accept': wire.MSGPACK})
+    assert response.status_code == 200 and response.content_type == 'application/json'
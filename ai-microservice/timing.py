@@ -0,0 +1,76 @@
+"""
+Per-stage timing for the analysis pipeline
+"""
+
+import math
+import threading
+import time
+from collections import defaultdict, deque
+
+
+class StageTimer:
+    """Accumulates wall time per pipeline stage across requests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = defaultdict(int)
+        self._total = defaultdict(float)
+
+    def record(self, elapsed, items=1):
+        """Add {stage: seconds} measured over `items` tickets"""
+        with self._lock:
+            for stage, seconds in elapsed.items():
+                self._items[stage] += items
+                self._total[stage] += seconds
+
+    def stats(self):
+        with self._lock:
+            return {
+                stage: {
+                    "items": self._items[stage],
+                    "totalMs": round(self._total[stage] * 1000.0, 3),
+                    "meanMs": round(self._total[stage] * 1000.0 / self._items[stage], 3)
+                }
+                for stage in self._items
+            }
+
+
+class LatencyTracker:
+    """Recent latency samples per (stage, engine), for live percentiles
+
+    Only samples from the last window_seconds count, so an engine that has
+    not run for a while (e.g. because it was being skipped) drops back to
+    "unknown" instead of being judged on stale numbers.
+    """
+
+    def __init__(self, window_seconds=60.0, max_samples=512):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=max_samples))
+
+    def record(self, stage, engine, seconds):
+        with self._lock:
+            self._samples[(stage, engine)].append((time.monotonic(), seconds))
+
+    def percentile(self, stage, engine, q=0.95):
+        """Seconds, or None without recent samples"""
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            recent = sorted(s for t, s in self._samples.get((stage, engine), ()) if t >= cutoff)
+        if not recent:
+            return None
+        return recent[max(0, math.ceil(q * len(recent)) - 1)]
+
+    def stats(self):
+        with self._lock:
+            keys = list(self._samples)
+        p95 = {}
+        for stage, engine in keys:
+            value = self.percentile(stage, engine)
+            if value is not None:
+                p95.setdefault(stage, {})[engine] = round(value * 1000.0, 3)
+        return p95
+
+
+STAGE_TIMER = StageTimer()
+STAGE_LATENCY = LatencyTracker()
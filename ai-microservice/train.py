@@ -1,15 +1,21 @@
 #!/usr/bin/env python3
 """
 Training script for Smart Service Hub AI classifier
-Creates a category classifier using synthetic training data
+Creates a category classifier using synthetic training data, or with --data
+streams a large JSONL/CSV export of labeled tickets (see train_stream.py)
 """
 
 import os
+import json
+import argparse
 import pickle
 import pandas as pd
+from model_artifact import export_model
+from calibration import fit_calibration, print_report
+from sklearn.base import clone
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, cross_val_predict
 from sklearn.metrics import classification_report, accuracy_score
 
 # Create synthetic training data
@@ -140,27 +146,76 @@ def train_classifier():
     print("\nClassification Report:")
     print(classification_report(y_test, y_pred))
     
-    return vectorizer, classifier
+    # Held-out tickets the service checks a new model version against
+    smoke_set = {"texts": list(X_test), "labels": list(y_test), "accuracy": accuracy}
+    
+    # The test split is too small to calibrate on, so the classifier's
+    # confidence is calibrated on cross-validated predictions instead
+    print("Calibrating confidences...")
+    probabilities = cross_val_predict(clone(classifier), X_train_tfidf, y_train, cv=4, method='predict_proba')
+    classes = sorted(set(y_train))
+    predictions = [(classes[row.argmax()], row.max()) for row in probabilities]
+    calibration = fit_calibration(list(X_train), list(y_train), predictions)
+    print_report(calibration)
+    
+    return vectorizer, classifier, smoke_set, calibration
 
-def save_models(vectorizer, classifier):
+def save_models(vectorizer, classifier, smoke_set, calibration):
     """Save trained models"""
     os.makedirs('models', exist_ok=True)
     
     print("Saving models...")
+    # Written first: a running service reloads as soon as the model files change
+    with open('models/smoke_set.json', 'w', encoding='utf-8') as f:
+        json.dump(smoke_set, f)
+    calibration.save('models/calibration.json')
+    
     with open('models/vectorizer.pkl', 'wb') as f:
         pickle.dump(vectorizer, f)
     
     with open('models/classifier.pkl', 'wb') as f:
         pickle.dump(classifier, f)
     
+    # Same model as flat arrays; load_models memory-maps it instead of unpickling
+    export_model(vectorizer, classifier, 'models/model.bin')
+    
     print("Models saved to models/ directory")
 
 def main():
+    parser = argparse.ArgumentParser(description='Train the category classifier')
+    parser.add_argument('--data', help='JSONL/CSV export of labeled tickets to stream instead of the synthetic set')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help='input format (default: from the extension)')
+    parser.add_argument('--text-field', default='description')
+    parser.add_argument('--label-field', default='category')
+    parser.add_argument('--alpha', type=float, nargs='+', default=[1e-4, 1e-5, 1e-6],
+                        help='SGD regularization strengths to try')
+    parser.add_argument('--penalty', nargs='+', default=['l2'], choices=['l2', 'l1', 'elasticnet'])
+    parser.add_argument('--epochs', type=int, default=3, help='passes over the data per candidate')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='tickets per partial_fit call')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='candidates trained in parallel')
+    parser.add_argument('--max-features', type=int, default=100000, help='vocabulary size')
+    parser.add_argument('--min-df', type=int, default=2, help='drop terms in fewer tickets than this')
+    parser.add_argument('--holdout-every', type=int, default=10, help='hold out every Nth ticket for evaluation')
+    parser.add_argument('--holdout-size', type=int, default=20000, help='held-out tickets kept for scoring')
+    parser.add_argument('--report', help='also write the throughput/memory report here as JSON')
+    args = parser.parse_args()
+    
     print("🤖 Training Smart Service Hub AI Classifier")
     print("=" * 50)
     
-    vectorizer, classifier = train_classifier()
-    save_models(vectorizer, classifier)
+    if args.data:
+        from train_stream import train_streaming
+        vectorizer, classifier, smoke_set, calibration, report = train_streaming(
+            args.data, args.format, args.text_field, args.label_field, alphas=args.alpha,
+            penalties=args.penalty, epochs=args.epochs, chunk_size=args.chunk_size, workers=args.workers,
+            max_features=args.max_features, min_df=args.min_df, holdout_every=args.holdout_every,
+            holdout_size=args.holdout_size)
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+    else:
+        vectorizer, classifier, smoke_set, calibration = train_classifier()
+    save_models(vectorizer, classifier, smoke_set, calibration)
     
     print("\n✅ Training completed!")
     print("Run 'python app.py' to start the AI microservice")
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Out-of-core training on large ticket exports
+Streams labeled tickets from JSONL or CSV in chunks, never holding the export
+in memory: a first pass counts document frequencies to fix the vocabulary and
+IDF weights, then every hyperparameter candidate trains an SGD logistic
+regression with partial_fit in its own process, streaming the file once per
+epoch. The winner is an ordinary TfidfVectorizer + linear classifier, so
+train.save_models writes the same pickles and model.bin as the synthetic run
+
+Usage (through train.py):
+  python train.py --data tickets.jsonl
+  python train.py --data tickets.csv --alpha 1e-4 1e-5 1e-6 --epochs 3 --workers 4
+"""
+
+import itertools
+import json
+import os
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import SGDClassifier
+
+from bulk import read_csv, read_jsonl
+from calibration import fit_calibration, print_report
+
+# Same analyzer settings as the synthetic TfidfVectorizer in train.py
+VECTORIZER_PARAMS = {"ngram_range": (1, 2), "stop_words": 'english', "lowercase": True}
+# Held-out tickets written to models/smoke_set.json for hot reload checks
+SMOKE_SET_SIZE = 500
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return resource.getrusage(who).ru_maxrss / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0)
+
+
+def read_labeled(path, input_format=None, text_field='description', label_field='category'):
+    """Yield (record number, text, label) for every record with both fields; others are skipped"""
+    input_format = input_format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    records = read_csv(path) if input_format == 'csv' else read_jsonl(path)
+    for number, raw, _ in records:
+        if not isinstance(raw, dict):
+            try:
+                raw = json.loads(raw)
+            except ValueError:
+                continue
+            if not isinstance(raw, dict):
+                continue
+        text, label = (raw.get(text_field) or '').strip(), raw.get(label_field)
+        if text and label not in (None, ''):
+            yield number, text, str(label)
+
+
+def is_held_out(number, holdout_every):
+    return holdout_every > 0 and number % holdout_every == 0
+
+
+def shuffled(items, buffer_size, rng):
+    """Approximate shuffle of a stream through a buffer of buffer_size items"""
+    buffer = []
+    for item in items:
+        if len(buffer) < buffer_size:
+            buffer.append(item)
+            continue
+        i = rng.randrange(buffer_size)
+        yield buffer[i]
+        buffer[i] = item
+    rng.shuffle(buffer)
+    yield from buffer
+
+
+def count_vocabulary(records, analyzer, holdout_every, holdout_size, max_terms):
+    """First pass: (document frequency per term, training documents, held-out tickets, labels)
+
+    The frequency table is pruned to its max_terms // 2 most frequent terms
+    whenever it grows past max_terms, so bigram-heavy exports stay bounded;
+    frequencies of terms that were pruned and came back are undercounts.
+    """
+    df, docs, holdout, labels = {}, 0, [], set()
+    for number, text, label in records:
+        labels.add(label)
+        if is_held_out(number, holdout_every):
+            if len(holdout) < holdout_size:
+                holdout.append((text, label))
+            continue
+        docs += 1
+        for term in set(analyzer(text)):
+            df[term] = df.get(term, 0) + 1
+        if len(df) > max_terms:
+            cut = sorted(df.values(), reverse=True)[max_terms // 2]
+            df = {term: count for term, count in df.items() if count > cut}
+    return df, docs, holdout, sorted(labels)
+
+
+def build_vectorizer(df, docs, max_features, min_df):
+    """A TfidfVectorizer over the max_features most frequent terms, with IDF from the counts
+
+    Weights match TfidfVectorizer.fit with smooth_idf: ln((1 + n) / (1 + df)) + 1.
+    """
+    kept = sorted((term for term, count in df.items() if count >= min_df), key=lambda term: (-df[term], term))
+    terms = sorted(kept[:max_features])
+    vectorizer = TfidfVectorizer(vocabulary={term: i for i, term in enumerate(terms)}, **VECTORIZER_PARAMS)
+    counts = np.array([df[term] for term in terms], dtype=np.float64)
+    vectorizer.idf_ = np.log((1.0 + docs) / (1.0 + counts)) + 1.0
+    return vectorizer
+
+
+def candidate_grid(alphas, penalties):
+    return [{"alpha": alpha, "penalty": penalty} for alpha, penalty in itertools.product(alphas, penalties)]
+
+
+# Per-process training state for the pool, set once per worker by _init_worker
+_SHARED = None
+
+
+def _init_worker(shared):
+    global _SHARED
+    _SHARED = shared
+
+
+def _train_candidate(params):
+    """Fit one candidate over the stream; returns its report, with the classifier under 'clf'"""
+    shared = _SHARED
+    vectorizer, classes = shared['vectorizer'], shared['classes']
+    clf = SGDClassifier(loss='log_loss', random_state=shared['seed'], **params)
+    started = time.perf_counter()
+    rows = 0
+    for epoch in range(shared['epochs']):
+        rng = random.Random(shared['seed'] + epoch)
+        stream = ((text, label) for number, text, label in read_labeled(*shared['source'])
+                  if not is_held_out(number, shared['holdout_every']))
+        stream = iter(shuffled(stream, shared['shuffle_buffer'], rng))
+        while True:
+            chunk = list(itertools.islice(stream, shared['chunk_size']))
+            if not chunk:
+                break
+            clf.partial_fit(vectorizer.transform([text for text, _ in chunk]), [label for _, label in chunk],
+                            classes=classes)
+            rows += len(chunk)
+    seconds = time.perf_counter() - started
+
+    correct = 0
+    holdout = shared['holdout']
+    for start in range(0, len(holdout), shared['chunk_size']):
+        chunk = holdout[start:start + shared['chunk_size']]
+        predicted = clf.predict(vectorizer.transform([text for text, _ in chunk]))
+        correct += sum(p == label for p, (_, label) in zip(predicted, chunk))
+    return dict(params, clf=clf, accuracy=correct / len(holdout),
+                rows=rows, seconds=seconds, rowsPerSecond=rows / max(seconds, 1e-9), peakMb=peak_rss_mb())
+
+
+def train_streaming(path, input_format=None, text_field='description', label_field='category',
+                    alphas=(1e-4, 1e-5, 1e-6), penalties=('l2',), epochs=3, chunk_size=10000, workers=None,
+                    max_features=100000, min_df=2, max_terms=2000000, holdout_every=10, holdout_size=20000,
+                    shuffle_buffer=100000, seed=42):
+    """Train on a JSONL/CSV export; returns (vectorizer, classifier, smoke set, calibration, report)
+
+    Every holdout_every-th record is held out of training; the first
+    holdout_size of those score the candidates, and the best candidate wins.
+    Its confidences are calibrated on the same held-out tickets.
+    """
+    source = (path, input_format, text_field, label_field)
+    started = time.perf_counter()
+
+    print(f"Counting vocabulary in {path}...")
+    analyzer = TfidfVectorizer(**VECTORIZER_PARAMS).build_analyzer()
+    df, docs, holdout, classes = count_vocabulary(read_labeled(*source), analyzer, holdout_every, holdout_size,
+                                                  max_terms)
+    if len(classes) < 2:
+        raise ValueError(f"{path}: need tickets of at least two categories, found {classes}")
+    if not holdout:
+        raise ValueError(f"{path}: no held-out tickets to compare candidates on (every {holdout_every}th record)")
+    vectorizer = build_vectorizer(df, docs, max_features, min_df)
+    vocabulary_seconds = time.perf_counter() - started
+    del df
+    print(f"{docs} training tickets, {len(holdout)} held out, {len(vectorizer.vocabulary_)} terms, "
+          f"categories {classes} ({docs / max(vocabulary_seconds, 1e-9):.0f} tickets/s)")
+
+    candidates = candidate_grid(alphas, penalties)
+    shared = {"vectorizer": vectorizer, "classes": classes, "source": source, "epochs": epochs,
+              "chunk_size": chunk_size, "holdout_every": holdout_every, "holdout": holdout,
+              "shuffle_buffer": shuffle_buffer, "seed": seed}
+    workers = min(len(candidates), workers or os.cpu_count() or 1)
+    print(f"Training {len(candidates)} candidates for {epochs} epochs on {workers} processes...")
+    if workers <= 1:
+        _init_worker(shared)
+        results = [_train_candidate(params) for params in candidates]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(shared,)) as pool:
+            results = list(pool.map(_train_candidate, candidates))
+
+    for result in results:
+        print(f"  alpha={result['alpha']:g} penalty={result['penalty']}: accuracy {result['accuracy']:.3f}, "
+              f"{result['rowsPerSecond']:.0f} tickets/s, peak {result['peakMb']:.0f} MB")
+    best = max(results, key=lambda result: result['accuracy'])
+    seconds = time.perf_counter() - started
+    report = {
+        "trainingTickets": docs,
+        "heldOut": len(holdout),
+        "terms": len(vectorizer.vocabulary_),
+        "vocabularySeconds": round(vocabulary_seconds, 2),
+        "seconds": round(seconds, 2),
+        "ticketsPerSecond": round(docs * (epochs * len(candidates) + 1) / seconds, 1),
+        "peakMb": round(peak_rss_mb(), 1),
+        "workerPeakMb": round(max([peak_rss_mb(resource.RUSAGE_CHILDREN)] + [r['peakMb'] for r in results]), 1),
+        "candidates": [{key: value for key, value in result.items() if key != 'clf'} for result in results],
+        "best": {"alpha": best['alpha'], "penalty": best['penalty'], "accuracy": best['accuracy']},
+    }
+    print(f"\nBest: alpha={best['alpha']:g} penalty={best['penalty']}, held-out accuracy {best['accuracy']:.3f}")
+    print(f"Processed {report['ticketsPerSecond']:.0f} tickets/s over all passes in {seconds:.1f}s; "
+          f"peak memory {report['peakMb']:.0f} MB (main), {report['workerPeakMb']:.0f} MB (largest worker)")
+
+    predictions = []
+    for start in range(0, len(holdout), chunk_size):
+        chunk = holdout[start:start + chunk_size]
+        probabilities = best['clf'].predict_proba(vectorizer.transform([text for text, _ in chunk]))
+        predictions += [(best['clf'].classes_[row.argmax()], row.max()) for row in probabilities]
+    calibration = fit_calibration([text for text, _ in holdout], [label for _, label in holdout], predictions)
+    report['calibration'] = calibration.report
+    print_report(calibration)
+
+    smoke = holdout[:SMOKE_SET_SIZE]
+    smoke_set = {"texts": [text for text, _ in smoke], "labels": [label for _, label in smoke],
+                 "accuracy": best['accuracy']}
+    return vectorizer, best['clf'], smoke_set, calibration, report
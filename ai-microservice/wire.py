@@ -0,0 +1,109 @@
+"""
+Wire formats for /analyze and /analyze/batch
+JSON stays the default and is handled exactly as before. A request sent with
+Content-Type: application/msgpack is decoded as MessagePack, and may carry
+its audio as raw bytes under "audio" instead of base64 text under
+"audioBase64". The response is MessagePack when the client's Accept header
+prefers it, or when it sent MessagePack and asked for nothing in particular.
+msgpack is an optional dependency: without it only JSON is offered, and a
+MessagePack request body is refused with 415
+"""
+
+from startup import timed_import
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+# Media types MessagePack goes by, all read as MSGPACK
+MSGPACK_TYPES = (MSGPACK, 'application/x-msgpack', 'application/vnd.msgpack')
+
+_msgpack = None
+
+
+class UnsupportedFormat(ValueError):
+    """A MessagePack request body with msgpack not installed (answered with 415)"""
+
+
+def msgpack():
+    """The msgpack module, or None if it is not installed"""
+    global _msgpack
+    if _msgpack is None:
+        try:
+            _msgpack = timed_import('msgpack')
+        except ImportError:
+            print("Warning: msgpack not installed; only JSON requests and responses are served")
+            _msgpack = False
+    return _msgpack or None
+
+
+def _media_type(value):
+    return (value or '').split(';', 1)[0].strip().lower()
+
+
+def is_msgpack(content_type):
+    return _media_type(content_type) in MSGPACK_TYPES
+
+
+def unpack(body):
+    """The MessagePack document in body, or None if it does not decode"""
+    module = msgpack()
+    if module is None:
+        raise UnsupportedFormat(f"{MSGPACK} needs the msgpack package on the server; send JSON instead")
+    try:
+        return module.unpackb(body, raw=False)
+    except (ValueError, TypeError, module.UnpackException):
+        return None
+
+
+def pack(obj):
+    # Bytes go out as MessagePack bin, text as str
+    return msgpack().packb(obj, use_bin_type=True)
+
+
+def response_format(accept, content_type=None):
+    """JSON or MSGPACK: the format the Accept header prefers
+
+    With no Accept header, or one that rates both formats the same, the
+    answer is in the format of the request body.
+    """
+    request_format = MSGPACK if is_msgpack(content_type) else JSON
+    offered = [request_format, MSGPACK if request_format == JSON else JSON]
+    if msgpack() is None:
+        return JSON
+    if not accept:
+        return request_format
+    ranges = _accept_ranges(accept)
+    best, best_quality = JSON, 0.0
+    for media_type in offered:
+        quality = _quality(ranges, media_type)
+        if quality > best_quality:
+            best, best_quality = media_type, quality
+    return best
+
+
+def _accept_ranges(accept):
+    """{media range: quality} from an Accept header"""
+    ranges = {}
+    for part in accept.split(','):
+        media_range, *params = part.split(';')
+        media_range = media_range.strip().lower()
+        if media_range in MSGPACK_TYPES:
+            media_range = MSGPACK
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_range:
+            ranges[media_range] = max(quality, ranges.get(media_range, 0.0))
+    return ranges
+
+
+def _quality(ranges, media_type):
+    # The most specific matching range decides
+    for media_range in (media_type, media_type.split('/')[0] + '/*', '*/*'):
+        if media_range in ranges:
+            return ranges[media_range]
+    return 0.0